@@ -0,0 +1,103 @@
+"""Read/write time and file size of the stage boundary tables per format (CSV, Parquet, Feather).
+
+data/raw and data/interim are written and read back with src.utils save_data/load_data in every
+format and codec; data/processed (CSR .npz) is shown compressed and uncompressed for reference.
+Run from the repository root:
+
+    python -m benchmarks.bench_io --rows 100000 1000000 --output benchmarks/results/io.json
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer
+from benchmarks.corpus import make_frame
+from src.data.data_preprocessing import normalize_text
+from src.utils import data_file, load_data, save_data
+
+# (format, codec) pairs written for each table boundary
+LAYOUTS = [
+    ('csv', None),
+    ('parquet', 'snappy'),
+    ('parquet', 'zstd'),
+    ('feather', 'lz4'),
+    ('feather', 'uncompressed'),
+]
+
+
+def best_of(repeat: int, fn) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def bench_table(boundary: str, frame, directory: str, repeat: int) -> list:
+    results = []
+    for data_format, codec in LAYOUTS:
+        path = data_file(os.path.join(directory, f"{boundary}-{codec}"), data_format)
+        write_s = best_of(repeat, lambda: save_data(frame, path, codec))
+        results.append({
+            'boundary': boundary,
+            'rows': len(frame),
+            'format': data_format,
+            'compression': codec,
+            'size_mb': round(os.path.getsize(path) / 2 ** 20, 2),
+            'write_s': round(write_s, 4),
+            'read_s': round(best_of(repeat, lambda: load_data(path)), 4),
+            'read_content_s': round(best_of(repeat, lambda: load_data(path, ['content'])), 4),
+            'read_mmap_s': round(best_of(repeat, lambda: load_data(path, memory_map=True)), 4),
+        })
+        print(json.dumps(results[-1]), flush=True)
+    return results
+
+
+def bench_processed(frame, directory: str, repeat: int) -> list:
+    X = CountVectorizer(max_features=5500).fit_transform(frame['content'].fillna(''))
+    results = []
+    for compressed in (True, False):
+        path = os.path.join(directory, f"processed-{compressed}.npz")
+        write_s = best_of(repeat, lambda: sparse.save_npz(path, X, compressed=compressed))
+        results.append({
+            'boundary': 'processed',
+            'rows': X.shape[0],
+            'format': 'npz',
+            'compression': 'zip' if compressed else None,
+            'size_mb': round(os.path.getsize(path) / 2 ** 20, 2),
+            'write_s': round(write_s, 4),
+            'read_s': round(best_of(repeat, lambda: sparse.load_npz(path)), 4),
+        })
+        print(json.dumps(results[-1]), flush=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=3, help="best of this many runs per measurement")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for n_rows in args.rows:
+            raw = make_frame(n_rows)
+            results += bench_table('raw', raw, directory, args.repeat)
+            interim = normalize_text(raw.copy())
+            results += bench_table('interim', interim, directory, args.repeat)
+            results += bench_processed(interim, directory, args.repeat)
+
+    if args.output:
+        directory = os.path.dirname(args.output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.output, 'w') as file:
+            json.dump({'results': results}, file, indent=4)
+
+
+if __name__ == "__main__":
+    main()
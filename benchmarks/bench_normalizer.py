@@ -0,0 +1,59 @@
+"""Throughput of the fused TextNormalizer against the original six step `.apply` chain.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_normalizer --rows 20000 --workers 1 2 4
+"""
+import argparse
+import time
+from benchmarks.corpus import make_frame
+from src.data import data_preprocessing as dp
+from src.data.text_normalizer import TextNormalizer
+
+
+def legacy_normalize_text(df):
+    """normalize_text as it was before the fused normalizer."""
+    for step in (dp.lower_case, dp.remove_stop_words, dp.removing_numbers,
+                 dp.removing_punctuations, dp.removing_urls, dp.lemmatization):
+        df['content'] = df['content'].apply(step)
+    return df
+
+
+def timed(fn, df):
+    start = time.perf_counter()
+    result = fn(df.copy())
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--workers", type=int, nargs="*", default=[],
+                        help="also time normalize_text_parallel with these worker counts")
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    df = make_frame(args.rows)
+    # build the lemmatizer / WordNet state up front so neither side pays for it
+    TextNormalizer()("warm up")
+    dp.lemmatization("warm up")
+
+    legacy, legacy_time = timed(legacy_normalize_text, df)
+    fused, fused_time = timed(dp.normalize_text, df)
+
+    assert legacy['content'].tolist() == fused['content'].tolist(), "fused output differs from legacy chain"
+
+    print(f"rows           : {args.rows}")
+    print(f"legacy chain   : {legacy_time:8.3f}s  {args.rows / legacy_time:12.0f} rows/s")
+    print(f"fused          : {fused_time:8.3f}s  {args.rows / fused_time:12.0f} rows/s")
+    print(f"speedup        : {legacy_time / fused_time:8.1f}x  (outputs identical)")
+
+    for n_workers in args.workers:
+        parallel, parallel_time = timed(
+            lambda frame: dp.normalize_text_parallel(frame, n_workers, args.chunk_size), df)
+        assert parallel['content'].tolist() == fused['content'].tolist(), "parallel output differs from serial"
+        print(f"parallel x{n_workers:<4} : {parallel_time:8.3f}s  {args.rows / parallel_time:12.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
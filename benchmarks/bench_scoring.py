@@ -0,0 +1,98 @@
+"""Per-request scoring latency and allocation: pyfunc / dense DataFrame paths vs the sparse LinearScorer.
+
+Run from the repository root (the pyfunc path is skipped when mlflow is not installed):
+
+    python -m benchmarks.bench_scoring --requests 2000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+import pandas as pd
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.linear_model import LogisticRegression
+from benchmarks.corpus import make_frame
+from src.model.scoring import LinearScorer
+
+
+def dense_path(model, features):
+    """What predict() did per request before the sparse scorer."""
+    features_df = pd.DataFrame.sparse.from_spmatrix(features)
+    features_df = pd.DataFrame(features.toarray(), columns=[str(i) for i in range(features.shape[1])])
+    return model.predict(features_df.values)
+
+
+def load_pyfunc(model, directory):
+    """The sklearn model behind an mlflow.pyfunc wrapper, like the registry used to serve it."""
+    try:
+        import mlflow.pyfunc
+        import mlflow.sklearn
+    except ImportError:
+        return None
+    path = os.path.join(directory, "pyfunc_model")
+    mlflow.sklearn.save_model(model, path)
+    return mlflow.pyfunc.load_model(path)
+
+
+def pyfunc_path(pyfunc_model, features):
+    """What the original app did per request: dense DataFrame through the pyfunc wrapper."""
+    features_df = pd.DataFrame(features.toarray(), columns=[str(i) for i in range(features.shape[1])])
+    return pyfunc_model.predict(features_df)
+
+
+def sparse_path(scorer, features):
+    return scorer.predict_with_proba(features)[0]
+
+
+def measure(fn, rows):
+    start = time.perf_counter()
+    for row in rows:
+        fn(row)
+    latency_us = (time.perf_counter() - start) / len(rows) * 1e6
+
+    tracemalloc.start()
+    fn(rows[0])
+    peak_kib = tracemalloc.get_traced_memory()[1] / 1024
+    tracemalloc.stop()
+    return latency_us, peak_kib
+
+
+def run(args, model, vectorizer, frame, scorer, pyfunc_model):
+    """Time every scoring path on the same single-row requests."""
+    rows = [vectorizer.transform([text]) for text in frame['content'][:args.requests]]
+    assert all((dense_path(model, row) == sparse_path(scorer, row)).all() for row in rows[:200])
+
+    paths = [("dense DataFrame", lambda row: dense_path(model, row)),
+             ("sparse scorer", lambda row: sparse_path(scorer, row))]
+    if pyfunc_model is None:
+        print("mlflow is not installed, skipping the pyfunc path")
+    else:
+        paths.insert(0, ("mlflow pyfunc", lambda row: pyfunc_path(pyfunc_model, row)))
+
+    for name, fn in paths:
+        latency_us, peak_kib = measure(fn, rows)
+        print(f"{name:16}: {latency_us:9.1f} us/request  peak alloc {peak_kib:9.1f} KiB/request")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--max-features", type=int, default=5500)
+    args = parser.parse_args()
+
+    frame = make_frame(20000)
+    vectorizer = CountVectorizer(max_features=args.max_features)
+    X = vectorizer.fit_transform(frame['content'])
+    model = LogisticRegression(C=1, solver='liblinear').fit(X, frame['sentiment'])
+    with tempfile.TemporaryDirectory() as tmp:
+        # the arrays model_building exports to models/linear_model, mapped like serving does
+        LinearScorer.from_estimator(model).save(os.path.join(tmp, "linear_model"))
+        scorer = LinearScorer.load(os.path.join(tmp, "linear_model"))
+        pyfunc_model = load_pyfunc(model, tmp)
+        run(args, model, vectorizer, frame, scorer, pyfunc_model)
+        del scorer
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""remove_small_sentences: the old per-row iloc loop against the vectorized version.
+
+The loop is timed on --loop-rows rows and extrapolated, the vectorized version runs on all --rows:
+
+    python -m benchmarks.bench_small_sentences --rows 1000000 --loop-rows 20000
+"""
+import argparse
+import time
+import warnings
+import numpy as np
+import pandas as pd
+from benchmarks.corpus import make_tweets
+from src.data.data_preprocessing import remove_small_sentences
+
+
+def legacy_remove_small_sentences(df):
+    """remove_small_sentences as it was: Python loop, iloc reads and chained assignment."""
+    for i in range(len(df)):
+        if len(df.text.iloc[i].split()) < 3:
+            df.text.iloc[i] = np.nan
+
+
+def make_texts(n_rows: int) -> pd.DataFrame:
+    # a share of 1-2 word texts so both branches are exercised
+    tweets = make_tweets(n_rows)
+    return pd.DataFrame({'text': [" ".join(t.split()[:1 + i % 6]) for i, t in enumerate(tweets)]})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--loop-rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    frame = make_texts(args.rows)
+    expected = frame['text'].map(lambda text: len(text.split()) < 3)
+
+    small = frame.head(args.loop_rows).copy()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        start = time.perf_counter()
+        legacy_remove_small_sentences(small)
+        loop_s = time.perf_counter() - start
+    # under copy-on-write the chained assignment silently writes to a temporary copy
+    loop_applied = int(small['text'].isna().sum())
+
+    start = time.perf_counter()
+    result = remove_small_sentences(frame.copy())
+    vectorized_s = time.perf_counter() - start
+    assert result['text'].isna().tolist() == expected.tolist()
+
+    extrapolated = loop_s * args.rows / args.loop_rows
+    print(f"row loop   : {args.loop_rows / loop_s:12,.0f} rows/s  (~{extrapolated:8.1f}s for {args.rows:,} rows, "
+          f"nulled {loop_applied} of {int(expected.head(args.loop_rows).sum())} short texts)")
+    print(f"vectorized : {args.rows / vectorized_s:12,.0f} rows/s  ({vectorized_s:8.2f}s for {args.rows:,} rows)")
+    print(f"speed-up   : {extrapolated / vectorized_s:,.0f}x")
+
+
+if __name__ == "__main__":
+    main()
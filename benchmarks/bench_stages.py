@@ -0,0 +1,157 @@
+"""Wall time, peak RSS and rows/s of each training pipeline stage on synthetic corpora of several sizes.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_stages --sizes 10000 100000 1000000 --output benchmarks/results/stages.json
+
+and, later, fail (exit code 1) when a stage got slower than the saved run by more than 20%:
+
+    python -m benchmarks.bench_stages --sizes 10000 100000 --compare benchmarks/results/stages.json --tolerance 0.2
+"""
+import argparse
+import datetime
+import json
+import os
+import resource
+import subprocess
+import sys
+import threading
+import time
+from sklearn.model_selection import train_test_split
+from benchmarks.corpus import make_frame
+from src.data.data_preprocessing import normalize_text
+from src.features.feature_engineering import apply_bow
+from src.model.model_building import train_model
+from src.model.model_evaluation import evaluate_model
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes (Linux), falling back to the lifetime peak."""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class PeakRSS:
+    """Samples the RSS every few milliseconds while a stage runs and keeps the maximum."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = 0
+        self._done = threading.Event()
+
+    def __enter__(self):
+        self.peak = current_rss()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._done.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+
+    def _sample(self):
+        while not self._done.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+
+def timed(results: list, size: int, stage: str, rows: int, fn, *args):
+    start_rss = current_rss()
+    with PeakRSS() as rss:
+        start = time.perf_counter()
+        output = fn(*args)
+        wall = time.perf_counter() - start
+    result = {
+        'size': size,
+        'stage': stage,
+        'rows': rows,
+        'wall_s': round(wall, 4),
+        'rows_per_s': round(rows / wall, 1) if wall else None,
+        'peak_rss_mb': round(rss.peak / 2 ** 20, 1),
+        'stage_rss_mb': round((rss.peak - start_rss) / 2 ** 20, 1),
+    }
+    print(json.dumps(result), flush=True)
+    results.append(result)
+    return output
+
+
+def run_pipeline(size: int, max_features: int, test_size: float, results: list) -> None:
+    """data_preprocessing -> feature_engineering -> model_building -> model_evaluation core functions."""
+    frame = make_frame(size)
+    train_data, test_data = train_test_split(frame, test_size=test_size, random_state=42)
+    del frame
+
+    train_data, test_data = timed(results, size, "normalize_text", size,
+                                  lambda: (normalize_text(train_data), normalize_text(test_data)))
+
+    X_train, y_train, X_test, y_test, _ = timed(results, size, "apply_bow", size, apply_bow, train_data, test_data, max_features)
+    del train_data, test_data
+
+    clf = timed(results, size, "train_model", X_train.shape[0], train_model, X_train, y_train, {})
+    timed(results, size, "evaluate_model", X_test.shape[0], evaluate_model, clf, X_test, y_test)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def regressions(results: list, baseline: dict, tolerance: float) -> list:
+    """Stages whose wall time exceeds the baseline run of the same size by more than `tolerance`."""
+    previous = {(r['size'], r['stage']): r for r in baseline['results']}
+    slower = []
+    for result in results:
+        before = previous.get((result['size'], result['stage']))
+        if before and result['wall_s'] > before['wall_s'] * (1 + tolerance):
+            slower.append({**result, 'baseline_wall_s': before['wall_s']})
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--max-features", type=int, default=5500)
+    parser.add_argument("--test-size", type=float, default=0.20)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="earlier --output file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown for --compare")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        run_pipeline(size, args.max_features, args.test_size, results)
+
+    report = {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': sys.version.split()[0],
+        'cpu_count': os.cpu_count(),
+        'results': results,
+    }
+    if args.output:
+        directory = os.path.dirname(args.output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=4)
+
+    if args.compare:
+        with open(args.compare) as file:
+            slower = regressions(results, json.load(file), args.tolerance)
+        for result in slower:
+            print(f"REGRESSION {result['stage']} @ {result['size']} rows: "
+                  f"{result['wall_s']}s vs {result['baseline_wall_s']}s", file=sys.stderr)
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Load time, file size and resident memory of the vectorizer: pickled CountVectorizer vs mapped vocabulary.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_vectorizer --rows 200000 --max-features 50000
+"""
+import argparse
+import os
+import pickle
+import tempfile
+import time
+import tracemalloc
+from sklearn.feature_extraction.text import CountVectorizer
+from benchmarks.corpus import make_frame
+from src.features.vectorizers import VocabularyVectorizer, save_vocabulary
+
+
+def size_kib(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names) / 1024
+    return os.path.getsize(path) / 1024
+
+
+def measure_load(load, repeat=5):
+    """Best load time in ms and the Python heap it allocates in KiB."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    loaded = load()
+    heap_kib = tracemalloc.get_traced_memory()[0] / 1024
+    tracemalloc.stop()
+    del loaded
+    return min(times) * 1000, heap_kib
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--max-features", type=int, default=50000)
+    args = parser.parse_args()
+
+    frame = make_frame(args.rows)
+    vectorizer = CountVectorizer(max_features=args.max_features).fit(frame['content'])
+    texts = frame['content'][:5000].tolist()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pickle_path = os.path.join(tmp, "vectorizer.pkl")
+        with open(pickle_path, 'wb') as file:
+            pickle.dump(vectorizer, file)
+        vocabulary_dir = os.path.join(tmp, "vocabulary")
+        params = save_vocabulary(vectorizer, vocabulary_dir)
+        params.pop('vocabulary')
+
+        def load_pickle():
+            with open(pickle_path, 'rb') as file:
+                return pickle.load(file)
+
+        def load_mapped():
+            return VocabularyVectorizer.load(vocabulary_dir, **params)
+
+        mapped = load_mapped()
+        assert (mapped.transform(texts) != vectorizer.transform(texts)).nnz == 0
+        print(f"{len(vectorizer.vocabulary_)} terms")
+
+        for name, path, load in (("pickle", pickle_path, load_pickle), ("mapped vocabulary", vocabulary_dir, load_mapped)):
+            load_ms, heap_kib = measure_load(load)
+            loaded = load()
+            start = time.perf_counter()
+            loaded.transform(texts)
+            rows_per_s = len(texts) / (time.perf_counter() - start)
+            print(f"{name:18}: load {load_ms:8.2f} ms  file {size_kib(path):9.1f} KiB  "
+                  f"heap {heap_kib:9.1f} KiB  transform {rows_per_s:9.0f} rows/s")
+        del mapped, loaded
+
+
+if __name__ == "__main__":
+    main()
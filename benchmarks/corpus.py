@@ -0,0 +1,40 @@
+"""Synthetic tweet corpora for the benchmark scripts."""
+import random
+import pandas as pd
+
+WORDS = [
+    "i", "me", "my", "you", "the", "a", "an", "and", "to", "of", "in", "is", "was", "it",
+    "this", "that", "so", "but", "not", "don't", "can't", "i'm", "just", "really", "very",
+    "love", "loved", "loving", "hate", "happy", "happiness", "sad", "sadness", "day", "days",
+    "friends", "friend", "work", "working", "tired", "sleep", "sleeping", "morning", "night",
+    "tonight", "tomorrow", "cats", "dogs", "movies", "watching", "went", "going", "feel",
+    "feeling", "feels", "good", "bad", "great", "awesome", "miss", "missing", "home", "churches",
+    "geese", "mice", "wolves", "party", "weekend", "school", "exams", "headache", "sick", "lol",
+    "omg", "ugh", "yay", "haha", "wow", "SOON", "LOVE", "Happy", "Sad", "Mother's", "won't",
+]
+DECORATIONS = [
+    "@user_{n}", "#tag{n}", "http://t.co/{n}x", "www.site{n}.com/page", "{n}", "{n}th",
+    "!!!", "...", ":(", ":)", "=[", "&amp;", "-", "?", "ughhh...{n}",
+]
+
+
+def make_tweets(n_rows: int, seed: int = 42) -> list:
+    """Generate `n_rows` tweet-like strings with mentions, URLs, numbers and punctuation."""
+    rng = random.Random(seed)
+    tweets = []
+    for _ in range(n_rows):
+        words = rng.choices(WORDS, k=rng.randint(3, 25))
+        for _ in range(rng.randint(0, 4)):
+            decoration = rng.choice(DECORATIONS).format(n=rng.randint(0, 9999))
+            words.insert(rng.randint(0, len(words)), decoration)
+        tweets.append(" ".join(words))
+    return tweets
+
+
+def make_frame(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """Generate a frame shaped like data/raw/*_raw.csv (`sentiment`, `content`)."""
+    rng = random.Random(seed + 1)
+    return pd.DataFrame({
+        'sentiment': [rng.randint(0, 1) for _ in range(n_rows)],
+        'content': make_tweets(n_rows, seed),
+    })
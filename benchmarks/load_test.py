@@ -0,0 +1,219 @@
+"""HTTP load test: replay recorded requests over keep-alive connections, closed loop or at a fixed rate.
+
+Replay files are JSON lines, one request each: {"path": "/predict", "form": {"text": ...}} or
+{"path": "/v1/predict", "json": {"texts": [...]}} (see benchmarks/stub_model.py). Without
+--replay, synthetic tweets are posted to the path of --url.
+
+Against a running server (gunicorn/Flask or the ASGI entry point):
+
+    python -m benchmarks.load_test --url http://127.0.0.1:5000/predict --connections 50 500 --duration 20
+
+Fully local, with a stub model and the server started for the run:
+
+    python -m benchmarks.load_test --serve asgi --replay replay.jsonl --rate 500 --output results/asgi.json
+
+Only the standard library is used, so the client is not the bottleneck at a few thousand connections.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import Counter
+from urllib.parse import urlencode, urlsplit
+from benchmarks.corpus import make_tweets
+
+FLASK_APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "flask_app")
+
+SERVE_COMMANDS = {
+    'flask': lambda port: ["gunicorn", "-c", "gunicorn.conf.py", "-b", f"127.0.0.1:{port}", "app:app"],
+    'asgi': lambda port: ["uvicorn", "--port", str(port), "--log-level", "warning", "asgi:app"],
+}
+
+
+def percentile(values: list, q: float) -> float:
+    return values[min(int(q * len(values)), len(values) - 1)] if values else 0.0
+
+
+def build_request(host: str, entry: dict) -> bytes:
+    """Raw HTTP/1.1 POST for one replay entry."""
+    if 'json' in entry:
+        body, content_type = json.dumps(entry['json']).encode(), "application/json"
+    else:
+        body, content_type = urlencode(entry.get('form', {})).encode(), "application/x-www-form-urlencoded"
+    head = (f"{entry.get('method', 'POST')} {entry['path']} HTTP/1.1\r\nHost: {host}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: keep-alive\r\n\r\n")
+    return head.encode() + body
+
+
+def load_entries(replay: str, url: str, n_texts: int) -> list:
+    if replay:
+        with open(replay, 'r', encoding='utf-8') as file:
+            return [json.loads(line) for line in file if line.strip()]
+
+    path = urlsplit(url).path or "/predict"
+    if path.startswith("/v1/"):
+        return [{'path': path, 'json': {'texts': [text]}} for text in make_tweets(n_texts)]
+    return [{'path': path, 'form': {'text': text}} for text in make_tweets(n_texts)]
+
+
+async def read_response(reader) -> int:
+    """Read one HTTP/1.1 response (content-length or chunked), returns its status code."""
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode('latin-1').split("\r\n")
+    status = int(lines[0].split()[1])
+    headers = {line.split(":", 1)[0].lower(): line.split(":", 1)[1].strip() for line in lines[1:] if ":" in line}
+
+    if headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(int(headers.get('content-length', 0)))
+    return status
+
+
+async def connection(url: str, requests: list, deadline: float, interval: float, latencies: list,
+                     statuses: Counter, offset: int):
+    """One keep-alive connection; with an `interval` requests are sent on schedule (open loop) and
+    latency counts from the scheduled time, so a stalled server cannot hide its queueing delay."""
+    parts = urlsplit(url)
+    writer = None
+    i = offset
+    scheduled = time.perf_counter() + (interval * (offset % 1000) / 1000 if interval else 0)
+    while scheduled < deadline:
+        if interval:
+            await asyncio.sleep(max(scheduled - time.perf_counter(), 0))
+        start = scheduled if interval else time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+            writer.write(requests[i % len(requests)])
+            status = await read_response(reader)
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[status] += 1
+        except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+            statuses[type(e).__name__] += 1
+            if writer is not None:
+                writer.close()
+            writer = None
+            await asyncio.sleep(0.05)
+        i += 1
+        scheduled = scheduled + interval if interval else time.perf_counter()
+    if writer is not None:
+        writer.close()
+
+
+async def run(url: str, n_connections: int, duration: float, requests: list, rate: float = None) -> dict:
+    latencies, statuses = [], Counter()
+    interval = n_connections / rate if rate else 0.0
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    await asyncio.gather(*(connection(url, requests, deadline, interval, latencies, statuses, i * 7919)
+                           for i in range(n_connections)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    total = sum(statuses.values())
+    errors = sum(count for status, count in statuses.items() if not (isinstance(status, int) and status < 400))
+    return {
+        'connections': n_connections,
+        'target_rate': rate,
+        'requests': total,
+        'requests_per_s': round(len(latencies) / elapsed, 1),
+        'error_rate': round(errors / total, 4) if total else 0.0,
+        'latency_ms': {q: round(percentile(latencies, p), 2) for q, p in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99))},
+        'statuses': {str(status): count for status, count in statuses.items()},
+    }
+
+
+def start_server(kind: str, url: str, environment: dict, timeout: float = 60.0) -> subprocess.Popen:
+    """Launch the Flask (gunicorn) or ASGI (uvicorn) entry point on the port of `url`, wait for /ready."""
+    parts = urlsplit(url)
+    env = {**os.environ, **environment, 'PYTHONPATH': os.pathsep.join(filter(None, [
+        os.path.dirname(FLASK_APP_DIR), os.environ.get('PYTHONPATH')]))}
+    server = subprocess.Popen(SERVE_COMMANDS[kind](parts.port or 80), cwd=FLASK_APP_DIR, env=env)
+
+    ready_url = f"{parts.scheme}://{parts.netloc}/ready"
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"{kind} server exited with {server.returncode}")
+        try:
+            with urllib.request.urlopen(ready_url, timeout=1) as response:
+                if response.status == 200:
+                    return server
+        except OSError:
+            pass
+        time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"{kind} server not ready after {timeout}s")
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:5000/predict", help="server (and path without --replay)")
+    parser.add_argument("--replay", help="JSON lines file of recorded requests")
+    parser.add_argument("--connections", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--rate", type=float, help="total requests/s to send (open loop); default: closed loop")
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--texts", type=int, default=5000, help="distinct synthetic tweets without --replay")
+    parser.add_argument("--serve", choices=sorted(SERVE_COMMANDS), help="start this entry point on a stub model first")
+    parser.add_argument("--output", help="also write the results as JSON to this file")
+    args = parser.parse_args()
+
+    entries = load_entries(args.replay, args.url, args.texts)
+    requests = [build_request(urlsplit(args.url).netloc, entry) for entry in entries]
+
+    server = None
+    with tempfile.TemporaryDirectory() as stub_dir:
+        if args.serve:
+            from benchmarks.stub_model import write_stub_artifacts
+            server = start_server(args.serve, args.url, write_stub_artifacts(stub_dir))
+
+        results = []
+        try:
+            for n_connections in args.connections:
+                result = asyncio.run(run(args.url, n_connections, args.duration, requests, args.rate))
+                print(json.dumps(result))
+                results.append(result)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+    if args.output:
+        directory = os.path.dirname(args.output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.output, 'w') as file:
+            json.dump({
+                'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+                'commit': git_commit(),
+                'python': sys.version.split()[0],
+                'url': args.url,
+                'serve': args.serve,
+                'replay': args.replay,
+                'requests_in_replay': len(entries),
+                'duration_s': args.duration,
+                'results': results,
+            }, file, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Small local model artifacts and replay files, so serving benchmarks need no registry or network.
+
+    python -m benchmarks.stub_model /tmp/stub --replay /tmp/stub/replay.jsonl
+
+writes vectorizer.json + vocabulary/ + vectorizer.pkl, model.pkl and linear_model/ under /tmp/stub;
+serve them with MODEL_PATH=/tmp/stub/linear_model VECTORIZER_SPEC=/tmp/stub/vectorizer.json.
+"""
+import argparse
+import json
+import os
+import pickle
+import random
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.linear_model import LogisticRegression
+from benchmarks.corpus import make_frame, make_tweets
+from src.features.vectorizers import save_vectorizer_spec, save_vocabulary
+from src.model.model_building import export_linear_model
+
+
+def write_stub_artifacts(directory: str, n_rows: int = 20000, max_features: int = 5500) -> dict:
+    """Fit a bag of words + LogisticRegression on synthetic tweets, returns the serving environment."""
+    os.makedirs(directory, exist_ok=True)
+    frame = make_frame(n_rows)
+    vectorizer = CountVectorizer(max_features=max_features)
+    model = LogisticRegression(C=1, solver='liblinear').fit(vectorizer.fit_transform(frame['content']), frame['sentiment'])
+
+    with open(os.path.join(directory, "vectorizer.pkl"), 'wb') as file:
+        pickle.dump(vectorizer, file)
+    with open(os.path.join(directory, "model.pkl"), 'wb') as file:
+        pickle.dump(model, file)
+    spec = save_vocabulary(vectorizer, os.path.join(directory, "vocabulary"))
+    save_vectorizer_spec({'method': 'bow', 'max_features': max_features, **spec}, os.path.join(directory, "vectorizer.json"))
+    export_linear_model(model, os.path.join(directory, "linear_model"))
+
+    return {
+        'MODEL_PATH': os.path.join(directory, "linear_model"),
+        'VECTORIZER_SPEC': os.path.join(directory, "vectorizer.json"),
+        'VECTORIZER_PATH': os.path.join(directory, "vectorizer.pkl"),
+        'MODEL_POLL_INTERVAL': "0",
+    }
+
+
+def write_replay(path: str, n_requests: int = 10000, batch_share: float = 0.1, seed: int = 7) -> None:
+    """Replay file of /predict form posts with a share of small /v1/predict batches; tweets repeat like real traffic."""
+    rng = random.Random(seed)
+    tweets = make_tweets(max(n_requests // 4, 1), seed)
+    with open(path, 'w', encoding='utf-8') as file:
+        for _ in range(n_requests):
+            if rng.random() < batch_share:
+                entry = {'path': "/v1/predict", 'json': {'texts': rng.choices(tweets, k=rng.randint(2, 50))}}
+            else:
+                entry = {'path': "/predict", 'form': {'text': rng.choice(tweets)}}
+            file.write(json.dumps(entry) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory")
+    parser.add_argument("--replay", help="also write a replay file here")
+    parser.add_argument("--requests", type=int, default=10000)
+    args = parser.parse_args()
+
+    environment = write_stub_artifacts(args.directory)
+    if args.replay:
+        write_replay(args.replay, args.requests)
+    print(" ".join(f"{key}={value}" for key, value in environment.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""RSS / PSS of a running gunicorn master and its workers (Linux only).
+
+PSS splits shared pages between the processes that map them, so the PSS total is
+what the container really pays. Compare PRELOAD_APP=1 against PRELOAD_APP=0:
+
+    python -m benchmarks.worker_memory <master pid>
+"""
+import argparse
+import json
+
+
+def memory(pid: int) -> dict:
+    """Rss / Pss / shared / private KiB of one process from /proc/<pid>/smaps_rollup."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as file:
+        for line in file:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        'rss_kib': fields.get("Rss", 0),
+        'pss_kib': fields.get("Pss", 0),
+        'shared_kib': fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+        'private_kib': fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def children(pid: int) -> list:
+    with open(f"/proc/{pid}/task/{pid}/children") as file:
+        return [int(child) for child in file.read().split()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("master_pid", type=int)
+    args = parser.parse_args()
+
+    processes = {'master': memory(args.master_pid)}
+    for i, child in enumerate(children(args.master_pid)):
+        processes[f"worker-{i} ({child})"] = memory(child)
+
+    totals = {key: sum(p[key] for p in processes.values()) for key in processes['master']}
+    print(json.dumps({'processes': processes, 'total': totals, 'workers': len(processes) - 1}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,130 +1,151 @@
 # updated app.py
 
-from flask import Flask, render_template,request
-import mlflow
-import pickle
+from flask import Flask, render_template,request,jsonify,Response,stream_with_context,make_response
+import json
 import os
-import pandas as pd
+from concurrent.futures import TimeoutError as FutureTimeoutError
 
-import numpy as np
-import pandas as pd
-import os
-import re
-import nltk
-import string
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
-import dagshub
-
-#from flask_app.preprocessing_utility import normalize_text
-# clean
-def lemmatization(text):
-    """Lemmatize the text."""
-    lemmatizer = WordNetLemmatizer()
-    text = text.split()
-    text = [lemmatizer.lemmatize(word) for word in text]
-    return " ".join(text)
-
-def remove_stop_words(text):
-    """Remove stop words from the text."""
-    stop_words = set(stopwords.words("english"))
-    text = [word for word in str(text).split() if word not in stop_words]
-    return " ".join(text)
-
-def removing_numbers(text):
-    """Remove numbers from the text."""
-    text = ''.join([char for char in text if not char.isdigit()])
-    return text
-
-def lower_case(text):
-    """Convert text to lower case."""
-    text = text.split()
-    text = [word.lower() for word in text]
-    return " ".join(text)
-
-def removing_punctuations(text):
-    """Remove punctuations from the text."""
-    text = re.sub('[%s]' % re.escape(string.punctuation), ' ', text)
-    text = text.replace('؛', "")
-    text = re.sub('\s+', ' ', text).strip()
-    return text
-
-def removing_urls(text):
-    """Remove URLs from the text."""
-    url_pattern = re.compile(r'https?://\S+|www\.\S+')
-    return url_pattern.sub(r'', text)
-
-def remove_small_sentences(df):
-    """Remove sentences with less than 3 words."""
-    for i in range(len(df)):
-        if len(df.text.iloc[i].split()) < 3:
-            df.text.iloc[i] = np.nan
-
-def normalize_text(text):
-    text = lower_case(text)
-    text = remove_stop_words(text)
-    text = removing_numbers(text)
-    text = removing_punctuations(text)
-    text = removing_urls(text)
-    text = lemmatization(text)
-
-    return text
-
-# Set up DagsHub credentials for MLflow tracking
-dagshub_token = os.getenv("DAGSHUB_PAT")
-if not dagshub_token:
-    raise EnvironmentError("DAGSHUB_PAT environment variable is not set")
-
-os.environ["MLFLOW_TRACKING_USERNAME"] = dagshub_token
-os.environ["MLFLOW_TRACKING_PASSWORD"] = dagshub_token
+from src.data.text_normalizer import TextNormalizer
+from src.serving.batching import MicroBatcher
+from src.serving.model_store import ModelStore, ModelSource, ModelNotReadyError
+from src.serving.prediction_cache import PredictionCache
 
-dagshub_url = "https://dagshub.com"
-repo_owner = "Pravat-21"
-repo_name = "MLops-Mini-Project"
+# clean: same normalizer as the data_preprocessing stage, warm started from the
+# lemma cache that stage persists next to the vectorizer
+normalizer = TextNormalizer(lemma_cache_path=os.getenv("LEMMA_CACHE_PATH", "models/lemma_cache.json"))
 
-# Set up MLflow tracking URI
-mlflow.set_tracking_uri(f'{dagshub_url}/{repo_owner}/{repo_name}.mlflow')
+def normalize_text(text):
+    return normalizer(text)
 
 app = Flask(__name__)
 
-# load model from model registry
-def get_latest_model_version(model_name):
-    client = mlflow.MlflowClient()
-    latest_version = client.get_latest_versions(model_name, stages=["Production"])
-    if not latest_version:
-        latest_version = client.get_latest_versions(model_name, stages=["None"])
-    return latest_version[0].version if latest_version else None
-
-model_name = "my_model"
-model_version = get_latest_model_version(model_name)
-
-model_uri = f'models:/{model_name}/{model_version}'
-model = mlflow.pyfunc.load_model(model_uri)
-
-vectorizer = pickle.load(open('models/vectorizer.pkl','rb'))
+# Model + vectorizer are loaded in the background so the worker boots straight away. MODEL_POINTER,
+# MODEL_PATH or MODEL_URI skip the DagsHub registry and DAGSHUB_PAT entirely (see ModelSource).
+# Requests arriving before the first load wait up to MODEL_READY_TIMEOUT seconds, then get a 503.
+# Every MODEL_POLL_INTERVAL seconds (0 = never) the source is probed and a new version hot-swapped in.
+MODEL_READY_TIMEOUT = float(os.getenv("MODEL_READY_TIMEOUT", "30"))
+store = ModelStore(ModelSource(), poll_interval=float(os.getenv("MODEL_POLL_INTERVAL", "60")))
+store.start(background=os.getenv("MODEL_WARMUP", "background") != "eager")
+
+# Repeated tweets (retweets, spam, templates) are answered from a cache keyed on the normalized
+# text and emptied whenever the model version changes. PREDICTION_CACHE_SIZE (0 = off),
+# PREDICTION_CACHE_TTL seconds; PREDICTION_CACHE_PATH shares it across workers via SQLite.
+cache = PredictionCache.from_env()
+
+def score(bundle, texts):
+    """(labels, probabilities) of normalized texts, through the prediction cache when enabled."""
+    if cache is None:
+        return bundle.score(texts)
+    return cache.score(bundle, texts)
 
 @app.route('/')
 def home():
     return render_template('index.html',result=None)
 
+def predict_batch(texts):
+    """(label, model version) per text for the micro-batcher behind /predict; one bundle scores the whole batch."""
+    bundle = store.get(MODEL_READY_TIMEOUT)
+    labels, probabilities = bundle.score(texts)
+    # /predict already looked these texts up in the cache, only remember the answers
+    if cache is not None:
+        cache.put_many(bundle.version, texts, list(zip(labels, probabilities)))
+    return [(label, bundle.version) for label in labels]
+
+# Concurrent /predict calls (gunicorn --threads) are coalesced into one predict_batch call.
+# BATCH_MAX_SIZE / BATCH_MAX_WAIT_MS trade added latency against batch size; BATCHING=0 turns it off.
+batching_enabled = os.getenv("BATCHING", "1") != "0"
+batcher = MicroBatcher(
+    predict_batch,
+    max_batch_size=int(os.getenv("BATCH_MAX_SIZE", "32")),
+    max_wait_ms=float(os.getenv("BATCH_MAX_WAIT_MS", "5")),
+)
+# a /predict call waits for the model as long as any other request, plus one batching window
+BATCH_TIMEOUT = MODEL_READY_TIMEOUT + batcher.max_wait
+
 @app.route('/predict', methods=['POST'])
 def predict():
 
     text = request.form['text']
     # clean
     text = normalize_text(text)
-    # bow
-    features = vectorizer.transform([text])
 
-    # Convert sparse matrix to DataFrame
-    features_df = pd.DataFrame.sparse.from_spmatrix(features)
-    features_df = pd.DataFrame(features.toarray(), columns=[str(i) for i in range(features.shape[1])])
+    # hits skip the batching wait altogether
+    bundle = store.get(MODEL_READY_TIMEOUT)
+    hit = cache.get_many(bundle.version, [text])[0] if cache is not None else None
 
-    # prediction
-    result = model.predict(features_df)
+    if hit is not None:
+        result, version = hit[0], bundle.version
+    elif batching_enabled:
+        result, version = batcher.predict(text, timeout=BATCH_TIMEOUT)
+    else:
+        result, version = predict_batch([text])[0]
 
     # show
-    return render_template('index.html', result=result[0])
+    response = make_response(render_template('index.html', result=result))
+    response.headers['X-Model-Version'] = version
+    return response
+
+# /v1/predict answers in one JSON document up to STREAM_THRESHOLD texts; larger payloads
+# (or ?stream=1) are scored STREAM_CHUNK_SIZE texts at a time and streamed as NDJSON
+STREAM_THRESHOLD = int(os.getenv("STREAM_THRESHOLD", "1000"))
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "1000"))
+
+def _predictions(bundle, texts):
+    labels, probabilities = score(bundle, [normalize_text(text) for text in texts])
+    return [{'label': int(label), 'probability': float(probability)} for label, probability in zip(labels, probabilities)]
+
+@app.route('/v1/predict', methods=['POST'])
+def predict_json():
+    payload = request.get_json(silent=True)
+    texts = payload.get('texts') if isinstance(payload, dict) else payload
+
+    if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+        return jsonify({'error': 'expected a JSON body like {"texts": ["...", ...]}'}), 400
+
+    # one bundle for the whole request, even if it is streamed
+    bundle = store.get(MODEL_READY_TIMEOUT)
+
+    if len(texts) <= STREAM_THRESHOLD and request.args.get('stream') != '1':
+        response = jsonify({'model_version': bundle.version, 'predictions': _predictions(bundle, texts) if texts else []})
+        response.headers['X-Model-Version'] = bundle.version
+        return response
+
+    def generate():
+        for start in range(0, len(texts), STREAM_CHUNK_SIZE):
+            for prediction in _predictions(bundle, texts[start:start + STREAM_CHUNK_SIZE]):
+                yield json.dumps(prediction) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'X-Model-Version': bundle.version})
+
+@app.errorhandler(ModelNotReadyError)
+def model_not_ready(error):
+    return jsonify({'error': str(error)}), 503
+
+# what batcher.predict raises, not the builtin TimeoutError before Python 3.11
+@app.errorhandler(FutureTimeoutError)
+def prediction_timed_out(error):
+    return jsonify({'error': f'prediction not ready after {BATCH_TIMEOUT:g}s, retry later'}), 503
+
+@app.route('/health')
+def health():
+    """Liveness: the worker is up, whether or not the model is loaded."""
+    return jsonify({'status': 'ok'})
+
+@app.route('/ready')
+def ready():
+    """Readiness: 200 once a model is loaded, with load and cold start timings."""
+    status = store.status()
+    return jsonify(status), 200 if status['ready'] else 503
+
+@app.route('/metrics')
+def metrics():
+    return jsonify({
+        'model': store.status(),
+        'batching': batcher.metrics() if batching_enabled else None,
+        'lemma_cache': normalizer.lemma_cache.stats(),
+        'prediction_cache': cache.stats() if cache is not None else None,
+    })
 
 if __name__ == "__main__":
     app.run(debug=True, host="0.0.0.0")
\ No newline at end of file
@@ -0,0 +1,229 @@
+# asyncio entry point: `uvicorn --app-dir flask_app asgi:app`
+#
+# Same normalizer, model source, prediction cache and micro-batcher as app.py, served as a
+# plain ASGI callable so one event loop can hold thousands of (slow) connections. Only the
+# CPU work leaves the loop: /predict items go through the MicroBatcher thread, /v1/predict
+# batches through a small bounded thread pool, and at most MAX_INFLIGHT requests are scored
+# or queued at once (the rest get a 503 instead of piling up).
+
+import os
+import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from src.data.text_normalizer import TextNormalizer
+from src.serving.batching import MicroBatcher
+from src.serving.model_store import ModelStore, ModelSource, ModelNotReadyError
+from src.serving.prediction_cache import PredictionCache
+
+normalizer = TextNormalizer(lemma_cache_path=os.getenv("LEMMA_CACHE_PATH", "models/lemma_cache.json"))
+
+MODEL_READY_TIMEOUT = float(os.getenv("MODEL_READY_TIMEOUT", "30"))
+store = ModelStore(ModelSource(), poll_interval=float(os.getenv("MODEL_POLL_INTERVAL", "60")))
+store.start(background=os.getenv("MODEL_WARMUP", "background") != "eager")
+
+cache = PredictionCache.from_env()
+
+SCORING_THREADS = int(os.getenv("SCORING_THREADS", "2"))
+MAX_INFLIGHT = int(os.getenv("MAX_INFLIGHT", "1024"))
+MAX_BODY_BYTES = int(os.getenv("MAX_BODY_BYTES", str(10 * 1024 * 1024)))
+STREAM_THRESHOLD = int(os.getenv("STREAM_THRESHOLD", "1000"))
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "1000"))
+
+executor = ThreadPoolExecutor(max_workers=SCORING_THREADS, thread_name_prefix="scoring")
+
+
+def predict_batch(texts):
+    """(label, model version) per normalized text, run on the MicroBatcher thread."""
+    bundle = store.get(MODEL_READY_TIMEOUT)
+    labels, probabilities = bundle.score(texts)
+    if cache is not None:
+        cache.put_many(bundle.version, texts, list(zip(labels, probabilities)))
+    return [(label, bundle.version) for label in labels]
+
+
+batcher = MicroBatcher(
+    predict_batch,
+    max_batch_size=int(os.getenv("BATCH_MAX_SIZE", "32")),
+    max_wait_ms=float(os.getenv("BATCH_MAX_WAIT_MS", "5")),
+)
+BATCH_TIMEOUT = MODEL_READY_TIMEOUT + batcher.max_wait
+
+
+def predict_one(text):
+    """Normalize one text and answer from the cache when possible, returns (label, version) or None."""
+    text = normalizer(text)
+    bundle = store.get(MODEL_READY_TIMEOUT)
+    hit = cache.get_many(bundle.version, [text])[0] if cache is not None else None
+    return text, ((hit[0], bundle.version) if hit is not None else None)
+
+
+def predictions(bundle, texts):
+    texts = [normalizer(text) for text in texts]
+    labels, probabilities = cache.score(bundle, texts) if cache is not None else bundle.score(texts)
+    return [{'label': int(label), 'probability': float(probability)} for label, probability in zip(labels, probabilities)]
+
+#------------------------------ASGI plumbing--------------------------------------------------------
+
+class HTTPError(Exception):
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+async def read_body(receive) -> bytes:
+    body = bytearray()
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise HTTPError(499, "client disconnected")
+        body.extend(message.get('body', b''))
+        if len(body) > MAX_BODY_BYTES:
+            raise HTTPError(413, "request body too large")
+        if not message.get('more_body', False):
+            return bytes(body)
+
+
+async def send_json(send, status, payload, headers=()):
+    body = json.dumps(payload).encode()
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json'), *headers]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def run(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+
+async def get_bundle():
+    """The current bundle without blocking the loop while the first load is still running."""
+    if store.ready:
+        return store.get()
+    return await run(store.get, MODEL_READY_TIMEOUT)
+
+#------------------------------Routes---------------------------------------------------------------
+
+async def predict(scope, receive, send):
+    """Form (text=...) or JSON ({"text": ...}) body, answers {"label", "model_version"}."""
+    body = await read_body(receive)
+    content_type = dict(scope['headers']).get(b'content-type', b'')
+    try:
+        if content_type.startswith(b'application/json'):
+            payload = json.loads(body or b'null')
+            text = payload.get('text') if isinstance(payload, dict) else None
+        else:
+            text = parse_qs(body.decode()).get('text', [None])[0]
+    except ValueError:
+        text = None
+    if not isinstance(text, str):
+        raise HTTPError(400, 'expected a "text" field')
+
+    normalized, hit = await run(predict_one, text)
+    label, version = hit if hit is not None else await asyncio.wait_for(asyncio.wrap_future(batcher.submit(normalized)), BATCH_TIMEOUT)
+    await send_json(send, 200, {'label': int(label), 'model_version': version},
+                    [(b'x-model-version', version.encode())])
+
+
+async def predict_json(scope, receive, send):
+    """Same contract as /v1/predict of app.py, NDJSON beyond STREAM_THRESHOLD texts or with ?stream=1."""
+    body = await read_body(receive)
+    try:
+        payload = json.loads(body or b'null')
+    except ValueError:
+        payload = None
+    texts = payload.get('texts') if isinstance(payload, dict) else payload
+    if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+        raise HTTPError(400, 'expected a JSON body like {"texts": ["...", ...]}')
+
+    bundle = await get_bundle()
+    version_header = (b'x-model-version', bundle.version.encode())
+    stream = parse_qs(scope.get('query_string', b'').decode()).get('stream') == ['1']
+
+    if len(texts) <= STREAM_THRESHOLD and not stream:
+        result = await run(predictions, bundle, texts) if texts else []
+        await send_json(send, 200, {'model_version': bundle.version, 'predictions': result}, [version_header])
+        return
+
+    await send({'type': 'http.response.start', 'status': 200,
+                'headers': [(b'content-type', b'application/x-ndjson'), version_header]})
+    for start in range(0, len(texts), STREAM_CHUNK_SIZE):
+        chunk = await run(predictions, bundle, texts[start:start + STREAM_CHUNK_SIZE])
+        await send({'type': 'http.response.body', 'more_body': True,
+                    'body': "".join(json.dumps(prediction) + "\n" for prediction in chunk).encode()})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def health(scope, receive, send):
+    await send_json(send, 200, {'status': 'ok'})
+
+
+async def ready(scope, receive, send):
+    status = store.status()
+    await send_json(send, 200 if status['ready'] else 503, status)
+
+
+async def metrics(scope, receive, send):
+    await send_json(send, 200, {
+        'model': store.status(),
+        'batching': batcher.metrics(),
+        'lemma_cache': normalizer.lemma_cache.stats(),
+        'prediction_cache': cache.stats() if cache is not None else None,
+        'inflight': inflight,
+        'rejected': rejected,
+    })
+
+
+ROUTES = {
+    ('POST', '/predict'): predict,
+    ('POST', '/v1/predict'): predict_json,
+    ('GET', '/health'): health,
+    ('GET', '/ready'): ready,
+    ('GET', '/metrics'): metrics,
+}
+
+# requests currently being handled / turned away at MAX_INFLIGHT; only touched from the event loop
+inflight = 0
+rejected = 0
+
+
+async def app(scope, receive, send):
+    global inflight, rejected
+
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    if scope['type'] != 'http':
+        return
+
+    route = ROUTES.get((scope['method'], scope['path']))
+    if route is None:
+        await send_json(send, 404, {'error': 'not found'})
+        return
+
+    if inflight >= MAX_INFLIGHT:
+        rejected += 1
+        await send_json(send, 503, {'error': 'server is at capacity, retry later'}, [(b'retry-after', b'1')])
+        return
+
+    inflight += 1
+    try:
+        await route(scope, receive, send)
+    except HTTPError as e:
+        if e.status != 499:
+            await send_json(send, e.status, {'error': str(e)})
+    except ModelNotReadyError as e:
+        await send_json(send, 503, {'error': str(e)})
+    # what asyncio.wait_for raises, not the builtin TimeoutError before Python 3.11
+    except asyncio.TimeoutError:
+        await send_json(send, 503, {'error': f'prediction not ready after {BATCH_TIMEOUT:g}s, retry later'})
+    finally:
+        inflight -= 1
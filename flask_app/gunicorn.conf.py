@@ -0,0 +1,30 @@
+# gunicorn settings for the serving image: `gunicorn -c gunicorn.conf.py app:app`
+#
+# The app (normalizer, vectorizer, model) is imported once in the master and the
+# workers are forked from it, so they share those pages copy-on-write instead of
+# each downloading and unpickling their own copy. The scoring arrays are also
+# memory-mapped from ARTIFACT_CACHE_DIR, which keeps them shared even after a
+# hot swap. gc.freeze() moves everything loaded so far out of the collector's
+# reach, so a collection in a worker does not write to (and un-share) them.
+
+import gc
+import os
+import multiprocessing
+
+bind = os.getenv("BIND", "0.0.0.0:5000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+preload_app = os.getenv("PRELOAD_APP", "1") != "0"
+
+if preload_app:
+    # load the model in the master before forking, rather than in a background thread
+    os.environ.setdefault("MODEL_WARMUP", "eager")
+    os.environ.setdefault("ARTIFACT_CACHE_DIR", "/tmp/model-artifacts")
+
+
+def pre_fork(server, worker):
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    server.log.info("worker %s forked from preloaded master", worker.pid)
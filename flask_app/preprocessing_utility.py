@@ -4,19 +4,21 @@ import os
 import re
 import nltk
 import string
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
+from src.data.text_normalizer import TextNormalizer
+
+# stopword set, lemmatizer and lemma cache shared by every helper below
+normalizer = TextNormalizer(lemma_cache_path=os.getenv("LEMMA_CACHE_PATH", "models/lemma_cache.json"))
 
 def lemmatization(text):
     """Lemmatize the text."""
-    lemmatizer = WordNetLemmatizer()
+    lemmatize = normalizer.lemma_cache
     text = text.split()
-    text = [lemmatizer.lemmatize(word) for word in text]
+    text = [lemmatize(word) for word in text]
     return " ".join(text)
 
 def remove_stop_words(text):
     """Remove stop words from the text."""
-    stop_words = set(stopwords.words("english"))
+    stop_words = normalizer.stop_words
     text = [word for word in str(text).split() if word not in stop_words]
     return " ".join(text)
 
@@ -43,18 +45,11 @@ def removing_urls(text):
     url_pattern = re.compile(r'https?://\S+|www\.\S+')
     return url_pattern.sub(r'', text)
 
-def remove_small_sentences(df):
-    """Remove sentences with less than 3 words."""
-    for i in range(len(df)):
-        if len(df.text.iloc[i].split()) < 3:
-            df.text.iloc[i] = np.nan
+def remove_small_sentences(df, column='text', min_words=3):
+    """Remove sentences with less than `min_words` words (set them to NaN), returns the frame."""
+    word_counts = df[column].map(lambda text: len(text.split()), na_action='ignore')
+    df.loc[word_counts < min_words, column] = np.nan
+    return df
 
 def normalize_text(text):
-    text = lower_case(text)
-    text = remove_stop_words(text)
-    text = removing_numbers(text)
-    text = removing_punctuations(text)
-    text = removing_urls(text)
-    text = lemmatization(text)
-
-    return text
\ No newline at end of file
+    return normalizer(text)
@@ -0,0 +1,67 @@
+import os
+import shutil
+import hashlib
+import numpy as np
+
+#------------------------------Versioned arrays-----------------------------------------------------
+# Artifacts that running servers memory-map (scoring arrays, vocabulary) are never rewritten in
+# place: a shorter file under a live mapping kills the worker with SIGBUS, a longer one silently
+# changes what it scores with. Each save goes to a subdirectory named by the content digest of
+# its arrays and the CURRENT marker naming it is replaced last.
+
+# names the version subdirectory readers use; replaced last by `save_versioned_arrays`
+MARKER = "CURRENT"
+
+
+def saved_version(directory: str):
+    """Version `save_versioned_arrays` last wrote to `directory`, None when there is no marker."""
+    try:
+        with open(os.path.join(directory, MARKER), 'r') as file:
+            return file.read().strip() or None
+    except OSError:
+        return None
+
+
+def versioned_dir(directory: str) -> str:
+    """Subdirectory holding the current arrays of `directory`."""
+    version = saved_version(directory)
+    if version is None:
+        raise FileNotFoundError(f"no versioned arrays saved under {directory}")
+    return os.path.join(directory, version)
+
+
+def save_versioned_arrays(directory: str, arrays: dict) -> str:
+    """Write {file name: array} as .npy files under a new version of `directory`, returns the version.
+
+    A reader sees the previous arrays or the new ones, never a mix. The previous version is kept for
+    readers that read the marker just before it changed; older ones are removed. Saving the same
+    arrays again (every worker sharing one directory) reuses the files in place."""
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha256()
+    for name, array in arrays.items():
+        digest.update(name.encode())
+        digest.update(np.ascontiguousarray(array).tobytes())
+    version = digest.hexdigest()[:16]
+    version_dir = os.path.join(directory, version)
+
+    os.makedirs(version_dir, exist_ok=True)
+    for name, array in arrays.items():
+        path = os.path.join(version_dir, name)
+        if not os.path.exists(path):
+            tmp_path = os.path.join(version_dir, f".{name}.tmp-{os.getpid()}")
+            with open(tmp_path, 'wb') as file:
+                np.save(file, array)
+            os.replace(tmp_path, path)
+
+    previous = saved_version(directory)
+    if previous != version:
+        tmp_marker = os.path.join(directory, f".{MARKER}.tmp-{os.getpid()}")
+        with open(tmp_marker, 'w') as file:
+            file.write(version)
+        os.replace(tmp_marker, os.path.join(directory, MARKER))
+
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if os.path.isdir(path) and name not in (version, previous):
+            shutil.rmtree(path, ignore_errors=True)
+    return version
@@ -2,47 +2,126 @@ import pandas as pd
 import numpy as np
 import os
 import sys
-from sklearn.model_selection import train_test_split
+import hashlib
 from src.logger import file_logging, console_logging
-from src.utils import load_params,load_data,save_data
+from src.utils import load_params,load_data_chunks,data_file,TableWriter
 #from src.exception import CustomException
 from src.exception import CustomException
 
 file_logger=file_logging("Data Ingestion")
 
+# tables a source directory may hold, read in sorted order
+SOURCE_EXTENSIONS=('.csv','.csv.gz','.parquet','.pq','.feather','.arrow')
+
+# columns written to data/raw
+RAW_COLUMNS=['sentiment','author','content']
+
+# resolution of the train/test ratio: keys are hashed into this many buckets
+HASH_BUCKETS=1_000_000
+
+
+
+def list_sources(source: str) -> list:
+    """The table files behind `source`: a URL or file as is, every table file of a directory (recursively, sorted)."""
+    if not os.path.isdir(source):
+        return [source]
+    return sorted(
+        os.path.join(root,name) for root,_,names in os.walk(source) for name in names
+        if name.lower().endswith(SOURCE_EXTENSIONS)
+    )
 
 
 def preprocess_data(df: pd.DataFrame) -> pd.DataFrame:
-    """Preprocess the data."""
+    """Preprocess the data: keep happiness/sadness rows and map them to 1/0."""
     try:
-        df.drop(columns=['tweet_id'], inplace=True)
-        final_df = df[df['sentiment'].isin(['happiness', 'sadness'])]
-        final_df['sentiment'].replace({'happiness': 1, 'sadness': 0}, inplace=True)
+        final_df = df[df['sentiment'].isin(['happiness', 'sadness'])].copy()
+        final_df['sentiment'] = final_df['sentiment'].map({'happiness': 1, 'sadness': 0})
         file_logger.info('Data preprocessing completed')
         return final_df
     except Exception as e:
         file_logger.error(f"Error has been occured into preprocessing funcstion in data ingestion module & the error is {e}")
         raise CustomException(e,sys)
-    
-def main():
-    """This is the main function for data ingestion"""
 
-    file_logger.info("Now in Data Ingestion module....")
+
+def _content_keys(df: pd.DataFrame) -> pd.Series:
+    return 'content:'+df['content'].fillna('').astype(str)
+
+
+def split_keys(df: pd.DataFrame) -> pd.Series:
+    """Key a row is split on: its tweet_id, or its content when the id is missing (or there is no tweet_id column)."""
+    if 'tweet_id' not in df.columns:
+        return _content_keys(df)
+
+    ids=df['tweet_id']
+    if pd.api.types.is_float_dtype(ids):
+        # ids of a column with gaps are read as floats, 1956967341.0 must key like 1956967341
+        ids=ids.astype('Int64')
+    keys=ids.astype(str).str.strip().where(ids.notna(), '')
+    missing=(keys=='').values
+    if missing.any():
+        keys=keys.astype(object)
+        keys[missing]=_content_keys(df[missing]).values
+    return keys
+
+
+def split_buckets(keys: pd.Series) -> np.ndarray:
+    """Bucket of every key in [0, HASH_BUCKETS): blake2b, so it is the same on every platform and library version."""
+    digests=b''.join([hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest() for key in keys.tolist()])
+    return np.frombuffer(digests, dtype='<u8') % HASH_BUCKETS
+
+
+def hash_split(df: pd.DataFrame, test_size: float) -> np.ndarray:
+    """True for the rows that go to test. The assignment depends on nothing but the row key, so a row always
+    lands in the same split whatever chunk, file or run it arrives in: growing the source only ever appends
+    rows to train or test, existing rows never move."""
+    return split_buckets(split_keys(df)) < int(round(test_size*HASH_BUCKETS))
+
+
+def ingest(source: str, train_path: str, test_path: str, test_size: float, chunk_size: int,
+           compression: str = None) -> dict:
+    """Stream `source` chunk by chunk into the train/test tables; only one chunk is in memory at a time."""
+    file_logger.info(f"In ingest function from data ingestion module, source is {source}....")
+
     try:
-        url='https://raw.githubusercontent.com/campusx-official/jupyter-masterclass/main/tweet_emotions.csv'
-        df=load_data(url)
-        file_logger.info("successfully load data.")
+        sources=list_sources(source)
+        if not sources:
+            raise FileNotFoundError(f"no {', '.join(SOURCE_EXTENSIONS)} files under {source}")
+
+        counts={'read':0,'train':0,'test':0}
+        with TableWriter(train_path,RAW_COLUMNS,compression) as train_writer, \
+             TableWriter(test_path,RAW_COLUMNS,compression) as test_writer:
+            for path in sources:
+                for chunk in load_data_chunks(path,chunk_size):
+                    counts['read']+=len(chunk)
+                    chunk=preprocess_data(chunk)
+                    is_test=hash_split(chunk,test_size)
+                    train_writer.write(chunk[~is_test])
+                    test_writer.write(chunk[is_test])
+                file_logger.info(f"successfully ingested {path}")
+            counts['train'],counts['test']=train_writer.rows,test_writer.rows
+
+        file_logger.info(f"Ingestion done: {counts}")
+        return counts
 
-        final_df=preprocess_data(df)
-        file_logger.info("successfully preprocessed data.")
+    except Exception as e:
+        file_logger.error(f"In ingest function from data ingestion, error has been ocurred & error is {e}")
+        raise CustomException(e,sys)
 
-        params=load_params()
-        test_size=params['data_ingestion']['test_size']
 
-        train_data,test_data= train_test_split(final_df, test_size=test_size, random_state=42)
+def main():
+    """This is the main function for data ingestion"""
+
+    file_logger.info("Now in Data Ingestion module....")
+    try:
+        all_params=load_params()
+        params=all_params['data_ingestion']
+        data_io=all_params['data_io']
 
-        save_data(train_data,file_path="./data/raw/train_raw.csv")
-        save_data(test_data,file_path="./data/raw/test_raw.csv")
+        counts=ingest(params['source'],
+                      data_file("./data/raw/train_raw",data_io['format']),
+                      data_file("./data/raw/test_raw",data_io['format']),
+                      params['test_size'],params['chunk_size'],data_io['compression'])
+        print(f"Ingested {counts['read']} rows: {counts['train']} train, {counts['test']} test")
         file_logger.info("successfully creted raw data & add to raw folder.")
 
     except Exception as e:
@@ -53,4 +132,4 @@ def main():
 if __name__=="__main__":
 
     main()
-    print("Everything of Data ingestion is done")
\ No newline at end of file
+    print("Everything of Data ingestion is done")
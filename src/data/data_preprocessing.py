@@ -3,13 +3,18 @@ import pandas as pd
 import os
 import sys
 import re
+import time
 import nltk
 import string
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
+from itertools import chain
+from concurrent.futures import ProcessPoolExecutor
 from src.logger import file_logging, console_logging
-from src.utils import load_params,load_data,save_data
+from src.utils import (load_params,load_data,save_data,append_data,data_file,StageCache,row_hashes,stage_fingerprint,
+                       processed_rows,save_manifest,resolve_n_workers)
 from src.exception import CustomException
+from src import utils
+from src.data import text_normalizer
+from src.data.text_normalizer import init_normalizer, get_normalizer
 
 #------------------------configuration----------------------------------------------------
 file_logger=file_logging("Data Preprocessing")
@@ -24,9 +29,9 @@ def lemmatization(text):
     file_logger.info("In lemmatization function from data preprocessing module....")
 
     try:
-        lemmatizer = WordNetLemmatizer()
+        lemmatize = get_normalizer().lemma_cache
         text = text.split()
-        text = [lemmatizer.lemmatize(word) for word in text]
+        text = [lemmatize(word) for word in text]
 
         file_logger.info("lemmatization has been successfully done.....")
         return " ".join(text)
@@ -41,7 +46,7 @@ def remove_stop_words(text):
     file_logger.info("In remove_stop_words function from data preprocessing module....")
 
     try:
-        stop_words = set(stopwords.words("english"))
+        stop_words = get_normalizer().stop_words
         text = [word for word in str(text).split() if word not in stop_words]
 
         file_logger.info("remove_stop_words has been successfully done.....")
@@ -110,35 +115,39 @@ def removing_urls(text):
         file_logger.error(f"In removing_urls function from data preprocessing error has been ocurred & error is {e}")
         raise CustomException(e,sys)
 
-def remove_small_sentences(df):
-    """Remove sentences with less than 3 words."""
+def remove_small_sentences(df, column: str = 'text', min_words: int = 3):
+    """Remove sentences with less than `min_words` words (set them to NaN), returns the frame."""
     file_logger.info("In remove_small_sentences function from data preprocessing module....")
     try:
-        for i in range(len(df)):
-            if len(df.text.iloc[i].split()) < 3:
-                df.text.iloc[i] = np.nan
+        # one pass over the column and a single masked assignment; missing texts stay missing.
+        # str.split (not a \S+ regex) so the count matches the old loop for any unicode whitespace
+        word_counts = df[column].map(lambda text: len(text.split()), na_action='ignore')
+        df.loc[word_counts < min_words, column] = np.nan
 
         file_logger.info("remove_small_sentences has been successfully done.....")
+        return df
     
     except Exception as e:
         file_logger.error(f"In remove_small_sentences function from data preprocessing error has been ocurred & error is {e}")
         raise CustomException(e,sys)
 
+def drop_small_sentences(df, min_words: int):
+    """Optional preprocessing step: drop rows whose normalized content has less than `min_words` words."""
+    if not min_words:
+        return df
+    n_rows = len(df)
+    df = remove_small_sentences(df, 'content', min_words).dropna(subset=['content'])
+    file_logger.info(f"Dropped {n_rows - len(df)} of {n_rows} rows with less than {min_words} words")
+    return df
+
 def normalize_text(df):
     """Normalize the text data."""
     file_logger.info("In normalize_text function from data preprocessing module....")
 
     try:
-        df['content'] = df['content'].apply(lower_case)
-        df['content'] = df['content'].apply(remove_stop_words)
-        
-        df['content'] = df['content'].apply(removing_numbers)
-        
-        df['content'] = df['content'].apply(removing_punctuations)
-        
-        df['content'] = df['content'].apply(removing_urls)
-        
-        df['content'] = df['content'].apply(lemmatization)
+        # one pass per document, same output as chaining lower_case, remove_stop_words,
+        # removing_numbers, removing_punctuations, removing_urls and lemmatization
+        df['content'] = df['content'].map(get_normalizer())
         
         file_logger.info("normalize_text has been successfully done.....")   
         return df
@@ -147,49 +156,124 @@ def normalize_text(df):
         file_logger.error(f"In normalize_text function from data preprocessing error has been ocurred & error is {e}")
         raise CustomException(e,sys)
 
-#--------------------------------------Main function----------------------------------------
+def _init_worker(lemma_cache_size: int, lemma_cache_path: str) -> None:
+    """Pool initializer: load stopwords, WordNetLemmatizer and the lemma cache once per worker."""
+    init_normalizer(lemma_cache_size, lemma_cache_path).lemma_cache.track_fresh()
 
-def main():
-    """This is the main function for data preprocessing"""
-    file_logger.info("Now in Data preprocessing module....")
+def _normalize_chunk(texts: list) -> tuple:
+    """Worker side: normalize one chunk and hand back the lemmas it had to compute."""
+    normalizer = get_normalizer()
+    return normalizer.normalize_many(texts), normalizer.lemma_cache.pop_fresh()
+
+def normalize_text_parallel(df, n_workers: int, chunk_size: int):
+    """Normalize the text data in chunks on a process pool, keeping the row order."""
+    file_logger.info("In normalize_text_parallel function from data preprocessing module....")
 
     try:
-        # Fetch the data from data/raw
-        file_logger.info("Fetching all the data from data/raw folder....")
+        texts = df['content'].tolist()
+        chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+        n_workers = min(resolve_n_workers(n_workers), max(len(chunks), 1))
+
+        if n_workers == 1:
+            return normalize_text(df)
+
+        # executor.map yields chunk results in submission order; lemmas learned by the
+        # workers are merged back so the parent can persist them
+        normalizer = get_normalizer()
+        initargs = (normalizer.lemma_cache.maxsize, normalizer.lemma_cache_path)
+        normalized = []
 
-        train_data=load_data('./data/raw/train_raw.csv')
-        test_data=load_data('./data/raw/test_raw.csv')
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=initargs) as executor:
+            for texts, fresh in executor.map(_normalize_chunk, chunks):
+                normalized.append(texts)
+                normalizer.lemma_cache.update(fresh)
 
-        file_logger.info("Successfully fetched data from data/raw folder......")
+        df['content'] = list(chain.from_iterable(normalized))
 
-        #filling missing values
-        file_logger.info("filling missing values in train & test data....")
+        file_logger.info(f"normalize_text_parallel has been successfully done with {n_workers} workers & {len(chunks)} chunks.....")
+        return df
+
+    except Exception as e:
+        file_logger.error(f"In normalize_text_parallel function from data preprocessing error has been ocurred & error is {e}")
+        raise CustomException(e,sys)
 
-        #train_data.fillna('',inplace=True)
-        #test_data.fillna('',inplace=True)
+#--------------------------------------Main function----------------------------------------
+
+def interim_paths(split:str,data_format:str)->tuple:
+    """(raw input, interim output, row manifest) of one split."""
+    return (data_file(f'./data/raw/{split}_raw',data_format),
+            data_file(f'./data/interim/{split}_processed',data_format),
+            f'./data/interim/{split}_manifest.npz')
 
-        #train_data = train_data.fillna('').astype(str)
-        #test_data = test_data.fillna('').astype(str)
 
-        file_logger.info("Successfully filled missing value with ''......")
+def preprocess(params:dict,data_io:dict)->None:
+    """data/raw -> normalized (and optionally filtered) data/interim, saving the lemma cache.
 
-        # Transform the data
-        file_logger.info("Normalizing train & test data....")
+    Raw rows already normalized by an earlier run (row manifest next to the output, same params and
+    code) are skipped and only the new rows are normalized and appended, which gives the same
+    table as normalizing everything again."""
+    data_format=data_io['format']
+    fingerprint=stage_fingerprint({'min_words':params['min_words'],'format':data_format,'compression':data_io['compression']},
+                                  [__file__, text_normalizer.__file__])
 
-        train_processed_data = normalize_text(train_data)
-        test_processed_data = normalize_text(test_data)
+    n_workers=resolve_n_workers(params['n_workers'])
+    chunk_size=params['chunk_size']
+    normalizer=init_normalizer(params['lemma_cache_size'], params['lemma_cache_path'])
 
-        file_logger.info("Successfully normalized train & test data......")
+    start=time.perf_counter()
+    n_rows=0
+    for split in ('train','test'):
+        raw_path,interim_path,manifest_path=interim_paths(split,data_format)
+
+        # Fetch the data from data/raw
+        file_logger.info(f"Fetching {split} data from data/raw folder....")
+        raw_data=load_data(raw_path,memory_map=data_io['memory_map'])
+        hashes=row_hashes(raw_data,list(raw_data.columns))
+        done=processed_rows(manifest_path,fingerprint,hashes) if os.path.exists(interim_path) else 0
+        if done and done==len(raw_data):
+            file_logger.info(f"{split}: all {done} rows already in {interim_path}")
+            continue
+
+        # Transform the new rows, optionally dropping those left with fewer than min_words words (0 keeps every row)
+        file_logger.info(f"Normalizing {len(raw_data)-done} new of {len(raw_data)} {split} rows....")
+        processed_data = normalize_text_parallel(raw_data.iloc[done:].copy(), n_workers, chunk_size)
+        processed_data = drop_small_sentences(processed_data, params['min_words'])
+        n_rows+=len(raw_data)-done
 
         # Store the data inside data/interim
-        file_logger.info("Storing train & test data into interim folder....")
+        if done:
+            append_data(processed_data,interim_path,compression=data_io['compression'])
+        else:
+            save_data(processed_data,file_path=interim_path,compression=data_io['compression'])
+        save_manifest(manifest_path,fingerprint,hashes)
+        file_logger.info(f"successfully stored preprocessed {split} data into {interim_path}")
 
-        
+    elapsed=time.perf_counter()-start
+    throughput=f"{n_rows} new rows in {elapsed:.2f}s ({n_rows/max(elapsed, 1e-9):.0f} rows/s) with {n_workers} workers"
+    file_logger.info(f"Successfully normalized train & test data, {throughput}......")
+
+    normalizer.save_lemma_cache()
+    file_logger.info(f"lemma cache stats {normalizer.lemma_cache.stats()} saved to {params['lemma_cache_path']}")
 
-        save_data(train_processed_data,file_path="./data/interim/train_processed.csv")
-        save_data(test_processed_data,file_path="./data/interim/test_processed.csv")
 
-        file_logger.info("successfully stored preprocessed data into data/exterim folder")
+def main():
+    """This is the main function for data preprocessing"""
+    file_logger.info("Now in Data preprocessing module....")
+
+    try:
+        all_params=load_params()
+        params=all_params['data_preprocessing']
+        data_io=all_params['data_io']
+        data_format=data_io['format']
+        paths=[interim_paths(split,data_format) for split in ('train','test')]
+
+        # the lemma cache only speeds normalization up, so it is neither part of the key nor of the outputs;
+        # n_workers / chunk_size / memory_map do not change the result either
+        StageCache().run('data_preprocessing', lambda: preprocess(params,data_io),
+                         inputs=[raw_path for raw_path,_,_ in paths],
+                         outputs=[path for _,interim_path,manifest_path in paths for path in (interim_path,manifest_path)],
+                         params={'min_words':params['min_words'],'format':data_format,'compression':data_io['compression']},
+                         code=[__file__, text_normalizer.__file__, utils.__file__])
     
     except Exception as e:
         file_logger.error(f"Error has been occured into main function in data preprocessing module & the error is {e}")
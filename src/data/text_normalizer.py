@@ -0,0 +1,176 @@
+import os
+import sys
+import json
+import string
+from collections import OrderedDict
+from nltk.corpus import stopwords
+from nltk.stem import WordNetLemmatizer
+
+#------------------------configuration----------------------------------------------------
+
+# Characters dropped by `removing_numbers` (anything `str.isdigit` accepts, superscripts included).
+DIGITS = "".join(chr(code) for code in range(sys.maxunicode + 1) if chr(code).isdigit())
+
+DEFAULT_LEMMA_CACHE_SIZE = 100000
+
+# the normalizer of this process, built by `init_normalizer` (once per worker in a process pool)
+_normalizer = None
+
+#----------------------------- Lemma cache------------------------------------------------
+
+class LemmaCache:
+    """Bounded LRU memo of token -> lemma in front of WordNetLemmatizer.lemmatize.
+
+    Tweet vocabularies are Zipfian, so a small cache absorbs almost every lookup.
+    The cache can be saved to / loaded from a JSON file to warm start a process.
+    """
+
+    def __init__(self, lemmatize, maxsize: int = DEFAULT_LEMMA_CACHE_SIZE):
+        self.lemmatize = lemmatize
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._fresh = None
+
+    def __call__(self, word: str) -> str:
+        entries = self._entries
+        try:
+            lemma = entries[word]
+        except KeyError:
+            self.misses += 1
+            lemma = self.lemmatize(word)
+            entries[word] = lemma
+            if self._fresh is not None:
+                self._fresh[word] = lemma
+            if len(entries) > self.maxsize:
+                entries.popitem(last=False)
+            return lemma
+
+        self.hits += 1
+        try:
+            entries.move_to_end(word)
+        except KeyError:
+            # evicted by another thread in between, the lemma is still right
+            pass
+        return lemma
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def update(self, entries: dict) -> None:
+        """Add already computed lemmas (e.g. learned by a worker process)."""
+        for word, lemma in entries.items():
+            self._entries[word] = lemma
+            self._entries.move_to_end(word)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def track_fresh(self) -> None:
+        """Start remembering newly computed entries for `pop_fresh`."""
+        if self._fresh is None:
+            self._fresh = {}
+
+    def pop_fresh(self) -> dict:
+        """Return and forget the entries computed since the last call (needs `track_fresh`)."""
+        fresh = self._fresh or {}
+        if self._fresh is not None:
+            self._fresh = {}
+        return fresh
+
+    def save(self, file_path: str) -> None:
+        """Write the entries, least recently used first, to a JSON file."""
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = f"{file_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(self._entries, file, ensure_ascii=False)
+        os.replace(tmp_path, file_path)
+
+    def load(self, file_path: str) -> None:
+        """Warm the cache from a JSON file written by `save`."""
+        with open(file_path, 'r', encoding='utf-8') as file:
+            self.update(json.load(file))
+
+#----------------------------- Normalizer-------------------------------------------------
+
+class TextNormalizer:
+    """Single pass replacement for the chained preprocessing helpers.
+
+    Produces exactly what lower_case -> remove_stop_words -> removing_numbers ->
+    removing_punctuations -> removing_urls -> lemmatization produce, but splits each
+    document once and builds the stopword set, lemmatizer and character table once.
+    Lemmas go through a LemmaCache, warm started from `lemma_cache_path` if it exists.
+    """
+
+    def __init__(self, stop_words=None, lemmatizer=None,
+                 lemma_cache_size: int = DEFAULT_LEMMA_CACHE_SIZE, lemma_cache_path: str = None):
+        if stop_words is None:
+            stop_words = stopwords.words("english")
+
+        self.stop_words = frozenset(stop_words)
+        self.lemmatizer = lemmatizer if lemmatizer is not None else WordNetLemmatizer()
+        self.lemma_cache = LemmaCache(self.lemmatizer.lemmatize, lemma_cache_size)
+        self.lemma_cache_path = lemma_cache_path
+
+        if lemma_cache_path and os.path.exists(lemma_cache_path):
+            self.lemma_cache.load(lemma_cache_path)
+
+        # digits are deleted, ASCII punctuation becomes a space and '؛' is deleted
+        table = {ord(char): None for char in DIGITS}
+        table.update({ord(char): " " for char in string.punctuation})
+        table[ord('؛')] = None
+        self.translation_table = table
+
+    def __call__(self, text: str) -> str:
+        """Normalize one document."""
+        stop_words = self.stop_words
+
+        words = [word for word in (token.lower() for token in text.split()) if word not in stop_words]
+
+        # Splitting again collapses the whitespace left behind by the translation, like
+        # re.sub('\s+', ' ', text).strip() does. The URL pattern of `removing_urls` needs
+        # ':' or '.', which are already gone at this point, so it never matches here.
+        words = " ".join(words).translate(self.translation_table).split()
+
+        lemmatize = self.lemma_cache
+        return " ".join([lemmatize(word) for word in words])
+
+    def normalize_many(self, texts) -> list:
+        """Normalize an iterable of documents."""
+        return [self(text) for text in texts]
+
+    def save_lemma_cache(self) -> None:
+        """Persist the lemma cache to `lemma_cache_path`, if one was given."""
+        if self.lemma_cache_path:
+            self.lemma_cache.save(self.lemma_cache_path)
+
+
+#----------------------------- Process wide normalizer------------------------------------
+
+def init_normalizer(lemma_cache_size: int = DEFAULT_LEMMA_CACHE_SIZE, lemma_cache_path: str = None) -> TextNormalizer:
+    """Build the process wide TextNormalizer, warm starting its lemma cache from `lemma_cache_path`."""
+    global _normalizer
+
+    _normalizer = TextNormalizer(lemma_cache_size=lemma_cache_size, lemma_cache_path=lemma_cache_path)
+    return _normalizer
+
+
+def get_normalizer() -> TextNormalizer:
+    """Return the process wide TextNormalizer, building it on first use."""
+    if _normalizer is None:
+        init_normalizer()
+    return _normalizer
@@ -2,9 +2,18 @@ import numpy as np
 import pandas as pd
 import os
 import sys
+import shutil
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from scipy import sparse
 from sklearn.feature_extraction.text import TfidfVectorizer,CountVectorizer
 from src.logger import file_logging, console_logging
-from src.utils import load_params,load_data,save_data
+from src.utils import (load_params,load_data,save_sparse_data,load_sparse_data,load_data_chunks,processed_data_path,
+                       labels_path,list_sparse_shards,data_file,StageCache,row_hashes,table_row_hashes,stage_fingerprint,
+                       processed_rows,save_manifest,manifest_path)
+from src import utils, artifacts
+from src.features import vectorizers
+from src.features.vectorizers import build_hashing_vectorizer,save_vectorizer_spec,save_vocabulary
 from src.exception import CustomException
 import yaml
 import pickle
@@ -12,11 +21,13 @@ import pickle
 #------------------------------Configuration--------------------------------------------------------
 file_logger=file_logging("Feature Engineering")
 
+VOCABULARY_DIR='models/vocabulary'
+
 
 #------------------------------Functions------------------------------------------------------------
 
 def apply_bow(train_data: pd.DataFrame, test_data: pd.DataFrame, max_features: int)->tuple:
-    """apply BoW (Bag of words) into datasets."""
+    """apply BoW (Bag of words) into datasets, returns sparse (X_train, y_train, X_test, y_test) and the fitted vectorizer."""
     file_logger.info("In apply_bow function from feature engineering module....")
 
     try:
@@ -34,41 +45,246 @@ def apply_bow(train_data: pd.DataFrame, test_data: pd.DataFrame, max_features: i
         X_train_bow=vectorizer.fit_transform(X_train)
         X_test_bow=vectorizer.transform(X_test)
 
-        train_df=pd.DataFrame(X_train_bow.toarray())
-        train_df['label']=y_train
-
-        test_df=pd.DataFrame(X_test_bow.toarray())
-        test_df['label']=y_test
-
-        pickle.dump(vectorizer, open('models/vectorizer.pkl', 'wb'))
-
         file_logger.info('Successfully Bag of Words applied and data transformed')
-        return train_df, test_df
+        return X_train_bow, y_train, X_test_bow, y_test, vectorizer
     
     except Exception as e:
         file_logger.error(f"In apply_bow function from feature engineering, error has been ocurred & error is {e}")
         raise CustomException(e,sys)
     
-#----------------------------------Main Function------------------------------------------------
-
-def main():
-    """This is the main function for feature engineering"""
-    file_logger.info("Now in feature engineering module....")
+def _hash_shard(texts: list, labels: np.ndarray, n_features: int, shard_path: str) -> int:
+    """Hash one chunk of documents and write it as a sparse shard, returns the row count."""
+    X = build_hashing_vectorizer(n_features).transform(texts)
+    save_sparse_data(X, labels, file_path=shard_path)
+    return len(labels)
+
+def _exact_chunks(chunks, chunk_size: int, skip_rows: int = 0):
+    """Regroup a stream of frames into frames of exactly `chunk_size` rows (the last may be shorter) after
+    dropping the first `skip_rows` rows, so shard boundaries depend only on row positions."""
+    buffer, buffered = [], 0
+    for chunk in chunks:
+        if skip_rows:
+            if len(chunk) <= skip_rows:
+                skip_rows -= len(chunk)
+                continue
+            chunk, skip_rows = chunk.iloc[skip_rows:], 0
+        buffer.append(chunk)
+        buffered += len(chunk)
+        while buffered >= chunk_size:
+            frame = pd.concat(buffer, ignore_index=True)
+            yield frame.iloc[:chunk_size]
+            rest = frame.iloc[chunk_size:]
+            buffer, buffered = ([rest] if len(rest) else []), len(rest)
+    if buffered:
+        yield pd.concat(buffer, ignore_index=True)
+
+def apply_hashing(data_path: str, output_dir: str, n_features: int, chunk_size: int, n_workers: int = 1,
+                  memory_map: bool = False, skip_rows: int = 0) -> int:
+    """Stream `data_path` in chunks through the hashing vectorizer into shard-*.npz files under `output_dir`.
+
+    Only a bounded number of chunks is held at any time, so memory does not grow with the data;
+    with n_workers > 1 the shards are hashed and written in parallel. With `skip_rows` (a multiple of
+    `chunk_size`) the shards of those rows are kept and only the rows after them are hashed."""
+    file_logger.info("In apply_hashing function from feature engineering module....")
 
     try:
-        params=load_params()
-        max_features=params['feature_engineering']['max_features']
-        file_logger.info("params.yaml file has been loaded successfully & max_features has been extracted.")
+        first_shard = skip_rows // chunk_size
+        if first_shard == 0:
+            shutil.rmtree(output_dir, ignore_errors=True)
+        os.makedirs(output_dir, exist_ok=True)
+        for shard in list_sparse_shards(output_dir)[first_shard:]:
+            os.remove(shard)
+            os.remove(labels_path(shard))
+
+        n_rows = 0
+        chunks = _exact_chunks(load_data_chunks(data_path, chunk_size, ['content', 'sentiment'], memory_map),
+                               chunk_size, first_shard * chunk_size)
+        shards = (
+            (chunk['content'].fillna('').tolist(), chunk['sentiment'].values, n_features,
+             os.path.join(output_dir, f"shard-{i:05d}.npz"))
+            for i, chunk in enumerate(chunks, start=first_shard)
+        )
+
+        if n_workers <= 1:
+            for shard in shards:
+                n_rows += _hash_shard(*shard)
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                pending = deque()
+                for shard in shards:
+                    pending.append(executor.submit(_hash_shard, *shard))
+                    if len(pending) >= 2 * n_workers:
+                        n_rows += pending.popleft().result()
+                while pending:
+                    n_rows += pending.popleft().result()
+
+        file_logger.info(f"Successfully hashed {n_rows} rows from {data_path} into {output_dir}")
+        return n_rows
+
+    except Exception as e:
+        file_logger.error(f"In apply_hashing function from feature engineering, error has been ocurred & error is {e}")
+        raise CustomException(e,sys)
 
-        train_data=load_data('./data/interim/train_processed.csv') 
-        test_data=load_data('./data/interim/test_processed.csv')
+#----------------------------------Main Function------------------------------------------------
+
+def load_frozen_vectorizer(max_features: int):
+    """The CountVectorizer of an earlier run when it was built for `max_features`, else None."""
+    try:
+        with open('models/vectorizer.pkl', 'rb') as file:
+            vectorizer = pickle.load(file)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    if isinstance(vectorizer, CountVectorizer) and hasattr(vectorizer, 'vocabulary_') \
+            and vectorizer.max_features == max_features:
+        return vectorizer
+    return None
+
+
+def bow_fingerprint(max_features: int) -> str:
+    """Bag of words features of a row depend on the params, the code and the fitted vectorizer."""
+    return stage_fingerprint({'method':'bow','max_features':max_features},
+                             [__file__, vectorizers.__file__, 'models/vectorizer.pkl'])
+
+
+def build_features(params:dict,data_io:dict)->None:
+    """data/interim -> data/processed features plus the vectorizer artifacts under models/.
+
+    Rows already featurized by an earlier run (row manifest next to the features, same params, code and
+    vectorizer) are not transformed again: hashing re-hashes from the last incomplete shard on, bag of
+    words with `freeze_vocabulary` keeps the fitted vocabulary and appends the new rows, both giving
+    exactly the features a full rebuild with that vocabulary gives."""
+    method=params['method']
+
+    def interim_path(split):
+        return data_file(f'./data/interim/{split}_processed',data_io['format'])
+
+    def interim_rows(split):
+        data=load_data(interim_path(split),['content','sentiment'],data_io['memory_map'])
+        return data,row_hashes(data,['content','sentiment'])
+
+    def interim_hashes(split):
+        # same hashes as interim_rows, without holding the whole table
+        return table_row_hashes(interim_path(split),['content','sentiment'],params['chunk_size'],data_io['memory_map'])
+
+    def new_interim_chunks(split,skip_rows):
+        return _exact_chunks(load_data_chunks(interim_path(split),params['chunk_size'],['content','sentiment'],
+                                              data_io['memory_map']),params['chunk_size'],skip_rows)
+
+    def done_rows(split,fingerprint,hashes):
+        path=processed_data_path(split,method)
+        return processed_rows(manifest_path(path),fingerprint,hashes) if os.path.exists(path) else 0
+
+    file_logger.info(f"feature engineering method is {method}.")
+
+    if method=='hashing':
+        n_features,chunk_size=params['n_features'],params['chunk_size']
+        fingerprint=stage_fingerprint({'method':method,'n_features':n_features,'chunk_size':chunk_size},
+                                      [__file__, vectorizers.__file__])
+        for split in ('train','test'):
+            hashes=interim_hashes(split)
+            done=done_rows(split,fingerprint,hashes)
+            if done and done==len(hashes):
+                file_logger.info(f"{split}: all {done} rows already hashed")
+                continue
+
+            # the last, incomplete shard is hashed again so the shards match a full rebuild
+            output_dir=processed_data_path(split,method)
+            apply_hashing(interim_path(split), output_dir, n_features, chunk_size, params['n_workers'],
+                          data_io['memory_map'], skip_rows=done//chunk_size*chunk_size)
+            save_manifest(manifest_path(output_dir),fingerprint,hashes)
+            file_logger.info(f"{split}: hashed {len(hashes)-done} new of {len(hashes)} rows")
+
+        # serving rebuilds the transform from the spec; the pickle keeps the artifact contract
+        vectorizer=build_hashing_vectorizer(n_features)
+        pickle.dump(vectorizer, open('models/vectorizer.pkl', 'wb'))
+        # hashing has no vocabulary, the (empty) directory only keeps the stage outputs fixed
+        shutil.rmtree(VOCABULARY_DIR, ignore_errors=True)
+        os.makedirs(VOCABULARY_DIR, exist_ok=True)
+        save_vectorizer_spec({'method': method, 'n_features': n_features}, 'models/vectorizer.json')
+        file_logger.info("Data (train & test) has been hashed into shards under data/processed folder...")
+        return
+
+    max_features=params['max_features']
+    vectorizer=load_frozen_vectorizer(max_features) if params['freeze_vocabulary'] else None
+
+    if vectorizer is None:
+        (train_data,train_hashes),(test_data,test_hashes)=interim_rows('train'),interim_rows('test')
         file_logger.info("Data (train & test) has been loaded into from data/interim folder...")
 
-        train_df, test_df = apply_bow(train_data, test_data, max_features)
+        X_train, y_train, X_test, y_test, vectorizer = apply_bow(train_data, test_data, max_features)
 
-        save_data(train_df,file_path="./data/processed/train_bow.csv")
-        save_data(test_df,file_path="./data/processed/test_bow.csv")
+        # CSR .npz + label .npy, the features are never densified
+        save_sparse_data(X_train,y_train,file_path=processed_data_path('train'))
+        save_sparse_data(X_test,y_test,file_path=processed_data_path('test'))
+        # serving maps the sorted term table instead of unpickling the vocabulary dict
+        pickle.dump(vectorizer, open('models/vectorizer.pkl', 'wb'))
+        vocabulary=save_vocabulary(vectorizer, VOCABULARY_DIR)
+        save_vectorizer_spec({'method': method, 'max_features': max_features, **vocabulary}, 'models/vectorizer.json')
+
+        fingerprint=bow_fingerprint(max_features)
+        save_manifest(manifest_path(processed_data_path('train')),fingerprint,train_hashes)
+        save_manifest(manifest_path(processed_data_path('test')),fingerprint,test_hashes)
         file_logger.info("Data (train & test) has been saved into from data/processed folder...")
+        return
+
+    # frozen vocabulary: only the rows after those already in the features are transformed and appended
+    fingerprint=bow_fingerprint(max_features)
+    for split in ('train','test'):
+        hashes=interim_hashes(split)
+        done=done_rows(split,fingerprint,hashes)
+        if done and done==len(hashes):
+            file_logger.info(f"{split}: all {done} rows already vectorized")
+            continue
+
+        # only the rows after `done` are read, one chunk at a time
+        blocks,labels=[],[]
+        if done:
+            X_done,y_done=load_sparse_data(processed_data_path(split))
+            blocks.append(X_done)
+            labels.append(y_done)
+        for chunk in new_interim_chunks(split,done):
+            blocks.append(vectorizer.transform(chunk['content'].fillna('').values))
+            labels.append(chunk['sentiment'].values)
+        if not blocks:
+            # an empty split still gets its (empty) features
+            blocks.append(vectorizer.transform([]))
+            labels.append(np.empty(0,dtype=np.int64))
+        X,y=sparse.vstack(blocks,format='csr'),np.concatenate(labels)
+        save_sparse_data(X,y,file_path=processed_data_path(split))
+        save_manifest(manifest_path(processed_data_path(split)),fingerprint,hashes)
+        file_logger.info(f"{split}: vectorized {len(hashes)-done} new of {len(hashes)} rows with the frozen vocabulary")
+    file_logger.info("Data (train & test) has been saved into from data/processed folder...")
+
+
+def stage_outputs(method:str)->list:
+    """Every file/directory written by `build_features` for `method`."""
+    features=[]
+    for split in ('train','test'):
+        path=processed_data_path(split,method)
+        features+= [path,manifest_path(path)] if method=='hashing' else [path,labels_path(path),manifest_path(path)]
+    return features+['models/vectorizer.pkl','models/vectorizer.json',VOCABULARY_DIR]
+
+
+def main():
+    """This is the main function for feature engineering"""
+    file_logger.info("Now in feature engineering module....")
+
+    try:
+        all_params=load_params()
+        params=all_params['feature_engineering']
+        data_io=all_params['data_io']
+        file_logger.info("params.yaml file has been loaded successfully.")
+
+        inputs=[data_file(f'./data/interim/{split}_processed',data_io['format']) for split in ('train','test')]
+        if params['method']=='bow' and params['freeze_vocabulary']:
+            # a frozen vocabulary is reused from the previous run, so it is an input too
+            inputs.append('models/vectorizer.pkl')
+
+        StageCache().run('feature_engineering', lambda: build_features(params,data_io),
+                         inputs=inputs,
+                         outputs=stage_outputs(params['method']),
+                         params=params,
+                         code=[__file__, vectorizers.__file__, artifacts.__file__, utils.__file__])
     
     except Exception as e:
         file_logger.error(f"Error has been occured into main function in feature enginnering module & the error is {e}")
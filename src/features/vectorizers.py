@@ -0,0 +1,148 @@
+import os
+import json
+import pickle
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer, CountVectorizer
+from src import artifacts
+
+#------------------------------Configuration--------------------------------------------------------
+
+DEFAULT_N_FEATURES = 2 ** 18
+
+# analyzer settings a fitted CountVectorizer must have to be exported as a vocabulary
+ANALYZER_PARAMS = ('lowercase', 'token_pattern', 'ngram_range')
+
+#------------------------------Vocabulary-----------------------------------------------------------
+
+class VocabularyVectorizer:
+    """CountVectorizer.transform against a sorted, memory-mappable term table.
+
+    `terms` holds the UTF-8 encoded vocabulary as one fixed-width bytes array in
+    sorted order and `columns` the feature index of each term. Tokens of a batch
+    are looked up together with np.searchsorted, so there is no per-term Python
+    dict to unpickle or keep in every process, and both arrays can be mapped
+    read-only from disk and shared between workers.
+    """
+
+    def __init__(self, terms: np.ndarray, columns: np.ndarray, lowercase: bool = True,
+                 token_pattern: str = r"(?u)\b\w\w+\b", ngram_range=(1, 1)):
+        self.terms = terms
+        self.columns = columns
+        self.width = terms.dtype.itemsize
+        self.n_features = len(terms)
+        self.params = {'lowercase': lowercase, 'token_pattern': token_pattern, 'ngram_range': list(ngram_range)}
+        # an unfitted CountVectorizer still builds the exact same tokenizer / n-gram analyzer
+        self._analyzer = CountVectorizer(lowercase=lowercase, token_pattern=token_pattern,
+                                         ngram_range=tuple(ngram_range)).build_analyzer()
+
+    @classmethod
+    def from_count_vectorizer(cls, vectorizer: CountVectorizer) -> "VocabularyVectorizer":
+        """Export the vocabulary of a fitted CountVectorizer with the default word analyzer."""
+        if vectorizer.analyzer != 'word' or vectorizer.tokenizer is not None or vectorizer.preprocessor is not None \
+                or vectorizer.stop_words is not None or vectorizer.binary:
+            raise ValueError("only the default word analyzer without stop words or binary counts can be exported")
+
+        vocabulary = vectorizer.vocabulary_
+        encoded = sorted((term.encode('utf-8'), column) for term, column in vocabulary.items())
+        width = max((len(term) for term, _ in encoded), default=1)
+        terms = np.array([term for term, _ in encoded], dtype=f"S{width}")
+        columns = np.array([column for _, column in encoded], dtype=np.int32)
+        return cls(terms, columns, **{name: getattr(vectorizer, name) for name in ANALYZER_PARAMS})
+
+    def save(self, directory: str) -> str:
+        """Write terms.npy / columns.npy as a new version of `directory` (servers may have the current
+        one mapped), returns the version; the analyzer settings go into the vectorizer spec."""
+        return artifacts.save_versioned_arrays(directory, {"terms.npy": self.terms, "columns.npy": self.columns})
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: str = 'r', **params) -> "VocabularyVectorizer":
+        """Map the arrays written by `save`."""
+        directory = artifacts.versioned_dir(directory)
+        terms = np.load(os.path.join(directory, "terms.npy"), mmap_mode=mmap_mode)
+        columns = np.load(os.path.join(directory, "columns.npy"), mmap_mode=mmap_mode)
+        return cls(terms, columns, **params)
+
+    def get_feature_names_out(self) -> np.ndarray:
+        names = np.empty(self.n_features, dtype=object)
+        names[self.columns] = [term.decode('utf-8') for term in self.terms]
+        return names
+
+    def transform(self, texts) -> sparse.csr_matrix:
+        """Term counts of `texts`, identical to CountVectorizer.transform."""
+        analyze = self._analyzer
+        tokens, lengths = [], []
+        for text in texts:
+            document = analyze(text)
+            tokens.extend(document)
+            lengths.append(len(document))
+
+        encoded = [token.encode('utf-8') for token in tokens]
+        # numpy silently truncates longer strings, and no term is longer than `width`
+        fits = np.fromiter((len(token) <= self.width for token in encoded), dtype=bool, count=len(encoded))
+        keys = np.array(encoded, dtype=self.terms.dtype) if encoded else np.empty(0, dtype=self.terms.dtype)
+
+        positions = np.searchsorted(self.terms, keys)
+        positions[positions == self.n_features] = 0
+        found = fits & (self.terms[positions] == keys)
+
+        rows = np.repeat(np.arange(len(lengths)), lengths)[found]
+        cols = self.columns[positions[found]]
+        counts = np.ones(len(rows), dtype=np.int64)
+
+        # duplicates are summed while converting, indices end up sorted like CountVectorizer's
+        X = sparse.csr_matrix((counts, (rows, cols)), shape=(len(lengths), self.n_features))
+        X.sum_duplicates()
+        return X
+
+#------------------------------Functions------------------------------------------------------------
+
+def build_hashing_vectorizer(n_features: int = DEFAULT_N_FEATURES) -> HashingVectorizer:
+    """Stateless stand-in for CountVectorizer: raw term counts hashed into `n_features` columns."""
+    return HashingVectorizer(n_features=n_features, alternate_sign=False, norm=None)
+
+
+def save_vectorizer_spec(spec: dict, file_path: str) -> None:
+    """Write the JSON description of the fitted vectorizer (method + hashing params)."""
+    with open(file_path, 'w') as file:
+        json.dump(spec, file, indent=4)
+
+
+def save_vocabulary(vectorizer: CountVectorizer, directory: str) -> dict:
+    """Export a fitted CountVectorizer to `directory`, returns the spec entries describing it."""
+    vocabulary = VocabularyVectorizer.from_count_vectorizer(vectorizer)
+    vocabulary.save(directory)
+    return {'vocabulary': os.path.basename(os.path.normpath(directory)), **vocabulary.params}
+
+
+def vocabulary_version(spec_path: str = 'models/vectorizer.json'):
+    """Version of the vocabulary the spec at `spec_path` maps, None when it maps none."""
+    try:
+        with open(spec_path, 'r') as file:
+            spec = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if not spec.get('vocabulary'):
+        return None
+    return artifacts.saved_version(os.path.join(os.path.dirname(spec_path), spec['vocabulary']))
+
+
+def load_vectorizer(spec_path: str = 'models/vectorizer.json', pickle_path: str = 'models/vectorizer.pkl'):
+    """Rebuild the transform used in feature engineering.
+
+    A hashing spec needs no fitted state, so it is rebuilt from the JSON alone;
+    a bow spec with a `vocabulary` directory (next to the spec) is memory-mapped
+    from it. Older specs fall back to the pickled CountVectorizer.
+    """
+    if os.path.exists(spec_path):
+        with open(spec_path, 'r') as file:
+            spec = json.load(file)
+        if spec.get('method') == 'hashing':
+            return build_hashing_vectorizer(spec['n_features'])
+
+        directory = os.path.join(os.path.dirname(spec_path), spec.get('vocabulary', ''))
+        if spec.get('vocabulary') and artifacts.saved_version(directory) is not None:
+            return VocabularyVectorizer.load(directory, **{name: spec[name] for name in ANALYZER_PARAMS})
+
+    with open(pickle_path, 'rb') as file:
+        return pickle.load(file)
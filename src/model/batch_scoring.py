@@ -0,0 +1,156 @@
+import os
+import sys
+import time
+import json
+import argparse
+import numpy as np
+import pandas as pd
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from src.logger import file_logging
+from src.exception import CustomException
+from src.data.text_normalizer import DEFAULT_LEMMA_CACHE_SIZE, init_normalizer, get_normalizer
+from src.utils import resolve_n_workers
+from src.features.vectorizers import load_vectorizer
+from src.serving.model_store import ModelBundle, load_model_artifact
+
+#------------------------------Configuration--------------------------------------------------------
+file_logger=file_logging("Batch Scoring")
+
+# the scoring bundle of this process, built once per worker by `init_scorer`
+_bundle = None
+
+#------------------------------Functions------------------------------------------------------------
+
+def init_scorer(model_path: str, spec_path: str, vectorizer_path: str, lemma_cache_path: str = None) -> ModelBundle:
+    """Load normalizer, vectorizer and model from local artifacts, no registry involved."""
+    global _bundle
+
+    init_normalizer(DEFAULT_LEMMA_CACHE_SIZE, lemma_cache_path)
+    _bundle = ModelBundle(f"local:{os.path.basename(model_path.rstrip('/'))}", load_model_artifact(model_path),
+                          load_vectorizer(spec_path, vectorizer_path))
+    return _bundle
+
+
+def score_texts(texts: list) -> tuple:
+    """normalize -> vectorize -> score one chunk, returns (labels, probability of the positive class)."""
+    labels, probabilities = _bundle.score(get_normalizer().normalize_many(texts))
+    return np.asarray(labels), np.asarray(probabilities)
+
+
+def read_chunks(input_path: str, chunk_size: int):
+    """Stream a CSV or JSON lines file (optionally compressed) as DataFrames of `chunk_size` rows."""
+    name = input_path[:-3] if input_path.endswith('.gz') else input_path
+    if name.endswith(('.jsonl', '.ndjson')):
+        reader = pd.read_json(input_path, lines=True, chunksize=chunk_size, dtype=False)
+    else:
+        reader = pd.read_csv(input_path, chunksize=chunk_size)
+    with reader:
+        yield from reader
+
+
+def write_chunk(frame: pd.DataFrame, output_path: str, first: bool) -> None:
+    """Append one chunk of predictions to a CSV or JSON lines file."""
+    mode = 'w' if first else 'a'
+    if output_path.endswith(('.jsonl', '.ndjson')):
+        with open(output_path, mode, encoding='utf-8') as file:
+            if len(frame):
+                # lines=True ends every record, the last one included, with a newline
+                frame.to_json(file, orient='records', lines=True, force_ascii=False)
+    else:
+        frame.to_csv(output_path, mode=mode, header=first, index=False)
+
+
+def score_file(input_path: str, output_path: str, model_path: str, spec_path: str = 'models/vectorizer.json',
+               vectorizer_path: str = 'models/vectorizer.pkl', lemma_cache_path: str = 'models/lemma_cache.json',
+               text_column: str = 'content', id_column: str = None, chunk_size: int = 50000,
+               n_workers: int = 1) -> dict:
+    """Score every row of `input_path` and write label/probability per row to `output_path`.
+
+    Chunks are scored on a process pool (each worker loads the artifacts once) and written
+    in input order as soon as they are ready; only about 2 * n_workers chunks are in memory.
+    Rows keep `id_column` when given, otherwise their 0-based row number.
+    """
+    file_logger.info("In score_file function from batch scoring module....")
+
+    try:
+        directory = os.path.dirname(output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        n_workers = resolve_n_workers(n_workers)
+        artifacts = (model_path, spec_path, vectorizer_path, lemma_cache_path)
+        start = time.perf_counter()
+        n_rows = 0
+
+        def predictions(chunk, labels, probabilities, offset):
+            ids = chunk[id_column].values if id_column else np.arange(offset, offset + len(chunk))
+            return pd.DataFrame({id_column or 'row': ids, 'label': labels, 'probability': probabilities})
+
+        def flush(chunk, offset, result):
+            nonlocal n_rows
+            write_chunk(predictions(chunk, *result, offset), output_path, first=offset == 0)
+            n_rows += len(chunk)
+            elapsed = time.perf_counter() - start
+            print(f"scored {n_rows} rows, {n_rows / elapsed:,.0f} rows/s", file=sys.stderr)
+
+        chunks = read_chunks(input_path, chunk_size)
+        offset = 0
+
+        if n_workers == 1:
+            init_scorer(*artifacts)
+            for chunk in chunks:
+                flush(chunk, offset, score_texts(chunk[text_column].fillna('').astype(str).tolist()))
+                offset += len(chunk)
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers, initializer=init_scorer, initargs=artifacts) as executor:
+                pending = deque()
+                for chunk in chunks:
+                    texts = chunk[text_column].fillna('').astype(str).tolist()
+                    pending.append((chunk, offset, executor.submit(score_texts, texts)))
+                    offset += len(chunk)
+                    if len(pending) >= 2 * n_workers:
+                        chunk_, offset_, future = pending.popleft()
+                        flush(chunk_, offset_, future.result())
+                while pending:
+                    chunk_, offset_, future = pending.popleft()
+                    flush(chunk_, offset_, future.result())
+
+        if n_rows == 0:
+            write_chunk(pd.DataFrame(columns=[id_column or 'row', 'label', 'probability']), output_path, first=True)
+
+        elapsed = time.perf_counter() - start
+        summary = {'rows': n_rows, 'seconds': round(elapsed, 3), 'rows_per_s': round(n_rows / elapsed, 1) if elapsed else 0.0,
+                   'workers': n_workers, 'output': output_path}
+        file_logger.info(f"Batch scoring done: {summary}")
+        return summary
+
+    except Exception as e:
+        file_logger.error(f"In score_file function from batch scoring, error has been ocurred & error is {e}")
+        raise CustomException(e,sys)
+
+#----------------------------------Main Function------------------------------------------------
+
+def main():
+    """Command line entry point: python src/model/batch_scoring.py INPUT OUTPUT [options]"""
+    parser = argparse.ArgumentParser(description="Score a CSV / JSON lines file of texts with the local model.")
+    parser.add_argument("input", help=".csv or .jsonl input, optionally .gz")
+    parser.add_argument("output", help=".csv or .jsonl output with label and probability per row")
+    parser.add_argument("--model", default="models/model.pkl", help="model.pkl, models/linear_model or MLflow model dir")
+    parser.add_argument("--vectorizer-spec", default="models/vectorizer.json")
+    parser.add_argument("--vectorizer", default="models/vectorizer.pkl")
+    parser.add_argument("--lemma-cache", default="models/lemma_cache.json")
+    parser.add_argument("--text-column", default="content")
+    parser.add_argument("--id-column", help="input column copied to the output (default: row number)")
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--workers", type=int, default=-1, help="processes, -1 for one per CPU")
+    args = parser.parse_args()
+
+    summary = score_file(args.input, args.output, args.model, args.vectorizer_spec, args.vectorizer, args.lemma_cache,
+                         args.text_column, args.id_column, args.chunk_size, args.workers)
+    print(json.dumps(summary))
+
+#------------------------------------------------------------------------------------------------------
+if __name__=="__main__":
+
+    main()
@@ -1,20 +1,33 @@
 import numpy as np
 import pandas as pd
 import pickle
+import os
+import time
 from sklearn.ensemble import GradientBoostingClassifier
-from sklearn.linear_model import LogisticRegression
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 import yaml
 import sys
 from src.logger import file_logging, console_logging
-from src.utils import load_params,load_data,save_data
+from src.utils import (load_params,save_data,load_sparse_data,processed_data_path,list_sparse_shards,sparse_shape,labels_path,
+                       StageCache,manifest_path,load_manifest,save_manifest,processed_rows)
 from src.exception import CustomException
+from src import utils, artifacts
+from src.model import scoring
+from src.model.scoring import LinearScorer
 
 #------------------------------------Configuration--------------------------------------------------
 file_logger=file_logging("Model Building")
 
+# sentiment labels written by data ingestion (sadness -> 0, happiness -> 1)
+CLASSES = np.array([0, 1])
+
+MODEL_PATH = 'models/model.pkl'
+# train rows (row hashes of the feature manifest) the model in MODEL_PATH was fitted on
+MODEL_MANIFEST = 'models/model_manifest.npz'
+
 #-------------------------------------Functions-----------------------------------------------------
 
-def train_model(X_train: np.ndarray, y_train: np.ndarray, params: dict) -> LogisticRegression:
+def train_model(X_train, y_train: np.ndarray, params: dict) -> LogisticRegression:
     """Train the Gradient Boosting model."""
     file_logger.info("In train_model function from model_building module....")
 
@@ -31,6 +44,74 @@ def train_model(X_train: np.ndarray, y_train: np.ndarray, params: dict) -> Logis
         file_logger.error(f"In train_model function from model Building, error has been ocurred & error is {e}")
         raise CustomException(e,sys)
 
+def _unseen_rows(shards: list, skip_rows: int) -> list:
+    """(shard, first row to train on) of every shard holding rows after the first `skip_rows`."""
+    if not skip_rows:
+        return [(shard, 0) for shard in shards]
+    found, start = [], 0
+    for shard in shards:
+        n_rows = sparse_shape(shard)[0]
+        if start + n_rows > skip_rows:
+            found.append((shard, max(skip_rows - start, 0)))
+        start += n_rows
+    return found
+
+def train_model_streaming(shards: list, params: dict, clf: SGDClassifier = None, skip_rows: int = 0) -> SGDClassifier:
+    """Train a logistic SGD model with partial_fit, holding one feature shard in memory at a time.
+
+    Pass a previously trained `clf` to continue from its weights instead of starting over, and
+    `skip_rows` to train only on the rows after the first `skip_rows` of the shards."""
+    file_logger.info("In train_model_streaming function from model_building module....")
+
+    try:
+        if clf is None:
+            clf = SGDClassifier(loss='log_loss', alpha=params['alpha'], random_state=42)
+
+        work = _unseen_rows(shards, skip_rows)
+        rng = np.random.default_rng(42)
+        for epoch in range(1, params['epochs'] + 1):
+            start = time.perf_counter()
+            n_rows = 0
+
+            for i in rng.permutation(len(work)):
+                shard, first_row = work[i]
+                X, y = load_sparse_data(shard)
+                if first_row:
+                    X, y = X[first_row:], y[first_row:]
+                clf.partial_fit(X, y, classes=CLASSES)
+                n_rows += len(y)
+
+            elapsed = time.perf_counter() - start
+            throughput = f"epoch {epoch}/{params['epochs']}: {n_rows} rows from {len(work)} shards in {elapsed:.2f}s ({n_rows/max(elapsed, 1e-9):.0f} rows/s)"
+            file_logger.info(throughput)
+
+        file_logger.info('Streaming model training completed')
+        return clf
+
+    except Exception as e:
+        file_logger.error(f"In train_model_streaming function from model Building, error has been ocurred & error is {e}")
+        raise CustomException(e,sys)
+
+def load_previous_model(file_path: str, n_features: int):
+    """Return the SGD model saved at `file_path` if it can be resumed on `n_features` columns, else None."""
+    try:
+        if not os.path.exists(file_path):
+            return None
+
+        with open(file_path, 'rb') as file:
+            model = pickle.load(file)
+
+        if not isinstance(model, SGDClassifier) or getattr(model, 'n_features_in_', None) != n_features:
+            file_logger.info(f'{file_path} cannot be resumed on {n_features} features, training from scratch')
+            return None
+
+        file_logger.info(f'Resuming training from {file_path}')
+        return model
+
+    except Exception as e:
+        file_logger.error(f"In load_previous_model function from model Building, error has been ocurred & error is {e}")
+        raise CustomException(e,sys)
+
 def save_model(model, file_path: str) -> None:
     """Save the trained model to a file."""
     try:
@@ -43,23 +124,81 @@ def save_model(model, file_path: str) -> None:
         file_logger.error(f"In save_model function from model Building, error has been ocurred & error is {e}")
         raise CustomException(e,sys)
     
+def export_linear_model(model, directory: str) -> bool:
+    """Write coef/intercept/classes of a binary linear model as .npy files for LinearScorer.load,
+    returns False (and writes nothing) for models it cannot stand in for."""
+    try:
+        if not LinearScorer.supports(model):
+            file_logger.info(f'{type(model).__name__} is not a binary linear model, no scoring arrays exported')
+            return False
+
+        LinearScorer.from_estimator(model).save(directory)
+        file_logger.info(f'Linear scoring arrays saved to {directory}')
+        return True
+
+    except Exception as e:
+        file_logger.error(f"In export_linear_model function from model Building, error has been ocurred & error is {e}")
+        raise CustomException(e,sys)
+
 #----------------------------------------Main function-------------------------------------------------
 
+def build_model(params: dict, method: str) -> None:
+    """Train on data/processed and write models/model.pkl plus the linear scoring arrays.
+
+    A warm start (sgd) continues from models/model.pkl with one pass over the train rows added since
+    it was fitted, as recorded by models/model_manifest.npz against the feature manifest; when the
+    earlier rows changed or were never recorded, the model is trained from scratch instead."""
+    train_path=processed_data_path('train',method)
+    # the train rows the features hold, in order
+    fingerprint,hashes=load_manifest(manifest_path(train_path))
+
+    if params['trainer']=='sgd':
+        shards=list_sparse_shards(train_path)
+        previous,seen=None,0
+        if params['warm_start']:
+            n_features=sparse_shape(shards[0])[1]
+            previous=load_previous_model(MODEL_PATH, n_features)
+            seen=processed_rows(MODEL_MANIFEST,fingerprint,hashes) if previous is not None else 0
+            if previous is not None and not seen:
+                file_logger.info(f'the rows {MODEL_PATH} was fitted on are not a prefix of the train rows, training from scratch')
+                previous=None
+
+        if previous is None:
+            clf = train_model_streaming(shards, params)
+        else:
+            file_logger.info(f'warm start: one pass over {len(hashes)-seen} new of {len(hashes)} train rows')
+            clf = train_model_streaming(shards, {**params, 'epochs': 1}, previous, skip_rows=seen)
+    else:
+        X_train, y_train = load_sparse_data(train_path)
+        clf = train_model(X_train, y_train, params)
+
+    save_model(clf, MODEL_PATH)
+    save_manifest(MODEL_MANIFEST, fingerprint or '', hashes)
+    # serving scores straight from these arrays, no estimator or pyfunc wrapper needed
+    export_linear_model(clf, 'models/linear_model')
+
+
 def main():
     """This is the main function for Model Building"""
     file_logger.info("Now in Model Building module....")
 
     try:
         #parameters loading
-        params=load_params()['model_building']
-
-        train_data = load_data('./data/processed/train_bow.csv')
-
-        X_train = train_data.iloc[:, :-1].values
-        y_train = train_data.iloc[:, -1].values
-
-        clf = train_model(X_train, y_train, params)
-        save_model(clf, 'models/model.pkl')
+        all_params=load_params()
+        params=all_params['model_building']
+        method=all_params['feature_engineering']['method']
+
+        train_path=processed_data_path('train',method)
+        inputs=[train_path] if method=='hashing' else [train_path,labels_path(train_path)]
+        if params['trainer']=='sgd' and params['warm_start']:
+            # warm starts continue from the previous model and the rows it has seen, so they are inputs too
+            inputs+=[manifest_path(train_path),MODEL_PATH,MODEL_MANIFEST]
+
+        StageCache().run('model_building', lambda: build_model(params, method),
+                         inputs=inputs,
+                         outputs=[MODEL_PATH,MODEL_MANIFEST,'models/linear_model'],
+                         params={**params,'method':method},
+                         code=[__file__, scoring.__file__, artifacts.__file__, utils.__file__])
 
         file_logger.info("Model training has been done successfully in model building module")
 
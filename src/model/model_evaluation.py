@@ -1,34 +1,20 @@
 import numpy as np
 import pandas as pd
 import pickle
-import mlflow
 import json
 import sys
 from sklearn.metrics import accuracy_score, precision_score, recall_score, roc_auc_score
 from src.logger import file_logging, console_logging
-from src.utils import load_params,load_data,save_data
+from src.utils import load_params,save_data,load_sparse_data,processed_data_path
 from src.exception import CustomException
-import dagshub
-import os
+from src.registry import configure_registry
 #--------------------------------------Configuration------------------------------------------
 file_logger=file_logging("Model Evaluation")
 #mlflow.set_tracking_uri('https://dagshub.com/Pravat-21/MLops-Mini-Project.mlflow')
 #dagshub.init(repo_owner='Pravat-21', repo_name='MLops-Mini-Project', mlflow=True)
 
-# Set up DagsHub credentials for MLflow tracking
-dagshub_token = os.getenv("DAGSHUB_PAT")
-if not dagshub_token:
-    raise EnvironmentError("DAGSHUB_PAT environment variable is not set")
-
-os.environ["MLFLOW_TRACKING_USERNAME"] = dagshub_token
-os.environ["MLFLOW_TRACKING_PASSWORD"] = dagshub_token
-
-dagshub_url = "https://dagshub.com"
-repo_owner = "Pravat-21"
-repo_name = "MLops-Mini-Project"
-
-# Set up MLflow tracking URI
-mlflow.set_tracking_uri(f'{dagshub_url}/{repo_owner}/{repo_name}.mlflow')
+# DagsHub credentials and the MLflow tracking URI are only set up when main() runs, so the
+# functions below can be imported (tests, benchmarks) without DAGSHUB_PAT or mlflow
 
 #-------------------------------------Functions-----------------------------------------------
 def load_model(file_path: str):
@@ -44,7 +30,7 @@ def load_model(file_path: str):
         file_logger.error(f"In load_model function from model Evaluation, error has been ocurred & error is {e}")
         raise CustomException(e,sys)
     
-def evaluate_model(clf, X_test: np.ndarray, y_test: np.ndarray) -> dict:
+def evaluate_model(clf, X_test, y_test: np.ndarray) -> dict:
     """Evaluate the model and return the evaluation metrics."""
     file_logger.info("In evaluate_model function from model_evaluation module....")
 
@@ -101,15 +87,19 @@ def main():
     """This is the main function for Model Evaluation"""
     file_logger.info("Now in Model Evaluation module....")
 
+    import mlflow
+    import mlflow.sklearn
+
+    # Set up DagsHub credentials and the MLflow tracking URI
+    configure_registry()
+
     mlflow.set_experiment("dvc-pipeline")
     with mlflow.start_run() as run:  # Start an MLflow run
 
         try:
             clf = load_model('./models/model.pkl')
-            test_data = load_data('./data/processed/test_bow.csv')
-
-            X_test = test_data.iloc[:, :-1].values
-            y_test = test_data.iloc[:, -1].values
+            method=load_params()['feature_engineering']['method']
+            X_test, y_test = load_sparse_data(processed_data_path('test',method))
 
             metrics = evaluate_model(clf, X_test, y_test)
 
@@ -0,0 +1,88 @@
+import os
+import numpy as np
+from scipy.special import expit
+from src import artifacts
+
+#-------------------------------------Scorer--------------------------------------------------------
+
+class LinearScorer:
+    """Binary linear model scored straight on sparse features: sigmoid(X @ coef + intercept).
+
+    Gives the same probabilities and labels as `predict_proba` / `predict` of the
+    LogisticRegression or log-loss SGDClassifier it was built from, without any
+    estimator, DataFrame or dense conversion on the request path.
+    """
+
+    def __init__(self, coef: np.ndarray, intercept: float, classes: np.ndarray):
+        self.coef = np.ascontiguousarray(coef, dtype=np.float64).ravel()
+        self.intercept = float(intercept)
+        self.classes = np.asarray(classes)
+
+    @classmethod
+    def from_estimator(cls, clf) -> "LinearScorer":
+        """Build from a fitted binary linear classifier (anything with coef_, intercept_, classes_)."""
+        if clf.coef_.shape[0] != 1:
+            raise ValueError(f"LinearScorer needs a binary model, got coef_ of shape {clf.coef_.shape}")
+        return cls(clf.coef_[0], clf.intercept_[0], clf.classes_)
+
+    MARKER = artifacts.MARKER
+    ARRAYS = ("coef.npy", "intercept.npy", "classes.npy")
+
+    def _arrays(self) -> dict:
+        return dict(zip(self.ARRAYS, (self.coef, np.array(self.intercept), self.classes)))
+
+    def save(self, directory: str) -> None:
+        """Write coef / intercept / classes as plain .npy files that `load` can memory-map, as a new
+        version of `directory` (see src.artifacts) so servers mapping the old arrays are unaffected."""
+        artifacts.save_versioned_arrays(directory, self._arrays())
+
+    @staticmethod
+    def saved_version(directory: str):
+        """Version `save` last wrote to `directory`, None when there is none."""
+        return artifacts.saved_version(directory)
+
+    @staticmethod
+    def is_saved(directory: str) -> bool:
+        """True when `directory` holds arrays written by `save`."""
+        return artifacts.saved_version(directory) is not None
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: str = 'r') -> "LinearScorer":
+        """Read a scorer written by `save`; with mmap_mode='r' the coefficients stay file-backed pages
+        that every process mapping them shares instead of copying."""
+        directory = artifacts.versioned_dir(directory)
+        scorer = cls.__new__(cls)
+        scorer.coef = np.load(os.path.join(directory, "coef.npy"), mmap_mode=mmap_mode)
+        scorer.intercept = float(np.load(os.path.join(directory, "intercept.npy")))
+        scorer.classes = np.load(os.path.join(directory, "classes.npy"))
+        return scorer
+
+    @staticmethod
+    def supports(clf) -> bool:
+        """True when `clf` is a binary linear model this scorer can stand in for."""
+        coef = getattr(clf, 'coef_', None)
+        return coef is not None and coef.ndim == 2 and coef.shape[0] == 1 and hasattr(clf, 'intercept_')
+
+    @property
+    def n_features(self) -> int:
+        return self.coef.shape[0]
+
+    def decision_function(self, X) -> np.ndarray:
+        """Raw scores; X is a CSR matrix (or dense array) with n_features columns."""
+        return np.asarray(X @ self.coef).ravel() + self.intercept
+
+    def predict_positive_proba(self, X) -> np.ndarray:
+        """Probability of classes[1] for each row."""
+        return expit(self.decision_function(X))
+
+    def predict_proba(self, X) -> np.ndarray:
+        positive = self.predict_positive_proba(X)
+        return np.column_stack([1.0 - positive, positive])
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes[(self.decision_function(X) > 0).astype(int)]
+
+    def predict_with_proba(self, X) -> tuple:
+        """(labels, probability of classes[1]) from a single matrix-vector product."""
+        scores = self.decision_function(X)
+        return self.classes[(scores > 0).astype(int)], expit(scores)
@@ -0,0 +1,22 @@
+import os
+
+#------------------------------Configuration--------------------------------------------------------
+
+DAGSHUB_URL = "https://dagshub.com"
+REPO_OWNER = "Pravat-21"
+REPO_NAME = "MLops-Mini-Project"
+
+#------------------------------Registry-------------------------------------------------------------
+
+def configure_registry() -> None:
+    """Point MLflow at the DagsHub registry, only needed when models come from there."""
+    import mlflow
+
+    dagshub_token = os.getenv("DAGSHUB_PAT")
+    if not dagshub_token:
+        raise EnvironmentError("DAGSHUB_PAT environment variable is not set")
+
+    os.environ["MLFLOW_TRACKING_USERNAME"] = dagshub_token
+    os.environ["MLFLOW_TRACKING_PASSWORD"] = dagshub_token
+
+    mlflow.set_tracking_uri(f'{DAGSHUB_URL}/{REPO_OWNER}/{REPO_NAME}.mlflow')
@@ -0,0 +1,169 @@
+import os
+import time
+import queue
+import threading
+from collections import Counter, deque
+# concurrent.futures.TimeoutError is only the builtin TimeoutError from Python 3.11 on
+from concurrent.futures import Future, InvalidStateError, TimeoutError as FutureTimeoutError
+
+#------------------------------Configuration--------------------------------------------------------
+
+# how many recent queue waits are kept for the latency percentiles
+LATENCY_WINDOW = 2048
+
+#------------------------------Stats----------------------------------------------------------------
+
+class BatchStats:
+    """Counters behind the /metrics endpoint: batch sizes, queue depth and the latency batching adds."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.errors = 0
+        self.max_queue_depth = 0
+        self.batch_sizes = Counter()
+        self.waits_ms = deque(maxlen=LATENCY_WINDOW)
+
+    def record(self, waits_ms: list, queue_depth: int, failed: bool) -> None:
+        with self._lock:
+            self.batches += 1
+            self.items += len(waits_ms)
+            self.errors += int(failed)
+            self.max_queue_depth = max(self.max_queue_depth, queue_depth)
+            self.batch_sizes[len(waits_ms)] += 1
+            self.waits_ms.extend(waits_ms)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            waits = sorted(self.waits_ms)
+            percentile = lambda q: round(waits[min(int(q * len(waits)), len(waits) - 1)], 3) if waits else 0.0
+            return {
+                'batches': self.batches,
+                'items': self.items,
+                'errors': self.errors,
+                'mean_batch_size': self.items / self.batches if self.batches else 0.0,
+                'batch_size_histogram': dict(sorted(self.batch_sizes.items())),
+                'max_queue_depth': self.max_queue_depth,
+                'added_latency_ms': {'p50': percentile(0.50), 'p95': percentile(0.95), 'p99': percentile(0.99)},
+            }
+
+#------------------------------Batcher--------------------------------------------------------------
+
+class MicroBatcher:
+    """Coalesce concurrent single-item calls into one `predict_batch(items)` call.
+
+    A background thread takes the first queued item, keeps collecting until
+    `max_batch_size` items are queued or `max_wait_ms` has passed, runs the batch
+    and resolves each caller's Future with its own result. The thread is started
+    lazily and restarted after a fork, so the batcher is safe to create before
+    gunicorn forks its workers.
+    """
+
+    def __init__(self, predict_batch, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.stats = BatchStats()
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def submit(self, item) -> Future:
+        """Queue one item, the returned Future resolves to its prediction."""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def predict(self, item, timeout: float = None):
+        """Blocking helper: submit one item and wait up to `timeout` seconds for its result.
+
+        Raises concurrent.futures.TimeoutError when it is not answered in time; the item is then dropped from the queue."""
+        future = self.submit(item)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def metrics(self) -> dict:
+        metrics = self.stats.snapshot()
+        metrics.update({
+            'queue_depth': self.queue_depth(),
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000.0,
+        })
+        return metrics
+
+    def _ensure_worker(self) -> None:
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                # a forked child inherits the queue object but not the thread
+                self._queue = queue.Queue()
+                threading.Thread(target=self._run, name="micro-batcher", daemon=True).start()
+                self._pid = os.getpid()
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            try:
+                self._run_batch(batch)
+            except Exception:
+                # never let one batch take the thread down: fail whatever is still pending
+                for _, future, _ in batch:
+                    self._resolve(future, error=RuntimeError("micro-batcher failed to resolve this item"))
+
+    def _run_batch(self, batch: list) -> None:
+        # callers that gave up (e.g. a cancelled ASGI request) are dropped before scoring
+        batch = [entry for entry in batch if entry[1].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        started = time.perf_counter()
+        items = [item for item, _, _ in batch]
+        waits_ms = [(started - queued) * 1000.0 for _, _, queued in batch]
+
+        error = None
+        try:
+            results = list(self.predict_batch(items))
+            if len(results) != len(batch):
+                raise RuntimeError(f"predict_batch returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            error = e
+
+        # stats first, so a caller that just got its result sees its batch counted
+        self.stats.record(waits_ms, self.queue_depth() + len(batch), error is not None)
+
+        if error is not None:
+            for _, future, _ in batch:
+                self._resolve(future, error=error)
+        else:
+            for (_, future, _), result in zip(batch, results):
+                self._resolve(future, result)
+
+    @staticmethod
+    def _resolve(future: Future, result=None, error: Exception = None) -> None:
+        """Set a Future's outcome, ignoring one that is already done."""
+        try:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            pass
@@ -0,0 +1,302 @@
+import os
+import time
+import json
+import pickle
+import threading
+from src.features.vectorizers import load_vectorizer, vocabulary_version
+from src.model.scoring import LinearScorer
+from src.registry import configure_registry
+
+#------------------------------Configuration--------------------------------------------------------
+
+# wall clock reference for cold start numbers: the moment the serving code was imported
+PROCESS_START = time.time()
+
+#------------------------------Bundle---------------------------------------------------------------
+
+class ModelNotReadyError(RuntimeError):
+    """Raised when no model has been loaded (yet) within the allowed wait."""
+
+
+class ModelBundle:
+    """Everything needed to score text, loaded together and never mutated afterwards."""
+
+    def __init__(self, version, model, vectorizer, shared_dir: str = None):
+        self.version = str(version)
+        self.model = model
+        self.vectorizer = vectorizer
+        # linear models are scored straight from the CSR rows, computed once here instead of per request
+        if isinstance(model, LinearScorer):
+            self.scorer = model
+        else:
+            self.scorer = LinearScorer.from_estimator(model) if LinearScorer.supports(model) else None
+        self.loaded_at = time.time()
+
+        if shared_dir and self.scorer is not None:
+            self.share_arrays(shared_dir)
+
+    def share_arrays(self, directory: str) -> None:
+        """Move the scoring arrays into memory-mapped .npy files under `directory`.
+
+        File-backed, read-only pages are shared through the page cache by every worker
+        that maps them (and survive fork untouched), instead of one private copy each."""
+        directory = os.path.join(directory, "".join(c if c.isalnum() or c in "-_." else "_" for c in self.version))
+        self.scorer.save(directory)
+        self.scorer = LinearScorer.load(directory, mmap_mode='r')
+
+    def score(self, texts) -> tuple:
+        """Vectorize and score already normalized texts, returns (labels, probability of the positive class)."""
+        # bow, kept sparse
+        features = self.vectorizer.transform(texts)
+
+        if self.scorer is not None:
+            return self.scorer.predict_with_proba(features)
+
+        probabilities = self.model.predict_proba(features)
+        labels = self.model.classes_[probabilities.argmax(axis=1)]
+        return labels, probabilities[:, 1]
+
+#------------------------------Loaders--------------------------------------------------------------
+
+def get_latest_model_version(model_name: str):
+    """Production version of `model_name`, falling back to the latest unstaged one."""
+    import mlflow
+
+    client = mlflow.MlflowClient()
+    latest_version = client.get_latest_versions(model_name, stages=["Production"])
+    if not latest_version:
+        latest_version = client.get_latest_versions(model_name, stages=["None"])
+    return latest_version[0].version if latest_version else None
+
+
+def load_model_artifact(path_or_uri: str):
+    """Load a model from a local pickle, exported scoring arrays (models/linear_model),
+    a local MLflow model directory or any MLflow model URI."""
+    if os.path.isfile(path_or_uri):
+        with open(path_or_uri, 'rb') as file:
+            return pickle.load(file)
+
+    if LinearScorer.is_saved(path_or_uri):
+        return LinearScorer.load(path_or_uri)
+
+    # the sklearn flavor (logged by model_evaluation) exposes predict_proba, pyfunc only gives labels
+    import mlflow.sklearn
+    return mlflow.sklearn.load_model(path_or_uri)
+
+
+class ModelSource:
+    """Where the serving model comes from, configured from the environment.
+
+    MODEL_POINTER  local JSON pointer file {"version": ..., "model_path": ...[, "vectorizer_path",
+                   "vectorizer_spec"]}; rewriting it rolls the servers over to the new model
+    MODEL_PATH     local pickle, linear_model directory or MLflow model directory, reloaded when
+                   the version of the saved scoring arrays, or else the mtime, changes
+    MODEL_URI      any MLflow model URI, e.g. models:/my_model/3 against a local file store
+                   (MLFLOW_TRACKING_URI=file:./mlruns); never changes
+    otherwise      the Production version of MODEL_NAME (default my_model) from the DagsHub registry
+
+    With ARTIFACT_CACHE_DIR set, scoring arrays are memory-mapped from that directory so
+    workers share them. Only the registry mode needs DAGSHUB_PAT. `probe()` is cheap and names the version that
+    should be served, `load(version)` builds its ModelBundle.
+    """
+
+    def __init__(self, environ=os.environ):
+        self.spec_path = environ.get("VECTORIZER_SPEC", "models/vectorizer.json")
+        self.pickle_path = environ.get("VECTORIZER_PATH", "models/vectorizer.pkl")
+        self.pointer_path = environ.get("MODEL_POINTER")
+        self.model_path = environ.get("MODEL_PATH")
+        self.model_uri = environ.get("MODEL_URI")
+        self.model_name = environ.get("MODEL_NAME", "my_model")
+        self.shared_dir = environ.get("ARTIFACT_CACHE_DIR")
+        self._registry_configured = False
+
+    @property
+    def kind(self) -> str:
+        if self.pointer_path:
+            return "pointer"
+        if self.model_path:
+            return "path"
+        if self.model_uri:
+            return "uri"
+        return "registry"
+
+    def _read_pointer(self) -> dict:
+        with open(self.pointer_path, 'r') as file:
+            return json.load(file)
+
+    @staticmethod
+    def _mtime_ns(path: str) -> int:
+        """Last modification (ns) of a file, or of anything directly inside a directory; whole seconds
+        would miss a model rewritten within the second it was last probed."""
+        if not os.path.isdir(path):
+            return os.stat(path).st_mtime_ns
+        with os.scandir(path) as entries:
+            return max([os.stat(path).st_mtime_ns] + [entry.stat().st_mtime_ns for entry in entries])
+
+    def _registry(self) -> None:
+        if not self._registry_configured:
+            configure_registry()
+            self._registry_configured = True
+
+    def probe(self) -> str:
+        """Version that should currently be served."""
+        if self.kind == "pointer":
+            return str(self._read_pointer()['version'])
+        if self.kind == "path":
+            # saved scoring arrays name their version, anything else is versioned by its mtime;
+            # a new vocabulary under an unchanged model is a new version too
+            version = LinearScorer.saved_version(self.model_path) if os.path.isdir(self.model_path) else None
+            version = f"local:{os.path.basename(self.model_path.rstrip('/'))}@{version or self._mtime_ns(self.model_path)}"
+            vocabulary = vocabulary_version(self.spec_path)
+            return f"{version}+{vocabulary}" if vocabulary else version
+        if self.kind == "uri":
+            return self.model_uri
+
+        self._registry()
+        return str(get_latest_model_version(self.model_name))
+
+    def load(self, version: str = None) -> ModelBundle:
+        """Load model + vectorizer for `version` (the probed one if not given)."""
+        version = version if version is not None else self.probe()
+        spec_path, pickle_path = self.spec_path, self.pickle_path
+
+        if self.kind == "pointer":
+            pointer = self._read_pointer()
+            version = str(pointer['version'])
+            source = pointer['model_path']
+            spec_path = pointer.get('vectorizer_spec', spec_path)
+            pickle_path = pointer.get('vectorizer_path', pickle_path)
+        elif self.kind == "path":
+            source = self.model_path
+        elif self.kind == "uri":
+            source = self.model_uri
+        else:
+            self._registry()
+            source = f'models:/{self.model_name}/{version}'
+
+        # hashing specs are rebuilt without unpickling, a fitted CountVectorizer comes from the pickle
+        return ModelBundle(version, load_model_artifact(source), load_vectorizer(spec_path, pickle_path),
+                           shared_dir=self.shared_dir)
+
+#------------------------------Store----------------------------------------------------------------
+
+class ModelStore:
+    """Holds the current ModelBundle and swaps in new ones without blocking requests.
+
+    `start()` loads in a background thread so the worker can accept connections
+    (and answer /health) immediately; `get()` waits up to a timeout for the
+    first bundle. With a `poll_interval`, a watcher thread probes the source and,
+    when the version changes, loads the new bundle off the request path and
+    replaces the reference in one assignment. Callers that took a bundle keep
+    using it, so an in-flight batch never mixes versions. Threads are started
+    lazily per process on the first `get()`, so the store may be created and
+    loaded in a preloading gunicorn master and shared by the forked workers.
+    """
+
+    def __init__(self, source, poll_interval: float = 0):
+        self.source = source
+        self.poll_interval = poll_interval
+        self._bundle = None
+        self._error = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._watcher_pid = None
+        self.load_seconds = None
+        self.ready_at = None
+        self.swaps = 0
+        self.last_swap_at = None
+        self.last_poll_at = None
+        self.watch_error = None
+
+    @property
+    def ready(self) -> bool:
+        return self._bundle is not None
+
+    def start(self, background: bool = True) -> "ModelStore":
+        """Begin loading the model; with background=False block until it is loaded."""
+        with self._lock:
+            if self._thread is None and not self.ready:
+                self._ready.clear()
+                self._thread = threading.Thread(target=self._load, name="model-loader", daemon=True)
+                self._thread.start()
+        if not background:
+            self._ready.wait()
+        return self
+
+    def get(self, timeout: float = None) -> ModelBundle:
+        """The current bundle, waiting up to `timeout` seconds for the first load."""
+        bundle = self._bundle
+        if bundle is not None:
+            self._ensure_watcher()
+            return bundle
+
+        self.start()
+        self._ready.wait(timeout)
+        if self._bundle is None:
+            raise ModelNotReadyError(f"model is not loaded yet{f': {self._error}' if self._error else ''}")
+        return self._bundle
+
+    def check_for_update(self) -> bool:
+        """Probe the source once and swap in a new bundle if the version changed."""
+        self.last_poll_at = time.time()
+        current = self._bundle
+        version = self.source.probe()
+        if current is not None and version == current.version:
+            return False
+
+        bundle = self.source.load(version)
+        self._bundle = bundle
+        self.swaps += int(current is not None)
+        self.last_swap_at = time.time()
+        self._ready.set()
+        return True
+
+    def status(self) -> dict:
+        bundle = self._bundle
+        return {
+            'ready': bundle is not None,
+            'model_version': bundle.version if bundle is not None else None,
+            'source': self.source.kind,
+            'load_seconds': self.load_seconds,
+            'cold_start_seconds': self.ready_at - PROCESS_START if self.ready_at else None,
+            'error': self._error,
+            'swaps': self.swaps,
+            'last_swap_at': self.last_swap_at,
+            'last_poll_at': self.last_poll_at,
+            'watch_error': self.watch_error,
+        }
+
+    def _load(self) -> None:
+        start = time.perf_counter()
+        try:
+            self._bundle = self.source.load()
+            self._error = None
+            self.load_seconds = time.perf_counter() - start
+            self.ready_at = time.time()
+        except Exception as e:
+            self._error = f"{type(e).__name__}: {e}"
+        finally:
+            with self._lock:
+                self._thread = None
+            self._ready.set()
+
+    def _ensure_watcher(self) -> None:
+        if not self.poll_interval or self._watcher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._watcher_pid != os.getpid():
+                threading.Thread(target=self._watch, name="model-watcher", daemon=True).start()
+                self._watcher_pid = os.getpid()
+
+    def _watch(self) -> None:
+        while True:
+            time.sleep(self.poll_interval)
+            if self._bundle is None:
+                continue
+            try:
+                self.check_for_update()
+                self.watch_error = None
+            except Exception as e:
+                # keep serving the current bundle, try again next interval
+                self.watch_error = f"{type(e).__name__}: {e}"
@@ -0,0 +1,222 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+#------------------------------Configuration--------------------------------------------------------
+
+DEFAULT_CACHE_SIZE = 100000
+DEFAULT_TTL_SECONDS = 3600.0
+
+# the shared store is pruned (expired rows, old versions, overflow) every this many writes
+PRUNE_EVERY = 1000
+
+
+def cache_key(text: str) -> bytes:
+    """Fixed 16 byte key of a normalized text, so memory per entry does not grow with the text."""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+#------------------------------Shared store---------------------------------------------------------
+
+class SqlitePredictionStore:
+    """Predictions shared by the workers of one host through a local SQLite file (WAL mode).
+
+    Rows are (version, key, label, probability, expires); every process and
+    thread opens its own connection, and misses or write conflicts are simply
+    treated as cache misses.
+    """
+
+    def __init__(self, path: str, maxsize: int = DEFAULT_CACHE_SIZE):
+        self.path = path
+        self.maxsize = maxsize
+        self._local = threading.local()
+        self._writes = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS predictions (version TEXT, key BLOB, label INTEGER, "
+                "probability REAL, expires REAL, PRIMARY KEY (version, key))")
+
+    def _connection(self) -> sqlite3.Connection:
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            # connections must not cross a fork
+            local.connection = sqlite3.connect(self.path, timeout=0.05, isolation_level=None)
+            local.connection.execute("PRAGMA journal_mode=WAL")
+            local.connection.execute("PRAGMA synchronous=OFF")
+            local.pid = os.getpid()
+        return local.connection
+
+    def get_many(self, version: str, keys: list, now: float) -> dict:
+        """key -> (label, probability) for the keys found and not expired."""
+        found = {}
+        try:
+            connection = self._connection()
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = connection.execute(
+                    f"SELECT key, label, probability FROM predictions WHERE version = ? AND expires > ? "
+                    f"AND key IN ({','.join('?' * len(chunk))})", [version, now, *chunk])
+                found.update((key, (label, probability)) for key, label, probability in rows)
+        except sqlite3.Error:
+            pass
+        return found
+
+    def put_many(self, version: str, items: dict, expires: float) -> None:
+        try:
+            connection = self._connection()
+            connection.executemany(
+                "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?)",
+                [(version, key, int(label), float(probability), expires) for key, (label, probability) in items.items()])
+            self._writes += len(items)
+            if self._writes >= PRUNE_EVERY:
+                self._writes = 0
+                self.prune(version, time.time())
+        except sqlite3.Error:
+            pass
+
+    def prune(self, version: str, now: float) -> None:
+        """Drop other versions, expired rows and the rows closest to expiry beyond `maxsize`."""
+        connection = self._connection()
+        connection.execute("DELETE FROM predictions WHERE version != ? OR expires <= ?", (version, now))
+        connection.execute(
+            "DELETE FROM predictions WHERE rowid IN (SELECT rowid FROM predictions ORDER BY expires DESC "
+            "LIMIT -1 OFFSET ?)", (self.maxsize,))
+
+#------------------------------Cache----------------------------------------------------------------
+
+class PredictionCache:
+    """LRU + TTL cache of (label, probability of the positive class) keyed on normalized text.
+
+    Entries belong to one model version: the first lookup for a different version
+    empties the cache, so a hot-swapped model never serves its predecessor's
+    answers. At most `maxsize` entries of fixed size are kept in process; with a
+    `shared` store, local misses are looked up there and fills written through.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE, ttl: float = DEFAULT_TTL_SECONDS,
+                 shared: SqlitePredictionStore = None, clock=time.time):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.shared = shared
+        self.clock = clock
+        self.version = None
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, environ=os.environ):
+        """PREDICTION_CACHE_SIZE (0 disables), PREDICTION_CACHE_TTL seconds, PREDICTION_CACHE_PATH sqlite file."""
+        maxsize = int(environ.get("PREDICTION_CACHE_SIZE", DEFAULT_CACHE_SIZE))
+        if maxsize <= 0:
+            return None
+        path = environ.get("PREDICTION_CACHE_PATH")
+        shared = SqlitePredictionStore(path, maxsize) if path else None
+        return cls(maxsize, float(environ.get("PREDICTION_CACHE_TTL", DEFAULT_TTL_SECONDS)), shared)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _switch(self, version: str) -> None:
+        # called with the lock held
+        if version != self.version:
+            if self.version is not None:
+                self.invalidations += 1
+            self._entries.clear()
+            self.version = version
+
+    def get_many(self, version: str, texts: list) -> list:
+        """Cached (label, probability) per text, None for misses."""
+        keys = [cache_key(text) for text in texts]
+        now = self.clock()
+        results = [None] * len(keys)
+
+        with self._lock:
+            self._switch(version)
+            entries = self._entries
+            for i, key in enumerate(keys):
+                entry = entries.get(key)
+                if entry is None:
+                    continue
+                if entry[0] <= now:
+                    del entries[key]
+                    self.expired += 1
+                    continue
+                entries.move_to_end(key)
+                results[i] = entry[1]
+
+        missing = {key: i for i, key in enumerate(keys) if results[i] is None}
+        if self.shared is not None and missing:
+            found = self.shared.get_many(version, list(missing), now)
+            for key, value in found.items():
+                results[missing[key]] = value
+            self.shared_hits += len(found)
+            self._fill(version, found, now + self.ttl)
+
+        with self._lock:
+            n_misses = sum(result is None for result in results)
+            self.misses += n_misses
+            self.hits += len(results) - n_misses
+        return results
+
+    def put_many(self, version: str, texts: list, values: list) -> None:
+        """Remember (label, probability) per text for `version`."""
+        items = {cache_key(text): (int(label), float(probability)) for text, (label, probability) in zip(texts, values)}
+        expires = self.clock() + self.ttl
+        self._fill(version, items, expires)
+        if self.shared is not None:
+            self.shared.put_many(version, items, expires)
+
+    def _fill(self, version: str, items: dict, expires: float) -> None:
+        with self._lock:
+            self._switch(version)
+            entries = self._entries
+            for key, value in items.items():
+                entries[key] = (expires, value)
+                entries.move_to_end(key)
+            while len(entries) > self.maxsize:
+                entries.popitem(last=False)
+                self.evictions += 1
+
+    def score(self, bundle, texts: list) -> tuple:
+        """bundle.score through the cache: only the misses are vectorized and scored, in one call."""
+        results = self.get_many(bundle.version, texts)
+        missing = [i for i, result in enumerate(results) if result is None]
+
+        if missing:
+            misses = [texts[i] for i in missing]
+            labels, probabilities = bundle.score(misses)
+            values = [(int(label), float(probability)) for label, probability in zip(labels, probabilities)]
+            self.put_many(bundle.version, misses, values)
+            for i, value in zip(missing, values):
+                results[i] = value
+
+        return [label for label, _ in results], [probability for _, probability in results]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'version': self.version,
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expired': self.expired,
+            'invalidations': self.invalidations,
+            'shared_store': self.shared.path if self.shared is not None else None,
+        }
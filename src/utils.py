@@ -1,8 +1,13 @@
 import yaml
 import os
 import sys
+import json
+import shutil
+import hashlib
 from src.exception import CustomException
+import numpy as np
 import pandas as pd
+from scipy import sparse
 from src.logger import file_logging, console_logging
 
 file_logger=file_logging("Utils logging")
@@ -19,17 +24,57 @@ def load_params()->dict:
     except Exception as e:
         file_logger.error("Error has been occured in load_params function from utils.py")
         raise CustomException(e,sys)
+
+def resolve_n_workers(n_workers)->int:
+    """Turn an `n_workers` param into a process count; 0, -1 or None mean one per CPU."""
+    if n_workers is None or n_workers <= 0:
+        return os.cpu_count() or 1
+    return n_workers
     
 
 
 
     
-def load_data(data_path:str)->pd.DataFrame:
-    """Using this function we can load data located into given data path."""
+# stage boundary tables (data/raw, data/interim): extension per format, the format of a path comes from its extension
+DATA_EXTENSIONS={'parquet':'.parquet','feather':'.feather','csv':'.csv'}
+
+
+def data_format_of(data_path:str)->str:
+    """parquet for .parquet/.pq, feather for .feather/.arrow (Arrow IPC), csv for anything else (.csv, URLs, .gz)."""
+    name=data_path.lower()
+    if name.endswith(('.parquet','.pq')):
+        return 'parquet'
+    if name.endswith(('.feather','.arrow')):
+        return 'feather'
+    return 'csv'
+
+
+def data_file(stem:str,data_format:str='csv')->str:
+    """Path of a stage boundary table without extension in the configured format: ./data/raw/train_raw -> ./data/raw/train_raw.parquet"""
+    return f"{stem}{DATA_EXTENSIONS[data_format]}"
+
+
+def _read_arrow(data_path:str,columns:list=None,memory_map:bool=False):
+    """Arrow table of a Parquet or Feather file; with memory_map the file is mapped instead of read, so an
+    uncompressed Feather file is used zero copy."""
+    import pyarrow.parquet as pq
+    import pyarrow.feather as feather
+
+    if data_format_of(data_path)=='parquet':
+        return pq.read_table(data_path,columns=columns,memory_map=memory_map)
+    return feather.read_table(data_path,columns=columns,memory_map=memory_map)
+
+
+def load_data(data_path:str,columns:list=None,memory_map:bool=False)->pd.DataFrame:
+    """Using this function we can load data located into given data path (CSV, Parquet or Feather, by extension),
+    optionally only `columns`."""
 
     file_logger.info("Now in load_data function from utils.py")
     try:
-        df=pd.read_csv(data_path)
+        if data_format_of(data_path)=='csv':
+            df=pd.read_csv(data_path,usecols=columns)
+        else:
+            df=_read_arrow(data_path,columns,memory_map).to_pandas()
         file_logger.info(f"successfully load the data from the {data_path}")
         return df
     except Exception as e :
@@ -40,25 +85,549 @@ def load_data(data_path:str)->pd.DataFrame:
 
 
     
-def save_data(df:pd.DataFrame,file_path:str)->None:
-    """This function helps to save csv data in the given folder with given file name"""
+def load_data_chunks(data_path:str,chunksize:int,columns:list=None,memory_map:bool=False):
+    """Using this function we can stream the data located into given data path in chunks of `chunksize` rows."""
+
+    file_logger.info("Now in load_data_chunks function from utils.py")
+    try:
+        data_format=data_format_of(data_path)
+        if data_format=='csv':
+            with pd.read_csv(data_path,chunksize=chunksize,usecols=columns) as reader:
+                yield from reader
+        elif data_format=='parquet':
+            import pyarrow.parquet as pq
+
+            # row groups are decoded batch by batch, never the whole file
+            with pq.ParquetFile(data_path,memory_map=memory_map) as parquet_file:
+                for batch in parquet_file.iter_batches(batch_size=chunksize,columns=columns):
+                    yield batch.to_pandas()
+        else:
+            table=_read_arrow(data_path,columns,memory_map)
+            for offset in range(0,table.num_rows,chunksize):
+                yield table.slice(offset,chunksize).to_pandas()
+        file_logger.info(f"successfully streamed the data from the {data_path}")
+    except Exception as e :
+        file_logger.error("Error has been occured in load_data_chunks function from utils.py")
+        raise CustomException(e,sys)
+    
+
+
+
+    
+def save_data(df:pd.DataFrame,file_path:str,compression:str=None)->None:
+    """This function helps to save data in the given folder with given file name, as CSV, Parquet or Feather by
+    extension; `compression` is the Parquet/Feather codec (zstd, snappy, lz4, uncompressed), None for the default."""
 
     file_logger.info("Now in save_data function from utils.py")
     try:
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        directory=os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
 
-        df.to_csv(file_path,index=False)
-        file_logger.info(f"successfully save the data into {file_path} as csv")
+        data_format=data_format_of(file_path)
+        # parquet spells "no compression" none, feather uncompressed; both are accepted for either
+        uncompressed=str(compression).lower() in ('none','uncompressed')
+        if data_format=='parquet':
+            df.to_parquet(file_path,index=False,compression=None if uncompressed else compression or 'snappy')
+        elif data_format=='feather':
+            df.reset_index(drop=True).to_feather(file_path,compression='uncompressed' if uncompressed else compression)
+        else:
+            df.to_csv(file_path,index=False)
+        file_logger.info(f"successfully save the data into {file_path} as {data_format}")
 
     except Exception as e:
         file_logger.error("Error has been occured in save_data function from utils.py")
         raise CustomException(e,sys)
-    
-    
 
 
+class TableWriter:
+    """save_data for frames arriving in chunks: appends every chunk to one CSV, Parquet or Feather file
+    (format by extension), so a table can be written without ever holding all of it. The file has the
+    schema of the first chunk; closing a writer that got no rows writes an empty table with `columns`."""
 
-    
+    def __init__(self,file_path:str,columns:list,compression:str=None):
+        self.file_path=file_path
+        self.columns=list(columns)
+        self.compression=compression
+        self.data_format=data_format_of(file_path)
+        self.rows=0
+        self._writer=None
+        self._schema=None
 
-    
+    def write(self,df:pd.DataFrame)->None:
+        if not len(df):
+            return
+        df=df[self.columns]
+        try:
+            if self.data_format=='csv':
+                if self.rows==0:
+                    save_data(df,self.file_path)
+                else:
+                    df.to_csv(self.file_path,mode='a',header=False,index=False)
+            else:
+                self._write_arrow(df)
+            self.rows+=len(df)
+        except Exception as e:
+            file_logger.error(f"Error has been occured in TableWriter.write for {self.file_path}")
+            raise CustomException(e,sys)
+
+    def _write_arrow(self,df:pd.DataFrame)->None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self._writer is None:
+            directory=os.path.dirname(self.file_path)
+            if directory:
+                os.makedirs(directory,exist_ok=True)
+            self._schema=pa.Table.from_pandas(df,preserve_index=False).schema
+            uncompressed=str(self.compression).lower() in ('none','uncompressed')
+            if self.data_format=='parquet':
+                self._writer=pq.ParquetWriter(self.file_path,self._schema,
+                                              compression='none' if uncompressed else self.compression or 'snappy')
+            else:
+                options=pa.ipc.IpcWriteOptions(compression=None if uncompressed else self.compression or 'lz4')
+                self._writer=pa.ipc.new_file(self.file_path,self._schema,options=options)
+        # later chunks are cast to the first schema (an all-null chunk would otherwise infer a null column)
+        self._writer.write_table(pa.Table.from_pandas(df,schema=self._schema,preserve_index=False))
+
+    def close(self)->None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer=None
+        elif self.rows==0:
+            save_data(pd.DataFrame(columns=self.columns),self.file_path,self.compression)
+        file_logger.info(f"successfully wrote {self.rows} rows into {self.file_path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*exc):
+        self.close()
+
+
+def append_data(df:pd.DataFrame,file_path:str,compression:str=None)->None:
+    """Append rows to a table written by save_data: in place for CSV, by streaming the old rows and the new ones into
+    a fresh Parquet/Feather file (those cannot be appended to) that then replaces the old one."""
+
+    file_logger.info("Now in append_data function from utils.py")
+    try:
+        if not os.path.exists(file_path):
+            save_data(df,file_path,compression)
+        elif data_format_of(file_path)=='csv':
+            df.to_csv(file_path,mode='a',header=False,index=False)
+        else:
+            tmp_path=f"{file_path}.tmp-{os.getpid()}{DATA_EXTENSIONS[data_format_of(file_path)]}"
+            with TableWriter(tmp_path,df.columns,compression) as writer:
+                for chunk in load_data_chunks(file_path,100000,memory_map=True):
+                    writer.write(chunk)
+                writer.write(df)
+            os.replace(tmp_path,file_path)
+        file_logger.info(f"successfully appended {len(df)} rows to {file_path}")
+
+    except Exception as e:
+        file_logger.error("Error has been occured in append_data function from utils.py")
+        raise CustomException(e,sys)
+
+
+def labels_path(file_path:str)->str:
+    """Path of the label array stored next to a sparse feature file (train_bow.npz -> train_bow_labels.npy)."""
+    base,_=os.path.splitext(file_path)
+    return f"{base}_labels.npy"
+
+
+def save_sparse_data(X,y,file_path:str)->None:
+    """This function saves a sparse feature matrix as CSR .npz and its labels as a .npy next to it"""
+
+    file_logger.info("Now in save_sparse_data function from utils.py")
+    try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+
+        sparse.save_npz(file_path,sparse.csr_matrix(X))
+        np.save(labels_path(file_path),np.asarray(y))
+        file_logger.info(f"successfully save the sparse data into {file_path}")
+
+    except Exception as e:
+        file_logger.error("Error has been occured in save_sparse_data function from utils.py")
+        raise CustomException(e,sys)
+
+
+def processed_data_path(split:str,method:str="bow")->str:
+    """Location of the processed features of `split` (train/test) for a feature_engineering method."""
+    if method=="hashing":
+        return f"./data/processed/{split}_hashing"
+    return f"./data/processed/{split}_bow.npz"
+
+
+def list_sparse_shards(path:str)->list:
+    """Feature files behind `path`: the file itself, or the sorted shard-*.npz files of a directory."""
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(path,name) for name in os.listdir(path)
+            if name.startswith("shard-") and name.endswith(".npz")
+        )
+    return [path]
+
+
+def sparse_shape(file_path:str)->tuple:
+    """Shape of a matrix saved by save_sparse_data, read without loading the matrix."""
+    with np.load(file_path) as file:
+        return tuple(int(n) for n in file["shape"])
+
+
+def load_sparse_data(file_path:str)->tuple:
+    """Using this function we can load a CSR feature matrix and its labels saved by save_sparse_data.
+
+    `file_path` may also be a directory of shards, which are stacked in order."""
+
+    file_logger.info("Now in load_sparse_data function from utils.py")
+    try:
+        shards=list_sparse_shards(file_path)
+        X=sparse.vstack([sparse.load_npz(shard) for shard in shards],format="csr")
+        y=np.concatenate([np.load(labels_path(shard)) for shard in shards])
+        file_logger.info(f"successfully load the sparse data from the {file_path}")
+        return X,y
+    except Exception as e:
+        file_logger.error("Error has been occured in load_sparse_data function from utils.py")
+        raise CustomException(e,sys)
+
+
+#------------------------------Delta processing-----------------------------------------------------
+
+def row_hashes(df:pd.DataFrame,columns:list)->np.ndarray:
+    """uint64 hash of every row over `columns`; a row that changes, moves or disappears changes the sequence."""
+    return pd.util.hash_pandas_object(df[columns],index=False).values
+
+
+def table_row_hashes(data_path:str,columns:list,chunksize:int,memory_map:bool=False)->np.ndarray:
+    """`row_hashes` of the table at `data_path`, read `chunksize` rows at a time instead of loaded whole."""
+    hashes=[row_hashes(chunk,columns) for chunk in load_data_chunks(data_path,chunksize,columns,memory_map)]
+    return np.concatenate(hashes) if hashes else np.empty(0,dtype=np.uint64)
+
+
+def stage_fingerprint(params:dict,code:list)->str:
+    """sha256 of the params and the source files that decide what a stage writes for a row."""
+    digest=hashlib.sha256(json.dumps(params,sort_keys=True,default=str).encode())
+    for path in code:
+        with open(path,"rb") as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+def load_manifest(path:str)->tuple:
+    """(fingerprint, row hashes) saved by save_manifest, (None, empty) when there is none."""
+    try:
+        with np.load(path) as manifest:
+            return str(manifest['fingerprint']),manifest['hashes']
+    except (OSError,ValueError,KeyError):
+        return None,np.empty(0,dtype=np.uint64)
+
+
+def manifest_path(path:str)->str:
+    """Row manifest kept next to the features of a split (train_bow.npz / train_hashing -> train_*_manifest.npz)."""
+    base,_=os.path.splitext(path)
+    return f"{base}_manifest.npz"
+
+
+def save_manifest(path:str,fingerprint:str,hashes:np.ndarray)->None:
+    """Record the rows (by row_hashes) a stage has turned into its outputs, next to those outputs."""
+    directory=os.path.dirname(path)
+    if directory:
+        os.makedirs(directory,exist_ok=True)
+    tmp_path=f"{path}.tmp-{os.getpid()}.npz"
+    np.savez(tmp_path,fingerprint=np.array(fingerprint),hashes=np.asarray(hashes,dtype=np.uint64))
+    os.replace(tmp_path,path)
+
+
+def processed_rows(manifest_path:str,fingerprint:str,hashes:np.ndarray)->int:
+    """How many leading rows of the input (given by their hashes) are already in the outputs.
+
+    The manifest counts only while it was written with the same fingerprint and its rows are still the
+    prefix of the input; anything else (changed params or code, an edited or removed row) returns 0, a
+    full rebuild, so processing only the rows after the returned index always equals a rebuild."""
+    previous_fingerprint,previous=load_manifest(manifest_path)
+    if previous_fingerprint!=fingerprint or len(previous)>len(hashes):
+        return 0
+    if not np.array_equal(previous,hashes[:len(previous)]):
+        return 0
+    return len(previous)
+
+
+#------------------------------Stage cache----------------------------------------------------------
+
+STAGE_CACHE_DIR=os.getenv("STAGE_CACHE_DIR",".cache/stages")
+
+# bound on the blobs kept under the stage cache, least recently used entries go first (0 = unbounded)
+STAGE_CACHE_MAX_BYTES=int(os.getenv("STAGE_CACHE_MAX_BYTES",str(5*2**30)))
+
+
+def _remove_path(path:str)->None:
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    elif os.path.lexists(path):
+        os.remove(path)
+
+
+def _tree_digests(trees:list)->set:
+    """Blob digests referenced by the output trees of a cache entry."""
+    digests=set()
+    for tree in trees:
+        if isinstance(tree,str):
+            digests.add(tree)
+        elif tree:
+            digests.update(tree.values())
+    return digests
+
+
+class StageCache:
+    """Content addressed cache of stage outputs under `root` (default STAGE_CACHE_DIR, .cache/stages).
+
+    The key of a stage run is a sha256 over the contents of its input files/directories, the
+    params it reads and the source of its code, so an unchanged stage is restored by copying its
+    outputs back, whether it runs under `dvc repro`, from a notebook or from a test. File digests
+    are remembered by (path, size, mtime) so unchanged inputs are not re-read.
+
+    An entry <root>/<stage>/<key>/manifest.json maps every output file to a blob <root>/blobs/<sha256>,
+    so a file shared by several entries (an unchanged vectorizer, the same shards under other params)
+    is stored once. The entry mtime records the last use; after every store the least recently used
+    entries are dropped until the blobs fit in `max_bytes` (STAGE_CACHE_MAX_BYTES, 5 GiB by default,
+    0 = unbounded), see `evict`. STAGE_CACHE=0 turns the cache off.
+    """
+
+    def __init__(self,root:str=None,enabled:bool=None,max_bytes:int=None):
+        self.root=root or STAGE_CACHE_DIR
+        self.enabled=enabled if enabled is not None else os.getenv("STAGE_CACHE","1")!="0"
+        self.max_bytes=max_bytes if max_bytes is not None else STAGE_CACHE_MAX_BYTES
+        self.hits=0
+        self.misses=0
+        self._digests=None
+
+    #------------------------------keys-----------------------------------------------------------
+
+    def _digest_index(self)->dict:
+        if self._digests is None:
+            try:
+                with open(os.path.join(self.root,"digests.json"),"r") as file:
+                    self._digests=json.load(file)
+            except (OSError,ValueError):
+                self._digests={}
+        return self._digests
+
+    def _save_digest_index(self)->None:
+        os.makedirs(self.root,exist_ok=True)
+        tmp_path=os.path.join(self.root,"digests.json.tmp")
+        with open(tmp_path,"w") as file:
+            json.dump(self._digests,file)
+        os.replace(tmp_path,os.path.join(self.root,"digests.json"))
+
+    def file_digest(self,path:str)->str:
+        """sha256 of a file (memoized by size and mtime) or of a directory tree (names + file digests)."""
+        if os.path.isdir(path):
+            digest=hashlib.sha256()
+            for root,dirs,names in os.walk(path):
+                dirs.sort()
+                for name in sorted(names):
+                    file_path=os.path.join(root,name)
+                    digest.update(os.path.relpath(file_path,path).encode())
+                    digest.update(self.file_digest(file_path).encode())
+            return digest.hexdigest()
+
+        if not os.path.exists(path):
+            return "missing"
+
+        stat=os.stat(path)
+        index=self._digest_index()
+        entry=index.get(os.path.abspath(path))
+        if entry and entry[0]==stat.st_size and entry[1]==stat.st_mtime_ns:
+            return entry[2]
+
+        digest=hashlib.sha256()
+        with open(path,"rb") as file:
+            for block in iter(lambda: file.read(1<<20),b""):
+                digest.update(block)
+        index[os.path.abspath(path)]=[stat.st_size,stat.st_mtime_ns,digest.hexdigest()]
+        return digest.hexdigest()
+
+    def key(self,stage:str,inputs:list,params:dict,code:list)->str:
+        """Cache key of one stage run."""
+        description={
+            'stage':stage,
+            'inputs':{path:self.file_digest(path) for path in inputs},
+            'params':params,
+            'code':{os.path.relpath(path):self.file_digest(path) for path in code},
+        }
+        if self._digests is not None:
+            self._save_digest_index()
+        return hashlib.sha256(json.dumps(description,sort_keys=True,default=str).encode()).hexdigest()
+
+    #------------------------------entries--------------------------------------------------------
+
+    def _entry(self,stage:str,key:str)->str:
+        return os.path.join(self.root,stage,key)
+
+    def _blob(self,digest:str)->str:
+        return os.path.join(self.root,"blobs",digest[:2],digest)
+
+    def _store_blob(self,path:str)->str:
+        """Digest of the file at `path`, copied into the blob store unless that content is there already."""
+        digest=self.file_digest(path)
+        blob=self._blob(digest)
+        if not os.path.exists(blob):
+            os.makedirs(os.path.dirname(blob),exist_ok=True)
+            tmp_blob=f"{blob}.tmp-{os.getpid()}"
+            shutil.copyfile(path,tmp_blob)
+            os.replace(tmp_blob,blob)
+        return digest
+
+    def _tree(self,path:str):
+        """Blob digest of a file output, {relative path: blob digest} of a directory output, None if absent."""
+        if not os.path.exists(path):
+            return None
+        if not os.path.isdir(path):
+            return self._store_blob(path)
+        return {os.path.relpath(os.path.join(root,name),path):self._store_blob(os.path.join(root,name))
+                for root,_,names in os.walk(path) for name in names}
+
+    def _restore_blob(self,digest:str,target:str)->None:
+        parent=os.path.dirname(target)
+        if parent:
+            os.makedirs(parent,exist_ok=True)
+        shutil.copyfile(self._blob(digest),target)
+
+    def restore(self,stage:str,key:str,outputs:list)->bool:
+        """Copy the cached outputs of `key` back into place; False if there is no complete entry."""
+        entry=self._entry(stage,key)
+        try:
+            with open(os.path.join(entry,"manifest.json"),"r") as file:
+                manifest=json.load(file)
+        except (OSError,ValueError):
+            return False
+        if sorted(manifest['outputs'])!=sorted(outputs):
+            return False
+        if not all(os.path.exists(self._blob(digest)) for digest in _tree_digests(manifest['trees'])):
+            return False
+
+        for path,tree in zip(manifest['outputs'],manifest['trees']):
+            # an output the run did not write (e.g. no linear export) is restored as absent
+            _remove_path(path)
+            if isinstance(tree,str):
+                self._restore_blob(tree,path)
+            elif tree is not None:
+                os.makedirs(path,exist_ok=True)
+                for name,digest in tree.items():
+                    self._restore_blob(digest,os.path.join(path,name))
+        os.utime(entry)
+        return True
+
+    def store(self,stage:str,key:str,outputs:list)->None:
+        """Save `outputs` as the entry of `key`: new file contents go to the blob store, the manifest
+        is written aside and moved in place."""
+        trees=[self._tree(path) for path in outputs]
+        if self._digests is not None:
+            self._save_digest_index()
+
+        entry=self._entry(stage,key)
+        tmp_entry=f"{entry}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_entry,ignore_errors=True)
+        os.makedirs(tmp_entry)
+        size=sum(os.path.getsize(self._blob(digest)) for digest in _tree_digests(trees))
+        with open(os.path.join(tmp_entry,"manifest.json"),"w") as file:
+            json.dump({'stage':stage,'outputs':list(outputs),'trees':trees,'bytes':size},file,indent=4)
+
+        shutil.rmtree(entry,ignore_errors=True)
+        os.replace(tmp_entry,entry)
+
+    def run(self,stage:str,fn,inputs:list,outputs:list,params:dict,code:list)->bool:
+        """Restore the outputs of an identical earlier run of `stage`, or call `fn()` and cache what it
+        wrote. Returns True on a hit. The cache is bounded to `max_bytes` after every store."""
+        if not self.enabled:
+            fn()
+            return False
+
+        key=self.key(stage,inputs,params,code)
+        if self.restore(stage,key,outputs):
+            self.hits+=1
+            file_logger.info(f"stage cache hit for {stage} ({key[:12]}), outputs restored")
+            return True
+
+        self.misses+=1
+        file_logger.info(f"stage cache miss for {stage} ({key[:12]})")
+        fn()
+        self.store(stage,key,outputs)
+
+        if self.max_bytes:
+            self.evict(self.max_bytes)
+        return False
+
+    #------------------------------housekeeping---------------------------------------------------
+
+    def _manifests(self)->list:
+        """(path, manifest, last used) of every complete entry, least recently used first."""
+        found=[]
+        if not os.path.isdir(self.root):
+            return found
+        for stage in os.listdir(self.root):
+            stage_dir=os.path.join(self.root,stage)
+            if stage=="blobs" or not os.path.isdir(stage_dir):
+                continue
+            for key in os.listdir(stage_dir):
+                manifest_path=os.path.join(stage_dir,key,"manifest.json")
+                if os.path.exists(manifest_path):
+                    with open(manifest_path,"r") as file:
+                        manifest=json.load(file)
+                    found.append((os.path.join(stage_dir,key),manifest,os.path.getmtime(os.path.join(stage_dir,key))))
+        return sorted(found,key=lambda entry: entry[2])
+
+    def _blob_sizes(self)->dict:
+        """Size of every blob in the store by digest."""
+        sizes={}
+        for root,_,names in os.walk(os.path.join(self.root,"blobs")):
+            for name in names:
+                if ".tmp-" not in name:
+                    sizes[name]=os.path.getsize(os.path.join(root,name))
+        return sizes
+
+    def entries(self)->list:
+        """(path, bytes, last used) of every complete entry, least recently used first; bytes counts
+        every blob the entry references, including the ones it shares."""
+        return [(path,manifest['bytes'],used) for path,manifest,used in self._manifests()]
+
+    def evict(self,max_bytes:int)->int:
+        """Delete least recently used entries until the blobs they leave referenced take at most
+        `max_bytes`, returns bytes freed. Unreferenced blobs are always deleted."""
+        sizes=self._blob_sizes()
+        refs={}
+        entries=[]
+        freed=0
+        for path,manifest,_ in self._manifests():
+            digests=_tree_digests(manifest['trees'])
+            for digest in digests:
+                refs[digest]=refs.get(digest,0)+1
+            entries.append((path,digests))
+
+        for digest in [digest for digest in sizes if digest not in refs]:
+            os.remove(self._blob(digest))
+            freed+=sizes.pop(digest)
+
+        total=sum(sizes.values())
+        for path,digests in entries:
+            if total<=max_bytes:
+                break
+            shutil.rmtree(path,ignore_errors=True)
+            for digest in digests:
+                refs[digest]-=1
+                if refs[digest]==0 and digest in sizes:
+                    os.remove(self._blob(digest))
+                    total-=sizes[digest]
+                    freed+=sizes[digest]
+        if freed:
+            file_logger.info(f"stage cache evicted {freed} bytes from {self.root}")
+        return freed
 
+    def stats(self)->dict:
+        return {
+            'root':self.root,
+            'entries':len(self._manifests()),
+            'bytes':sum(self._blob_sizes().values()),
+            'hits':self.hits,
+            'misses':self.misses,
+        }
@@ -0,0 +1,23 @@
+import os
+import tempfile
+
+# data_io params the incremental stage tests run with
+DATA_IO = {'format': 'parquet', 'compression': 'zstd', 'memory_map': True}
+
+
+class ScratchDirMixin:
+    """Gives each test a fresh temporary directory to run pipeline stages in; the stages read and write
+    relative paths (data/, models/), so `enter` switches the working directory, restored after the test."""
+
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+
+    def enter(self, directory):
+        """Create `directory` under the scratch directory and make it the working directory."""
+        path = os.path.join(self.tmp.name, directory)
+        os.makedirs(path, exist_ok=True)
+        os.chdir(path)
+        return path
@@ -0,0 +1,94 @@
+import asyncio
+import json
+import unittest
+from concurrent.futures import Future
+from unittest import mock
+from flask_app import asgi
+from src.serving.model_store import ModelStore
+
+
+class FixedBundle:
+    version = "7"
+
+    def score(self, texts):
+        return [int('love' in text) for text in texts], [0.9 if 'love' in text else 0.2 for text in texts]
+
+
+class FixedSource:
+    kind = "fake"
+
+    def probe(self):
+        return FixedBundle.version
+
+    def load(self, version=None):
+        return FixedBundle()
+
+
+def call(method, path, body=b'', content_type=b'application/json', query=b''):
+    """Run one request through the ASGI callable, returns (status, headers, body)."""
+    sent = []
+    chunks = [{'type': 'http.request', 'body': body, 'more_body': False}]
+
+    async def receive():
+        return chunks.pop(0) if chunks else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query,
+             'headers': [(b'content-type', content_type)]}
+    asyncio.run(asgi.app(scope, receive, send))
+    return sent[0]['status'], dict(sent[0]['headers']), b''.join(message.get('body', b'') for message in sent[1:])
+
+
+class AsgiAppTests(unittest.TestCase):
+
+    def setUp(self):
+        self.original_store = asgi.store
+        asgi.store = ModelStore(FixedSource()).start(background=False)
+
+    def tearDown(self):
+        asgi.store = self.original_store
+
+    def test_predict_form(self):
+        status, headers, body = call('POST', '/predict', b'text=I+love+this', b'application/x-www-form-urlencoded')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body), {'label': 1, 'model_version': '7'})
+        self.assertEqual(headers[b'x-model-version'], b'7')
+
+    def test_predict_timeout_is_a_503(self):
+        # a batcher that never answers
+        with mock.patch.object(asgi.batcher, 'submit', side_effect=lambda text: Future()), \
+                mock.patch.object(asgi, 'cache', None), mock.patch.object(asgi, 'BATCH_TIMEOUT', 0.01):
+            status, _, _ = call('POST', '/predict', b'text=I+love+this', b'application/x-www-form-urlencoded')
+
+        self.assertEqual(status, 503)
+
+    def test_json_batch_predict(self):
+        status, _, body = call('POST', '/v1/predict', json.dumps({'texts': ['I love this', 'so sad']}).encode())
+
+        self.assertEqual(status, 200)
+        self.assertEqual([p['label'] for p in json.loads(body)['predictions']], [1, 0])
+
+    def test_json_batch_predict_streams_ndjson(self):
+        status, headers, body = call('POST', '/v1/predict', json.dumps(['I love this'] * 3).encode(), query=b'stream=1')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(headers[b'content-type'], b'application/x-ndjson')
+        self.assertEqual(len(body.decode().splitlines()), 3)
+
+    def test_rejects_bad_payload_and_unknown_routes(self):
+        self.assertEqual(call('POST', '/v1/predict', b'{"texts": "not a list"}')[0], 400)
+        self.assertEqual(call('POST', '/predict', b'{}')[0], 400)
+        self.assertEqual(call('GET', '/nope')[0], 404)
+
+    def test_ready(self):
+        status, _, body = call('GET', '/ready')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)['model_version'], '7')
+
+
+if __name__ == '__main__':
+    unittest.main()
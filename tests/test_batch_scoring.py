@@ -0,0 +1,69 @@
+import os
+import pickle
+import tempfile
+import unittest
+import pandas as pd
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.linear_model import LogisticRegression
+from src.data.text_normalizer import TextNormalizer
+from src.model.batch_scoring import score_file
+
+TEXTS = ["I love this!", "so sad today :(", "Happy friday with friends", "missing home...", None, "LOVE the cats"] * 7
+
+
+class BatchScoringTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        normalized = TextNormalizer().normalize_many([text or '' for text in TEXTS])
+        cls.vectorizer = CountVectorizer().fit(normalized)
+        cls.model = LogisticRegression().fit(cls.vectorizer.transform(normalized), [1, 0, 1, 0, 0, 1] * 7)
+        cls.expected = cls.model.predict_proba(cls.vectorizer.transform(normalized))[:, 1]
+
+        cls.model_path = os.path.join(cls.tmp.name, 'model.pkl')
+        cls.vectorizer_path = os.path.join(cls.tmp.name, 'vectorizer.pkl')
+        pickle.dump(cls.model, open(cls.model_path, 'wb'))
+        pickle.dump(cls.vectorizer, open(cls.vectorizer_path, 'wb'))
+
+        cls.frame = pd.DataFrame({'tweet_id': range(100, 100 + len(TEXTS)), 'content': TEXTS})
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def score(self, input_name, output_name, **kwargs):
+        output_path = os.path.join(self.tmp.name, output_name)
+        summary = score_file(os.path.join(self.tmp.name, input_name), output_path, self.model_path,
+                             spec_path=os.path.join(self.tmp.name, 'missing.json'), vectorizer_path=self.vectorizer_path,
+                             lemma_cache_path=None, chunk_size=5, **kwargs)
+        return summary, output_path
+
+    def test_csv_in_chunks_matches_pipeline(self):
+        self.frame.to_csv(os.path.join(self.tmp.name, 'tweets.csv'), index=False)
+
+        summary, output_path = self.score('tweets.csv', 'scores.csv', id_column='tweet_id')
+        result = pd.read_csv(output_path)
+
+        self.assertEqual(summary['rows'], len(TEXTS))
+        self.assertEqual(result['tweet_id'].tolist(), self.frame['tweet_id'].tolist())
+        self.assertEqual(result['probability'].round(9).tolist(), self.expected.round(9).tolist())
+
+    def test_parallel_jsonl_keeps_row_order(self):
+        self.frame.to_json(os.path.join(self.tmp.name, 'tweets.jsonl'), orient='records', lines=True)
+
+        _, output_path = self.score('tweets.jsonl', 'scores.jsonl', n_workers=2)
+        result = pd.read_json(output_path, lines=True)
+        with open(output_path, encoding='utf-8') as file:
+            raw = file.read()
+
+        # one record per line across chunk boundaries, no blank lines
+        self.assertEqual(raw.count('\n'), len(TEXTS))
+        self.assertNotIn('\n\n', raw)
+        self.assertTrue(raw.endswith('}\n'))
+        self.assertEqual(result['row'].tolist(), list(range(len(TEXTS))))
+        self.assertEqual(result['label'].tolist(), (self.expected > 0.5).astype(int).tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
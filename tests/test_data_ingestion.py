@@ -0,0 +1,102 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+import numpy as np
+from src.data.data_ingestion import ingest, list_sources, hash_split, split_keys
+from src.utils import load_data, save_data
+
+SENTIMENTS = ['happiness', 'sadness', 'neutral', 'worry']
+
+
+def make_source(n_rows, start=0):
+    return pd.DataFrame({
+        'tweet_id': range(1956967341 + start, 1956967341 + start + n_rows),
+        'sentiment': [SENTIMENTS[i % len(SENTIMENTS)] for i in range(start, start + n_rows)],
+        'author': [f'user_{i}' for i in range(start, start + n_rows)],
+        'content': [f'tweet number {i}' for i in range(start, start + n_rows)],
+    })
+
+
+class IngestTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.source = os.path.join(self.tmp.name, 'source')
+        save_data(make_source(500), os.path.join(self.source, 'part-0.csv'))
+        save_data(make_source(300, 500), os.path.join(self.source, 'nested', 'part-1.parquet'))
+        with open(os.path.join(self.source, 'README.txt'), 'w') as file:
+            file.write('not a table')
+
+    def run_ingest(self, chunk_size, data_format='parquet'):
+        paths = [os.path.join(self.tmp.name, f'out-{chunk_size}', f'{split}_raw.{data_format}') for split in ('train', 'test')]
+        counts = ingest(self.source, *paths, test_size=0.2, chunk_size=chunk_size)
+        return counts, [load_data(path) for path in paths]
+
+    def test_directory_sources_are_sorted_tables_only(self):
+        self.assertEqual([os.path.relpath(path, self.source) for path in list_sources(self.source)],
+                         ['nested/part-1.parquet', 'part-0.csv'])
+
+    def test_filters_and_maps_every_chunk(self):
+        counts, (train, test) = self.run_ingest(chunk_size=64)
+
+        self.assertEqual(counts, {'read': 800, 'train': len(train), 'test': len(test)})
+        self.assertEqual(len(train) + len(test), 400)
+        self.assertEqual(list(train.columns), ['sentiment', 'author', 'content'])
+        self.assertEqual(set(train['sentiment']) | set(test['sentiment']), {0, 1})
+        self.assertFalse(set(train['author']) & set(test['author']))
+
+    def test_split_does_not_depend_on_chunk_size_or_format(self):
+        _, (train_small, test_small) = self.run_ingest(chunk_size=7)
+        _, (train_large, test_large) = self.run_ingest(chunk_size=10000, data_format='csv')
+
+        self.assertEqual(train_small['author'].tolist(), train_large['author'].tolist())
+        self.assertEqual(test_small['author'].tolist(), test_large['author'].tolist())
+
+    def test_growing_the_source_only_appends_rows(self):
+        _, (train_before, test_before) = self.run_ingest(chunk_size=50)
+        save_data(make_source(200, 800), os.path.join(self.source, 'part-2.csv'))
+        _, (train_after, test_after) = self.run_ingest(chunk_size=50)
+
+        self.assertEqual(train_after['author'].tolist()[:len(train_before)], train_before['author'].tolist())
+        self.assertEqual(test_after['author'].tolist()[:len(test_before)], test_before['author'].tolist())
+        self.assertEqual(len(train_after) + len(test_after), 500)
+
+
+class HashSplitTests(unittest.TestCase):
+
+    def test_proportions_follow_test_size(self):
+        frame = make_source(50000)
+        for test_size in (0.1, 0.2, 0.5):
+            with self.subTest(test_size=test_size):
+                self.assertAlmostEqual(hash_split(frame, test_size).mean(), test_size, delta=0.01)
+        self.assertFalse(hash_split(frame, 0.0).any())
+        self.assertTrue(hash_split(frame, 1.0).all())
+
+    def test_assignment_is_per_row(self):
+        frame = make_source(2000)
+        is_test = hash_split(frame, 0.2)
+
+        shuffled = frame.sample(frac=1, random_state=3)
+        np.testing.assert_array_equal(hash_split(shuffled, 0.2), is_test[shuffled.index])
+        np.testing.assert_array_equal(np.concatenate([hash_split(frame[:700], 0.2), hash_split(frame[700:], 0.2)]), is_test)
+
+    def test_missing_ids_fall_back_to_content(self):
+        frame = make_source(4)
+        frame['tweet_id'] = frame['tweet_id'].astype(float)
+        frame.loc[1, 'tweet_id'] = np.nan
+        frame.loc[2, 'tweet_id'] = None
+
+        keys = split_keys(frame)
+
+        self.assertEqual(keys[0], '1956967341')
+        self.assertEqual(keys[1], 'content:tweet number 1')
+        self.assertEqual(split_keys(frame.drop(columns='tweet_id'))[0], 'content:tweet number 0')
+        # an id read as float splits like the same id read as int
+        np.testing.assert_array_equal(hash_split(make_source(500).astype({'tweet_id': float}), 0.3),
+                                      hash_split(make_source(500), 0.3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,175 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import pandas as pd
+from nltk.corpus import stopwords
+from nltk.stem import WordNetLemmatizer
+from src.data import data_preprocessing as dp
+from src.data.text_normalizer import TextNormalizer, LemmaCache
+from src.utils import load_data, save_data
+from tests.helpers import DATA_IO, ScratchDirMixin
+
+SAMPLES = [
+    "I love this!",
+    "@tiffanylue i know  i was listenin to bad habit earlier and i started freakin at his part =[",
+    "Layin n bed with a headache  ughhhh...waitin on your call...",
+    "Funeral ceremony...gloomy friday...",
+    "wants to hang out with friends SOON! http://t.co/abc123 www.example.com/page",
+    "Re-pinging @ghostridah14: why didn't you go to prom? BC my bf didn't like my friends",
+    "We   had 2 dogs & 3 cats in 2009; now none :( ²³ ٣ ①",
+    "THE Cats were RUNNING to the churches؛ geese, mice and wolves",
+    "   ",
+    "",
+    "don't won't shouldn't DON'T i'm I'M",
+    "ΟΔΟΣ café naïve Straße résumé",
+    "tabs\tand\nnewlines\r\nand nbsp em-space",
+    "#hashtag $money 100% {braces} [brackets] <html> a_b a-b a.b",
+]
+
+
+def legacy_normalize(text):
+    """The original six step chain the fused normalizer replaces. Stop words and lemmas come from
+    nltk directly rather than through dp, whose helpers share the normalizer under test."""
+    stop_words = set(stopwords.words('english'))
+    lemmatizer = WordNetLemmatizer()
+    text = dp.lower_case(text)
+    text = " ".join([word for word in str(text).split() if word not in stop_words])
+    text = dp.removing_numbers(text)
+    text = dp.removing_punctuations(text)
+    text = dp.removing_urls(text)
+    return " ".join([lemmatizer.lemmatize(word) for word in text.split()])
+
+
+class TextNormalizerTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.normalizer = TextNormalizer()
+
+    def test_matches_legacy_chain(self):
+        for text in SAMPLES:
+            with self.subTest(text=text):
+                self.assertEqual(self.normalizer(text), legacy_normalize(text))
+
+    def test_normalize_text_frame_parity(self):
+        df = pd.DataFrame({'sentiment': [1, 0] * (len(SAMPLES) // 2), 'content': SAMPLES})
+        expected = [legacy_normalize(text) for text in SAMPLES]
+
+        result = dp.normalize_text(df.copy())
+
+        self.assertEqual(result['content'].tolist(), expected)
+        self.assertEqual(result['sentiment'].tolist(), df['sentiment'].tolist())
+
+    def test_parallel_matches_serial(self):
+        df = pd.DataFrame({'sentiment': [1, 0] * (len(SAMPLES) * 5), 'content': SAMPLES * 10})
+        df.index = df.index[::-1]
+
+        serial = dp.normalize_text(df.copy())
+        parallel = dp.normalize_text_parallel(df.copy(), n_workers=2, chunk_size=7)
+
+        pd.testing.assert_frame_equal(parallel, serial)
+
+    def test_remove_small_sentences_vectorized(self):
+        texts = ["one two three", "one two", "", None, " a\tb \u2003c ", "x\ny", "\u00a0a\u00a0b\u00a0c"]
+        df = pd.DataFrame({'text': texts})
+
+        result = dp.remove_small_sentences(df)
+
+        # same words as str.split(), which the row loop used
+        kept = [text is not None and len(text.split()) >= 3 for text in texts]
+        self.assertEqual(result['text'].notna().tolist(), kept)
+        self.assertEqual(result['text'].dropna().tolist(), [text for text, keep in zip(texts, kept) if keep])
+
+    def test_drop_small_sentences_is_optional(self):
+        df = pd.DataFrame({'sentiment': [1, 0, 1], 'content': ["love sunny day", "sad", "miss my home"]})
+
+        self.assertIs(dp.drop_small_sentences(df, 0), df)
+        self.assertEqual(dp.drop_small_sentences(df.copy(), 3)['sentiment'].tolist(), [1, 1])
+
+
+class IncrementalPreprocessTests(ScratchDirMixin, unittest.TestCase):
+    """preprocess on a growing data/raw against a full rebuild."""
+
+    PARAMS = {'n_workers': 1, 'chunk_size': 4, 'lemma_cache_size': 1000, 'lemma_cache_path': 'models/lemma_cache.json',
+              'min_words': 2}
+
+    def raw(self, rows):
+        return pd.DataFrame({'sentiment': [i % 2 for i in rows], 'author': [f'user_{i}' for i in rows],
+                             'content': [SAMPLES[i % len(SAMPLES)] for i in rows]})
+
+    def run_preprocess(self, directory, train_rows, test_rows):
+        self.enter(directory)
+        save_data(self.raw(train_rows), 'data/raw/train_raw.parquet')
+        save_data(self.raw(test_rows), 'data/raw/test_raw.parquet')
+        dp.preprocess(self.PARAMS, DATA_IO)
+        return [load_data(f'data/interim/{split}_processed.parquet') for split in ('train', 'test')]
+
+    def test_new_rows_are_appended_like_a_rebuild(self):
+        self.run_preprocess('delta', range(0, 20), range(100, 105))
+        with mock.patch.object(dp, 'normalize_text_parallel', side_effect=dp.normalize_text_parallel) as normalize:
+            delta = self.run_preprocess('delta', range(0, 30), range(100, 105))
+
+        full = self.run_preprocess('full', range(0, 30), range(100, 105))
+
+        for delta_frame, full_frame in zip(delta, full):
+            pd.testing.assert_frame_equal(delta_frame, full_frame)
+        # train got 10 new rows, test none
+        self.assertEqual([len(call.args[0]) for call in normalize.call_args_list], [10])
+
+    def test_changed_rows_rebuild_everything(self):
+        self.run_preprocess('delta', range(0, 20), range(100, 105))
+        with mock.patch.object(dp, 'normalize_text_parallel', side_effect=dp.normalize_text_parallel) as normalize:
+            delta = self.run_preprocess('delta', range(1, 21), range(100, 105))
+
+        full = self.run_preprocess('full', range(1, 21), range(100, 105))
+
+        pd.testing.assert_frame_equal(delta[0], full[0])
+        self.assertEqual([len(call.args[0]) for call in normalize.call_args_list], [20])
+
+
+class LemmaCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+
+        def lemmatize(word):
+            self.calls.append(word)
+            return word.rstrip('s')
+
+        self.cache = LemmaCache(lemmatize, maxsize=2)
+
+    def test_hits_and_misses(self):
+        self.assertEqual([self.cache(w) for w in ['cats', 'cats', 'dogs', 'cats']], ['cat', 'cat', 'dog', 'cat'])
+        self.assertEqual(self.calls, ['cats', 'dogs'])
+        self.assertEqual(self.cache.stats()['hits'], 2)
+        self.assertEqual(self.cache.stats()['misses'], 2)
+
+    def test_evicts_least_recently_used(self):
+        for word in ['cats', 'dogs', 'cats', 'mice']:
+            self.cache(word)
+
+        self.cache('cats')
+        self.cache('dogs')
+
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.calls, ['cats', 'dogs', 'mice', 'dogs'])
+
+    def test_save_and_warm_start(self):
+        self.cache('cats')
+        self.cache('dogs')
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'lemma_cache.json')
+            self.cache.save(path)
+
+            warm = LemmaCache(lambda word: self.fail(f"{word} should come from the cache"), maxsize=2)
+            warm.load(path)
+
+            self.assertEqual(warm('cats'), 'cat')
+            self.assertEqual(warm('dogs'), 'dog')
+            self.assertEqual(warm.stats()['hits'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,184 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import CountVectorizer
+from src.features.feature_engineering import apply_hashing, build_features
+from src.features.vectorizers import (build_hashing_vectorizer, load_vectorizer, save_vectorizer_spec,
+                                      save_vocabulary, vocabulary_version, VocabularyVectorizer)
+from src.utils import load_sparse_data, list_sparse_shards, save_data
+from tests.helpers import DATA_IO, ScratchDirMixin
+
+
+class HashingFeatureTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.data_path = os.path.join(cls.tmp.name, 'train_processed.csv')
+        contents = ['love sunny day', 'sad rainy day', None, 'happy happy friend', 'miss home'] * 7
+        cls.frame = pd.DataFrame({'sentiment': [1, 0, 1, 1, 0] * 7, 'content': contents})
+        cls.frame.to_csv(cls.data_path, index=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def expected(self, n_features):
+        return build_hashing_vectorizer(n_features).transform(self.frame['content'].fillna(''))
+
+    def test_shards_stack_to_full_transform(self):
+        output_dir = os.path.join(self.tmp.name, 'serial')
+        n_rows = apply_hashing(self.data_path, output_dir, n_features=1024, chunk_size=8)
+
+        X, y = load_sparse_data(output_dir)
+
+        self.assertEqual(n_rows, len(self.frame))
+        self.assertEqual(len(list_sparse_shards(output_dir)), 5)
+        self.assertEqual((X != self.expected(1024)).nnz, 0)
+        self.assertEqual(y.tolist(), self.frame['sentiment'].tolist())
+
+    def test_parallel_shards_match_serial(self):
+        output_dir = os.path.join(self.tmp.name, 'parallel')
+        apply_hashing(self.data_path, output_dir, n_features=1024, chunk_size=4, n_workers=2)
+
+        X, y = load_sparse_data(output_dir)
+
+        self.assertEqual((X != self.expected(1024)).nnz, 0)
+        self.assertEqual(y.tolist(), self.frame['sentiment'].tolist())
+
+    def test_skip_rows_keeps_earlier_shards(self):
+        output_dir = os.path.join(self.tmp.name, 'delta')
+        apply_hashing(self.data_path, output_dir, n_features=1024, chunk_size=8)
+        first_shard = os.path.join(output_dir, 'shard-00000.npz')
+        os.utime(first_shard, (0, 0))
+
+        n_rows = apply_hashing(self.data_path, output_dir, n_features=1024, chunk_size=8, skip_rows=16)
+        X, _ = load_sparse_data(output_dir)
+
+        self.assertEqual(n_rows, len(self.frame) - 16)
+        self.assertEqual(os.path.getmtime(first_shard), 0)
+        self.assertEqual(len(list_sparse_shards(output_dir)), 5)
+        self.assertEqual((X != self.expected(1024)).nnz, 0)
+
+    def test_serving_rebuilds_hashing_transform_from_spec(self):
+        spec_path = os.path.join(self.tmp.name, 'vectorizer.json')
+        save_vectorizer_spec({'method': 'hashing', 'n_features': 1024}, spec_path)
+
+        vectorizer = load_vectorizer(spec_path, os.path.join(self.tmp.name, 'missing.pkl'))
+
+        self.assertEqual((vectorizer.transform(['love sunny day']) != self.expected(1024)[0]).nnz, 0)
+
+
+class IncrementalFeatureTests(ScratchDirMixin, unittest.TestCase):
+    """build_features on a growing data/interim against a full rebuild."""
+
+    CONTENTS = ['love sunny day', 'sad rainy day', None, 'happy happy friend', 'miss home', 'new words only here']
+
+    def frame(self, n_rows):
+        return pd.DataFrame({'sentiment': [i % 2 for i in range(n_rows)],
+                             'content': [self.CONTENTS[i % len(self.CONTENTS)] for i in range(n_rows)]})
+
+    def build(self, directory, n_train, n_test, params, vectorizer_from=None):
+        self.enter(directory)
+        os.makedirs('models', exist_ok=True)
+        save_data(self.frame(n_train), 'data/interim/train_processed.parquet')
+        save_data(self.frame(n_test), 'data/interim/test_processed.parquet')
+        if vectorizer_from:
+            shutil.copy(os.path.join(self.tmp.name, vectorizer_from, 'models', 'vectorizer.pkl'), 'models/vectorizer.pkl')
+        build_features(params, DATA_IO)
+        return {split: load_sparse_data(f'data/processed/{split}_{params["method"]}' +
+                                        ('.npz' if params['method'] == 'bow' else '')) for split in ('train', 'test')}
+
+    def assert_same_features(self, delta, full):
+        for split in ('train', 'test'):
+            self.assertEqual(delta[split][0].shape, full[split][0].shape)
+            self.assertEqual((delta[split][0] != full[split][0]).nnz, 0)
+            np.testing.assert_array_equal(delta[split][1], full[split][1])
+
+    def test_frozen_vocabulary_delta_matches_rebuild(self):
+        params = {'method': 'bow', 'max_features': 50, 'freeze_vocabulary': True, 'chunk_size': 7}
+        self.build('delta', 20, 5, params)
+        with mock.patch.object(CountVectorizer, 'transform', autospec=True, side_effect=CountVectorizer.transform) as transform, \
+                mock.patch('src.features.feature_engineering.load_data', side_effect=AssertionError('table loaded whole')):
+            delta = self.build('delta', 31, 9, params)
+
+        full = self.build('full', 31, 9, params, vectorizer_from='delta')
+
+        self.assert_same_features(delta, full)
+        # only the 11 new train and 4 new test rows were vectorized, chunk_size rows at a time
+        self.assertEqual([len(call.args[1]) for call in transform.call_args_list], [7, 4, 4])
+
+    def test_hashing_delta_matches_rebuild(self):
+        params = {'method': 'hashing', 'n_features': 512, 'chunk_size': 4, 'n_workers': 1}
+        self.build('delta', 10, 3, params)
+        kept_shard = os.path.join(self.tmp.name, 'delta', 'data/processed/train_hashing/shard-00001.npz')
+        os.utime(kept_shard, (0, 0))
+        with mock.patch('src.features.feature_engineering.load_data', side_effect=AssertionError('table loaded whole')):
+            delta = self.build('delta', 23, 6, params)
+
+        full = self.build('full', 23, 6, params)
+
+        self.assert_same_features(delta, full)
+        self.assertEqual(len(list_sparse_shards(os.path.join(self.tmp.name, 'delta', 'data/processed/train_hashing'))), 6)
+        # rows 0-7 were complete shards and are not hashed again, the partial third shard is
+        self.assertEqual(os.path.getmtime(kept_shard), 0)
+
+
+class VocabularyVectorizerTests(unittest.TestCase):
+
+    TRAIN = ['love sunny day', 'sad rainy day day', 'happy happy friend', 'miss home', 'café naïve straße',
+             'zebra aardvark', 'ΟΔΟΣ résumé']
+    TEXTS = ['', 'Love the SUNNY day day', 'unknown words only', 'café café naïve', 'aardvarks zebra',
+             'a happy friendship friend', 'ΟΔΟΣ', 'z' * 40, 'résumés résumé']
+
+    def setUp(self):
+        self.count_vectorizer = CountVectorizer(max_features=12).fit(self.TRAIN)
+
+    def test_transform_matches_count_vectorizer(self):
+        vocabulary = VocabularyVectorizer.from_count_vectorizer(self.count_vectorizer)
+
+        X = vocabulary.transform(self.TEXTS)
+
+        self.assertEqual(X.shape, (len(self.TEXTS), len(self.count_vectorizer.vocabulary_)))
+        self.assertEqual((X != self.count_vectorizer.transform(self.TEXTS)).nnz, 0)
+        np.testing.assert_array_equal(vocabulary.get_feature_names_out(), self.count_vectorizer.get_feature_names_out())
+
+    def test_serving_maps_vocabulary_from_spec(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            spec = save_vocabulary(self.count_vectorizer, os.path.join(tmp, 'vocabulary'))
+            spec_path = os.path.join(tmp, 'vectorizer.json')
+            save_vectorizer_spec({'method': 'bow', **spec}, spec_path)
+
+            vectorizer = load_vectorizer(spec_path, os.path.join(tmp, 'missing.pkl'))
+
+            self.assertIsInstance(vectorizer.terms, np.memmap)
+            self.assertEqual((vectorizer.transform(self.TEXTS) != self.count_vectorizer.transform(self.TEXTS)).nnz, 0)
+            del vectorizer
+
+    def test_resave_leaves_mapped_vocabulary_intact(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            spec = save_vocabulary(self.count_vectorizer, os.path.join(tmp, 'vocabulary'))
+            spec_path = os.path.join(tmp, 'vectorizer.json')
+            save_vectorizer_spec({'method': 'bow', **spec}, spec_path)
+            mapped = load_vectorizer(spec_path, os.path.join(tmp, 'missing.pkl'))
+            version = vocabulary_version(spec_path)
+
+            # a smaller vocabulary written while the first one is mapped
+            save_vocabulary(CountVectorizer(max_features=3).fit(self.TRAIN), os.path.join(tmp, 'vocabulary'))
+
+            self.assertNotEqual(vocabulary_version(spec_path), version)
+            self.assertEqual((mapped.transform(self.TEXTS) != self.count_vectorizer.transform(self.TEXTS)).nnz, 0)
+            self.assertEqual(load_vectorizer(spec_path, os.path.join(tmp, 'missing.pkl')).n_features, 3)
+            del mapped
+
+    def test_rejects_custom_analyzers(self):
+        with self.assertRaises(ValueError):
+            VocabularyVectorizer.from_count_vectorizer(CountVectorizer(stop_words=['day']).fit(self.TRAIN))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,7 @@
 import unittest
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from unittest import mock
+from flask_app import app as flask_app
 from flask_app.app import app
 
 class FlaskAppTests(unittest.TestCase):
@@ -19,6 +22,30 @@ class FlaskAppTests(unittest.TestCase):
             b'Happy' in response.data or b'Sad' in response.data,
             "Response should contain either 'Happy' or 'Sad'"
         )
+    def test_predict_timeout_is_a_503(self):
+        with mock.patch.object(flask_app.batcher, 'predict', side_effect=FutureTimeoutError()), \
+                mock.patch.object(flask_app, 'cache', None):
+            response = self.client.post('/predict', data=dict(text="a tweet nobody has sent before"))
+        self.assertEqual(response.status_code, 503)
+
+    def test_json_batch_predict(self):
+        response = self.client.post('/v1/predict', json={'texts': ["I love this!", "I feel so sad today"]})
+        self.assertEqual(response.status_code, 200)
+        predictions = response.get_json()['predictions']
+        self.assertEqual(len(predictions), 2)
+        for prediction in predictions:
+            self.assertIn(prediction['label'], (0, 1))
+            self.assertTrue(0.0 <= prediction['probability'] <= 1.0)
+
+    def test_json_batch_predict_streams_ndjson(self):
+        response = self.client.post('/v1/predict?stream=1', json={'texts': ["I love this!"] * 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertEqual(len(response.get_data(as_text=True).splitlines()), 3)
+
+    def test_json_batch_predict_rejects_bad_payload(self):
+        response = self.client.post('/v1/predict', json={'texts': "not a list"})
+        self.assertEqual(response.status_code, 400)
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
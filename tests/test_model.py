@@ -3,7 +3,9 @@ import mlflow
 import os
 import pandas as pd
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
+from sklearn.feature_extraction.text import HashingVectorizer
 import pickle
+from src.utils import load_params, load_sparse_data, processed_data_path
 
 class TestModelLoading(unittest.TestCase):
 
@@ -34,8 +36,9 @@ class TestModelLoading(unittest.TestCase):
         # Load the vectorizer
         cls.vectorizer = pickle.load(open('models/vectorizer.pkl', 'rb'))
 
-        # Load holdout test data
-        cls.holdout_data = pd.read_csv('data/processed/test_bow.csv')
+        # Load holdout test data (sparse CSR features + label array) of the configured feature method
+        method = load_params()['feature_engineering']['method']
+        cls.X_holdout, cls.y_holdout = load_sparse_data(processed_data_path('test', method))
 
     @staticmethod
     def get_latest_model_version(model_name, stage="Staging"):
@@ -55,8 +58,12 @@ class TestModelLoading(unittest.TestCase):
         # Predict using the new model to verify the input and output shapes
         prediction = self.new_model.predict(input_df)
 
-        # Verify the input shape
-        self.assertEqual(input_df.shape[1], len(self.vectorizer.get_feature_names_out()))
+        # Verify the input shape; a hashing vectorizer has no vocabulary, its width is n_features
+        if isinstance(self.vectorizer, HashingVectorizer):
+            expected_features = self.vectorizer.n_features
+        else:
+            expected_features = len(self.vectorizer.get_feature_names_out())
+        self.assertEqual(input_df.shape[1], expected_features)
 
         # Verify the output shape (assuming binary classification with a single output)
         self.assertEqual(len(prediction), input_df.shape[0])
@@ -64,8 +71,8 @@ class TestModelLoading(unittest.TestCase):
 
     def test_model_performance(self):
         # Extract features and labels from holdout test data
-        X_holdout = self.holdout_data.iloc[:,0:-1]
-        y_holdout = self.holdout_data.iloc[:,-1]
+        X_holdout = self.X_holdout
+        y_holdout = self.y_holdout
 
         # Predict using the new model
         y_pred_new = self.new_model.predict(X_holdout)
@@ -0,0 +1,120 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+from scipy import sparse
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.linear_model import SGDClassifier
+from src.model.model_building import (train_model_streaming, load_previous_model, save_model, export_linear_model,
+                                      build_model)
+from src.model.scoring import LinearScorer
+from src.utils import save_sparse_data, save_manifest, manifest_path
+from tests.helpers import ScratchDirMixin
+
+PARAMS = {'epochs': 3, 'alpha': 0.0001}
+
+
+def make_shards(directory, n_shards=4, rows=200, n_features=50, seed=0):
+    """Linearly separable shards: label 1 rows use the first half of the columns."""
+    rng = np.random.default_rng(seed)
+    paths = []
+    for i in range(n_shards):
+        y = rng.integers(0, 2, rows)
+        cols = np.where(y == 1, rng.integers(0, n_features // 2, rows), rng.integers(n_features // 2, n_features, rows))
+        X = sparse.csr_matrix((np.ones(rows), (np.arange(rows), cols)), shape=(rows, n_features))
+        path = os.path.join(directory, f"shard-{i:05d}.npz")
+        save_sparse_data(X, y, path)
+        paths.append(path)
+    return paths
+
+
+class StreamingTrainerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.shards = make_shards(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_learns_from_shards(self):
+        clf = train_model_streaming(self.shards, PARAMS)
+
+        X = sparse.identity(50, format='csr')
+        self.assertEqual(clf.predict(X).tolist(), [1] * 25 + [0] * 25)
+        self.assertEqual(clf.predict_proba(X).shape, (50, 2))
+
+    def test_resumes_previous_model(self):
+        model_path = os.path.join(self.tmp.name, 'model.pkl')
+        clf = train_model_streaming(self.shards, PARAMS)
+        seen = clf.t_
+        save_model(clf, model_path)
+
+        previous = load_previous_model(model_path, n_features=50)
+        resumed = train_model_streaming(self.shards[:1], {'epochs': 1, 'alpha': 0.0001}, previous)
+
+        self.assertGreater(resumed.t_, seen)
+        self.assertIsNone(load_previous_model(model_path, n_features=51))
+
+    def test_skip_rows_trains_on_the_rest(self):
+        with mock.patch.object(SGDClassifier, 'partial_fit', autospec=True, side_effect=SGDClassifier.partial_fit) as fit:
+            train_model_streaming(self.shards, {'epochs': 1, 'alpha': 0.0001}, skip_rows=300)
+
+        self.assertEqual(sorted(call.args[1].shape[0] for call in fit.call_args_list), [100, 200, 200])
+
+    def test_exports_scoring_arrays(self):
+        clf = train_model_streaming(self.shards, PARAMS)
+        directory = os.path.join(self.tmp.name, 'linear_model')
+
+        self.assertTrue(export_linear_model(clf, directory))
+        scorer = LinearScorer.load(directory)
+
+        X = sparse.random(20, 50, density=0.1, format='csr', random_state=0)
+        np.testing.assert_allclose(scorer.predict_proba(X), clf.predict_proba(X), rtol=1e-12, atol=1e-15)
+        del scorer
+
+        boosted = GradientBoostingClassifier(n_estimators=2).fit(X.toarray(), np.arange(20) % 2)
+        self.assertFalse(export_linear_model(boosted, os.path.join(self.tmp.name, 'boosted')))
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, 'boosted')))
+
+
+class WarmStartTests(ScratchDirMixin, unittest.TestCase):
+    """build_model with warm_start on growing hashing shards."""
+
+    PARAMS = {'trainer': 'sgd', 'epochs': 3, 'alpha': 0.0001, 'warm_start': True}
+
+    def setUp(self):
+        super().setUp()
+        self.enter('run')
+        os.makedirs('models')
+
+    def write_features(self, n_shards, first_hash=0):
+        # the same seed gives the same leading shards, as appending to the features does
+        make_shards('data/processed/train_hashing', n_shards)
+        save_manifest(manifest_path('data/processed/train_hashing'), 'features',
+                      np.arange(first_hash, first_hash + n_shards * 200, dtype=np.uint64))
+
+    def rows_fitted(self):
+        with mock.patch.object(SGDClassifier, 'partial_fit', autospec=True, side_effect=SGDClassifier.partial_fit) as fit:
+            build_model(self.PARAMS, 'hashing')
+        return [call.args[1].shape[0] for call in fit.call_args_list]
+
+    def test_only_new_rows_are_fitted_once(self):
+        self.write_features(2)
+        self.assertEqual(sum(self.rows_fitted()), 3 * 400)
+
+        self.write_features(4)
+        self.assertEqual(sorted(self.rows_fitted()), [200, 200])
+        self.assertEqual(self.rows_fitted(), [])
+
+    def test_changed_rows_train_from_scratch(self):
+        self.write_features(2)
+        self.rows_fitted()
+
+        self.write_features(2, first_hash=1)
+        self.assertEqual(sum(self.rows_fitted()), 3 * 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
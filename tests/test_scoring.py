@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from scipy import sparse
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from src.model.scoring import LinearScorer
+
+
+class LinearScorerTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(0)
+        cls.X = sparse.random(400, 300, density=0.03, format='csr', random_state=1)
+        cls.y = (cls.X @ rng.normal(size=300) > 0).astype(int)
+        cls.clf = LogisticRegression(C=1, solver='liblinear').fit(cls.X, cls.y)
+
+    def test_matches_logistic_regression(self):
+        scorer = LinearScorer.from_estimator(self.clf)
+
+        np.testing.assert_allclose(scorer.predict_proba(self.X), self.clf.predict_proba(self.X), rtol=1e-12, atol=1e-15)
+        np.testing.assert_array_equal(scorer.predict(self.X), self.clf.predict(self.X))
+
+        labels, positive = scorer.predict_with_proba(self.X[:5])
+        np.testing.assert_array_equal(labels, self.clf.predict(self.X[:5]))
+        np.testing.assert_allclose(positive, self.clf.predict_proba(self.X[:5])[:, 1], rtol=1e-12)
+
+    def test_matches_log_loss_sgd(self):
+        sgd = SGDClassifier(loss='log_loss', random_state=0).fit(self.X, self.y)
+        scorer = LinearScorer.from_estimator(sgd)
+
+        np.testing.assert_allclose(scorer.predict_proba(self.X), sgd.predict_proba(self.X), rtol=1e-12, atol=1e-15)
+        np.testing.assert_array_equal(scorer.predict(self.X), sgd.predict(self.X))
+
+    def test_supports_only_binary_linear_models(self):
+        self.assertTrue(LinearScorer.supports(self.clf))
+        multiclass = LogisticRegression().fit(self.X, np.arange(400) % 3)
+        self.assertFalse(LinearScorer.supports(multiclass))
+        self.assertFalse(LinearScorer.supports(object()))
+
+    def test_memory_mapped_round_trip(self):
+        scorer = LinearScorer.from_estimator(self.clf)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            scorer.save(tmp)
+            mapped = LinearScorer.load(tmp, mmap_mode='r')
+
+            self.assertIsInstance(mapped.coef, np.memmap)
+            self.assertFalse(mapped.coef.flags.writeable)
+            np.testing.assert_array_equal(mapped.predict_proba(self.X), scorer.predict_proba(self.X))
+            del mapped
+
+    def test_save_swaps_versions_whole(self):
+        first = LinearScorer.from_estimator(self.clf)
+        second = LinearScorer(first.coef * 2, first.intercept, first.classes)
+        third = LinearScorer(first.coef * 3, first.intercept, first.classes)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            first.save(tmp)
+            first_version = LinearScorer.saved_version(tmp)
+            first.save(tmp)
+            self.assertEqual(LinearScorer.saved_version(tmp), first_version)
+
+            second.save(tmp)
+            second_version = LinearScorer.saved_version(tmp)
+            self.assertNotEqual(second_version, first_version)
+            np.testing.assert_array_equal(LinearScorer.load(tmp).coef, second.coef)
+            # a reader that read the marker just before the swap still finds complete arrays
+            np.testing.assert_array_equal(np.load(os.path.join(tmp, first_version, 'coef.npy')), first.coef)
+
+            third.save(tmp)
+            self.assertEqual(sorted(os.listdir(tmp)), sorted([LinearScorer.MARKER, second_version,
+                                                              LinearScorer.saved_version(tmp)]))
+
+
+if __name__ == '__main__':
+    unittest.main()
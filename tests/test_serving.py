@@ -0,0 +1,323 @@
+import os
+import tempfile
+import threading
+import unittest
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.linear_model import LogisticRegression
+from src.features.vectorizers import save_vectorizer_spec, save_vocabulary
+from src.model.model_building import export_linear_model
+from src.serving.batching import MicroBatcher
+from src.serving.model_store import ModelStore, ModelSource, ModelNotReadyError
+from src.serving.prediction_cache import PredictionCache, SqlitePredictionStore
+
+
+class MicroBatcherTests(unittest.TestCase):
+
+    def test_coalesces_concurrent_calls_and_fans_out_results(self):
+        calls = []
+
+        def predict_batch(items):
+            calls.append(list(items))
+            return [item * 10 for item in items]
+
+        batcher = MicroBatcher(predict_batch, max_batch_size=8, max_wait_ms=50)
+        results = {}
+
+        def call(i):
+            results[i] = batcher.predict(i, timeout=5)
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, {i: i * 10 for i in range(8)})
+        self.assertLess(len(calls), 8)
+        metrics = batcher.metrics()
+        self.assertEqual(metrics['items'], 8)
+        self.assertEqual(sum(size * n for size, n in metrics['batch_size_histogram'].items()), 8)
+
+    def test_respects_max_batch_size(self):
+        sizes = []
+        release = threading.Event()
+
+        def predict_batch(items):
+            release.wait(5)
+            sizes.append(len(items))
+            return items
+
+        batcher = MicroBatcher(predict_batch, max_batch_size=3, max_wait_ms=20)
+        futures = [batcher.submit(i) for i in range(7)]
+        release.set()
+
+        self.assertEqual([future.result(5) for future in futures], list(range(7)))
+        self.assertTrue(all(size <= 3 for size in sizes))
+
+    def test_errors_reach_every_caller(self):
+        def predict_batch(items):
+            raise ValueError("model failed")
+
+        batcher = MicroBatcher(predict_batch, max_batch_size=4, max_wait_ms=1)
+
+        with self.assertRaises(ValueError):
+            batcher.predict("text", timeout=5)
+        self.assertEqual(batcher.metrics()['errors'], 1)
+
+    def test_cancelled_caller_does_not_stop_the_batcher(self):
+        release = threading.Event()
+
+        def predict_batch(items):
+            release.wait(5)
+            return [item.upper() for item in items]
+
+        batcher = MicroBatcher(predict_batch, max_batch_size=1, max_wait_ms=1)
+        first = batcher.submit("a")
+        cancelled = batcher.submit("b")
+        self.assertTrue(cancelled.cancel())
+        release.set()
+
+        self.assertEqual(first.result(5), "A")
+        self.assertEqual(batcher.predict("c", timeout=5), "C")
+
+    def test_short_result_lists_fail_every_caller(self):
+        calls = []
+
+        def predict_batch(items):
+            calls.append(items)
+            # the first batch loses its results
+            return [] if len(calls) == 1 else items
+
+        batcher = MicroBatcher(predict_batch, max_batch_size=4, max_wait_ms=1)
+
+        with self.assertRaises(RuntimeError):
+            batcher.predict(3, timeout=5)
+        self.assertEqual(batcher.predict(7, timeout=5), 7)
+
+    def test_timed_out_callers_are_dropped_from_the_queue(self):
+        release = threading.Event()
+        scored = []
+
+        def predict_batch(items):
+            release.wait(5)
+            scored.extend(items)
+            return items
+
+        batcher = MicroBatcher(predict_batch, max_batch_size=1, max_wait_ms=1)
+        first = batcher.submit("a")
+        with self.assertRaises(FutureTimeoutError):
+            batcher.predict("b", timeout=0.05)
+        release.set()
+
+        self.assertEqual(first.result(5), "a")
+        self.assertEqual(batcher.predict("c", timeout=5), "c")
+        self.assertEqual(scored, ["a", "c"])
+
+
+class FakeBundle:
+
+    def __init__(self, version):
+        self.version = version
+
+
+class FakeSource:
+    kind = "fake"
+
+    def __init__(self, version="1", before_load=None):
+        self.version = version
+        self.before_load = before_load
+        self.loads = 0
+
+    def probe(self):
+        return self.version
+
+    def load(self, version=None):
+        if self.before_load is not None:
+            self.before_load()
+        self.loads += 1
+        return FakeBundle(version or self.version)
+
+
+class ModelStoreTests(unittest.TestCase):
+
+    def test_loads_in_background_and_reports_readiness(self):
+        release = threading.Event()
+        store = ModelStore(FakeSource(before_load=lambda: release.wait(5))).start()
+
+        self.assertFalse(store.status()['ready'])
+        with self.assertRaises(ModelNotReadyError):
+            store.get(timeout=0.01)
+
+        release.set()
+        self.assertEqual(store.get(timeout=5).version, "1")
+        status = store.status()
+        self.assertTrue(status['ready'])
+        self.assertEqual(status['model_version'], "1")
+        self.assertIsNotNone(status['load_seconds'])
+        self.assertIsNotNone(status['cold_start_seconds'])
+
+    def test_failed_load_is_reported_and_retried(self):
+        attempts = []
+
+        def before_load():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise OSError("registry unreachable")
+
+        store = ModelStore(FakeSource(version="2", before_load=before_load))
+        store.start(background=False)
+        self.assertIn("registry unreachable", store.status()['error'])
+
+        self.assertEqual(store.get(timeout=5).version, "2")
+        self.assertEqual(len(attempts), 2)
+
+    def test_hot_swaps_new_version_without_touching_held_bundle(self):
+        source = FakeSource("1")
+        store = ModelStore(source)
+        in_flight = store.start(background=False).get()
+
+        self.assertFalse(store.check_for_update())
+        source.version = "2"
+        self.assertTrue(store.check_for_update())
+
+        self.assertEqual(in_flight.version, "1")
+        self.assertEqual(store.get().version, "2")
+        self.assertEqual(store.status()['swaps'], 1)
+        self.assertEqual(source.loads, 2)
+
+    def test_watcher_polls_in_background(self):
+        source = FakeSource("1")
+        store = ModelStore(source, poll_interval=0.01)
+        store.start(background=False)
+
+        source.version = "2"
+        for _ in range(500):
+            if store.get().version == "2":
+                break
+            threading.Event().wait(0.01)
+
+        self.assertEqual(store.get().version, "2")
+        self.assertIsNotNone(store.status()['last_poll_at'])
+
+
+class ModelSourceTests(unittest.TestCase):
+
+    def test_probe_sees_rewrites_within_the_same_second(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            model_path = os.path.join(tmp, 'model.pkl')
+            with open(model_path, 'wb') as file:
+                file.write(b'first')
+            os.utime(model_path, ns=(1_700_000_000_100_000_000, 1_700_000_000_100_000_000))
+            source = ModelSource({'MODEL_PATH': model_path})
+            version = source.probe()
+
+            os.utime(model_path, ns=(1_700_000_000_900_000_000, 1_700_000_000_900_000_000))
+            self.assertNotEqual(source.probe(), version)
+
+    def test_scores_from_exported_arrays_without_pickles(self):
+        texts = ['love sunny day', 'sad rainy day', 'happy friend', 'miss home', 'love friend', 'sad home'] * 5
+        labels = [1, 0, 1, 0, 1, 0] * 5
+        vectorizer = CountVectorizer().fit(texts)
+        clf = LogisticRegression().fit(vectorizer.transform(texts), labels)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            spec_path = os.path.join(tmp, 'vectorizer.json')
+            save_vectorizer_spec({'method': 'bow', **save_vocabulary(vectorizer, os.path.join(tmp, 'vocabulary'))}, spec_path)
+            export_linear_model(clf, os.path.join(tmp, 'linear_model'))
+
+            source = ModelSource({'MODEL_PATH': os.path.join(tmp, 'linear_model'), 'VECTORIZER_SPEC': spec_path,
+                                  'VECTORIZER_PATH': os.path.join(tmp, 'missing.pkl')})
+            bundle = source.load()
+            predicted, positive = bundle.score(['love day', 'sad rainy home', 'unknown'])
+
+            expected = vectorizer.transform(['love day', 'sad rainy home', 'unknown'])
+            np.testing.assert_array_equal(predicted, clf.predict(expected))
+            np.testing.assert_allclose(positive, clf.predict_proba(expected)[:, 1], rtol=1e-12)
+            self.assertTrue(bundle.version.startswith('local:linear_model@'))
+            del bundle
+
+            # the version follows the saved arrays: unchanged on a re-export, new once they change
+            version = source.probe()
+            export_linear_model(clf, os.path.join(tmp, 'linear_model'))
+            self.assertEqual(source.probe(), version)
+            clf.coef_ = clf.coef_ * 2
+            export_linear_model(clf, os.path.join(tmp, 'linear_model'))
+            self.assertNotEqual(source.probe(), version)
+
+            # so does the vocabulary, under an unchanged model
+            version = source.probe()
+            save_vocabulary(CountVectorizer(max_features=4).fit(texts), os.path.join(tmp, 'vocabulary'))
+            self.assertNotEqual(source.probe(), version)
+
+
+class CountingBundle:
+
+    def __init__(self, version):
+        self.version = version
+        self.scored = []
+
+    def score(self, texts):
+        self.scored.append(list(texts))
+        return [len(text) % 2 for text in texts], [len(text) / 100 for text in texts]
+
+
+class PredictionCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        self.cache = PredictionCache(maxsize=3, ttl=60, clock=lambda: self.now)
+
+    def test_scores_only_misses(self):
+        bundle = CountingBundle("1")
+
+        first = self.cache.score(bundle, ['love day', 'sad'])
+        second = self.cache.score(bundle, ['sad', 'miss home', 'love day'])
+
+        self.assertEqual(first, ([0, 1], [0.08, 0.03]))
+        self.assertEqual(second, ([1, 1, 0], [0.03, 0.09, 0.08]))
+        self.assertEqual(bundle.scored, [['love day', 'sad'], ['miss home']])
+        self.assertEqual(self.cache.stats()['hits'], 2)
+        self.assertEqual(self.cache.stats()['misses'], 3)
+
+    def test_bounded_lru_and_ttl(self):
+        bundle = CountingBundle("1")
+        self.cache.score(bundle, ['a', 'b', 'c'])
+        self.cache.score(bundle, ['a'])
+        self.cache.score(bundle, ['d'])
+
+        self.assertEqual(len(self.cache), 3)
+        self.assertEqual(self.cache.get_many("1", ['a', 'b']), [(1, 0.01), None])
+
+        self.now += 61
+        self.assertEqual(self.cache.get_many("1", ['a']), [None])
+        self.assertEqual(self.cache.stats()['expired'], 1)
+
+    def test_new_model_version_invalidates(self):
+        self.cache.score(CountingBundle("1"), ['love day'])
+        swapped = CountingBundle("2")
+
+        self.cache.score(swapped, ['love day'])
+
+        self.assertEqual(swapped.scored, [['love day']])
+        self.assertEqual(self.cache.stats()['invalidations'], 1)
+
+    def test_workers_share_through_sqlite(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'predictions.sqlite')
+            worker_a = PredictionCache(maxsize=10, ttl=60, shared=SqlitePredictionStore(path))
+            worker_b = PredictionCache(maxsize=10, ttl=60, shared=SqlitePredictionStore(path))
+            bundle = CountingBundle("1")
+
+            worker_a.score(bundle, ['love day', 'sad'])
+            labels, _ = worker_b.score(bundle, ['sad', 'love day'])
+
+            self.assertEqual(labels, [1, 0])
+            self.assertEqual(bundle.scored, [['love day', 'sad']])
+            self.assertEqual(worker_b.stats()['shared_hits'], 2)
+            self.assertEqual(worker_b.get_many("2", ['sad']), [None])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,225 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from src.utils import (save_sparse_data, load_sparse_data, labels_path, StageCache, save_data, load_data,
+                       load_data_chunks, data_file, data_format_of, TableWriter, append_data, row_hashes,
+                       save_manifest, processed_rows)
+
+
+class SparseDataTests(unittest.TestCase):
+
+    def test_round_trip_keeps_csr_and_labels(self):
+        X = sparse.random(50, 300, density=0.02, format='csr', random_state=0)
+        y = np.arange(50) % 2
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'processed', 'train_bow.npz')
+            save_sparse_data(X, y, path)
+
+            self.assertTrue(os.path.exists(labels_path(path)))
+            X_loaded, y_loaded = load_sparse_data(path)
+
+        self.assertEqual(X_loaded.format, 'csr')
+        self.assertEqual((X_loaded != X).nnz, 0)
+        np.testing.assert_array_equal(y_loaded, y)
+
+
+class TableIOTests(unittest.TestCase):
+
+    def setUp(self):
+        self.frame = pd.DataFrame({'sentiment': [1, 0, 1, 0, 1], 'content': ['love it', 'so sad', 'yay', None, 'ok then'],
+                                   'author': list('abcde')}, index=[10, 11, 12, 13, 14])
+
+    def test_format_follows_extension(self):
+        self.assertEqual(data_format_of('data/raw/train_raw.parquet'), 'parquet')
+        self.assertEqual(data_format_of('x.arrow'), 'feather')
+        self.assertEqual(data_format_of('https://example.com/tweets.csv'), 'csv')
+        self.assertEqual(data_file('./data/raw/train_raw', 'feather'), './data/raw/train_raw.feather')
+
+    def test_every_format_round_trips_with_column_selection_and_chunks(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for data_format, compression in (('csv', None), ('parquet', 'zstd'), ('parquet', 'none'),
+                                             ('feather', 'uncompressed'), ('feather', 'lz4')):
+                with self.subTest(data_format=data_format, compression=compression):
+                    path = data_file(os.path.join(tmp, f'train-{compression}'), data_format)
+                    save_data(self.frame, path, compression)
+
+                    loaded = load_data(path, ['sentiment', 'content'], memory_map=True)
+                    chunks = list(load_data_chunks(path, 2, ['content'], memory_map=True))
+
+                    self.assertEqual(list(loaded.columns), ['sentiment', 'content'])
+                    self.assertEqual(loaded['sentiment'].tolist(), [1, 0, 1, 0, 1])
+                    self.assertEqual(loaded['content'].fillna('').tolist(), ['love it', 'so sad', 'yay', '', 'ok then'])
+                    self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+                    self.assertEqual(list(chunks[0].columns), ['content'])
+
+    def test_table_writer_appends_chunks(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for data_format in ('csv', 'parquet', 'feather'):
+                with self.subTest(data_format=data_format):
+                    path = data_file(os.path.join(tmp, 'chunked'), data_format)
+                    with TableWriter(path, ['sentiment', 'content'], 'zstd') as writer:
+                        writer.write(self.frame.iloc[:3])
+                        writer.write(self.frame.iloc[3:4])  # content all null
+                        writer.write(self.frame.iloc[4:])
+
+                    loaded = load_data(path)
+                    self.assertEqual(writer.rows, 5)
+                    self.assertEqual(loaded['content'].fillna('').tolist(), ['love it', 'so sad', 'yay', '', 'ok then'])
+
+                    empty = data_file(os.path.join(tmp, 'empty'), data_format)
+                    TableWriter(empty, ['sentiment', 'content']).close()
+                    self.assertEqual(list(load_data(empty).columns), ['sentiment', 'content'])
+
+    def test_append_data_matches_one_save(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for data_format in ('csv', 'parquet', 'feather'):
+                with self.subTest(data_format=data_format):
+                    path = data_file(os.path.join(tmp, 'appended'), data_format)
+                    append_data(self.frame.iloc[:2], path, 'zstd')
+                    append_data(self.frame.iloc[2:], path, 'zstd')
+                    whole = data_file(os.path.join(tmp, 'whole'), data_format)
+                    save_data(self.frame, whole)
+
+                    pd.testing.assert_frame_equal(load_data(path), load_data(whole))
+
+
+class RowManifestTests(unittest.TestCase):
+
+    def setUp(self):
+        self.frame = pd.DataFrame({'sentiment': [1, 0, 1, 0], 'content': ['a', 'b', None, 'd']})
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, 'train_manifest.npz')
+        save_manifest(self.path, 'v1', row_hashes(self.frame.iloc[:3], ['sentiment', 'content']))
+
+    def test_appended_rows_are_the_delta(self):
+        grown = pd.concat([self.frame, self.frame], ignore_index=True)
+
+        self.assertEqual(processed_rows(self.path, 'v1', row_hashes(grown, ['sentiment', 'content'])), 3)
+        self.assertEqual(processed_rows(self.path, 'v1', row_hashes(self.frame.iloc[:3], ['sentiment', 'content'])), 3)
+
+    def test_anything_else_is_a_full_rebuild(self):
+        edited = self.frame.copy()
+        edited.loc[1, 'content'] = 'B'
+
+        self.assertEqual(processed_rows(self.path, 'v2', row_hashes(self.frame, ['sentiment', 'content'])), 0)
+        self.assertEqual(processed_rows(self.path, 'v1', row_hashes(edited, ['sentiment', 'content'])), 0)
+        self.assertEqual(processed_rows(self.path, 'v1', row_hashes(self.frame.iloc[:2], ['sentiment', 'content'])), 0)
+        self.assertEqual(processed_rows(os.path.join(self.tmp.name, 'missing.npz'), 'v1',
+                                        row_hashes(self.frame, ['sentiment', 'content'])), 0)
+
+
+class StageCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.input = os.path.join(self.tmp.name, 'input.txt')
+        self.code = os.path.join(self.tmp.name, 'stage.py')
+        self.output = os.path.join(self.tmp.name, 'out', 'result.txt')
+        self.output_dir = os.path.join(self.tmp.name, 'out', 'shards')
+        self.write(self.input, 'a b c')
+        self.write(self.code, 'def stage(): pass')
+        self.calls = 0
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as file:
+            file.write(text)
+
+    def stage(self):
+        self.calls += 1
+        with open(self.input) as file:
+            text = file.read()
+        self.write(self.output, text.upper())
+        self.write(os.path.join(self.output_dir, 'shard-00000.txt'), text[::-1])
+
+    def run_stage(self, cache, params={'min_words': 0}):
+        return cache.run('stage', self.stage, inputs=[self.input], outputs=[self.output, self.output_dir],
+                         params=params, code=[self.code])
+
+    def test_second_run_restores_outputs_without_running(self):
+        cache = StageCache(os.path.join(self.tmp.name, 'cache'), enabled=True)
+
+        self.assertFalse(self.run_stage(cache))
+        os.remove(self.output)
+        os.remove(os.path.join(self.output_dir, 'shard-00000.txt'))
+        self.assertTrue(self.run_stage(cache))
+
+        self.assertEqual(self.calls, 1)
+        with open(self.output) as file:
+            self.assertEqual(file.read(), 'A B C')
+        self.assertEqual(os.listdir(self.output_dir), ['shard-00000.txt'])
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_input_param_or_code_change_misses(self):
+        cache = StageCache(os.path.join(self.tmp.name, 'cache'), enabled=True)
+        self.run_stage(cache)
+
+        self.write(self.input, 'd e f g')
+        self.assertFalse(self.run_stage(cache))
+        self.assertFalse(self.run_stage(cache, {'min_words': 3}))
+        self.write(self.code, 'def stage(): return 1')
+        self.assertFalse(self.run_stage(cache, {'min_words': 3}))
+
+        self.assertEqual(self.calls, 4)
+        with open(self.output) as file:
+            self.assertEqual(file.read(), 'D E F G')
+
+    def test_evict_drops_least_recently_used_entries(self):
+        cache = StageCache(os.path.join(self.tmp.name, 'cache'), enabled=True)
+        for text in ('one', 'two', 'three'):
+            self.write(self.input, text)
+            self.run_stage(cache)
+        oldest = cache.entries()[0]
+        os.utime(oldest[0], (0, 0))
+
+        freed = cache.evict(cache.stats()['bytes'] - 1)
+
+        self.assertEqual(freed, oldest[1])
+        self.assertEqual(cache.stats()['entries'], 2)
+        self.assertFalse(os.path.exists(oldest[0]))
+
+    def test_identical_outputs_are_stored_once(self):
+        cache = StageCache(os.path.join(self.tmp.name, 'cache'), enabled=True)
+        self.run_stage(cache)
+        single = cache.stats()['bytes']
+
+        # other params, same outputs: a second entry that shares the first one's blobs
+        self.run_stage(cache, {'min_words': 1})
+
+        self.assertEqual(cache.stats()['entries'], 2)
+        self.assertEqual(cache.stats()['bytes'], single)
+        oldest = cache.entries()[0]
+        os.utime(oldest[0], (0, 0))
+        self.assertEqual(cache.evict(single - 1), single)
+        self.assertEqual(cache.stats()['entries'], 0)
+
+    def test_store_is_bounded_by_max_bytes(self):
+        cache = StageCache(os.path.join(self.tmp.name, 'cache'), enabled=True, max_bytes=20)
+        for text in ('one', 'two', 'three'):
+            self.write(self.input, text)
+            self.run_stage(cache)
+
+        self.assertLessEqual(cache.stats()['bytes'], 20)
+        self.assertEqual(cache.stats()['entries'], 2)
+        self.assertTrue(self.run_stage(cache))
+        self.assertEqual(StageCache(os.path.join(self.tmp.name, 'cache')).max_bytes, 5 * 2 ** 30)
+
+    def test_disabled_cache_always_runs(self):
+        cache = StageCache(os.path.join(self.tmp.name, 'cache'), enabled=False)
+
+        self.run_stage(cache)
+        self.run_stage(cache)
+
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(cache.stats()['entries'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()